@@ -2,9 +2,23 @@
 Admin configuration for accounts app.
 """
 from django.contrib import admin
+from django.db import transaction
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 from apps.accounts.models import User
+from apps.accounts.ws_auth import invalidate_snapshot
+
+
+def _update_and_invalidate(queryset, **fields) -> int:
+    """Bulk-update users and drop their WebSocket auth snapshots once the update commits.
+
+    .update() skips post_save; invalidating after the commit keeps a handshake
+    that races the action from re-caching the old row.
+    """
+    user_ids = list(queryset.values_list("pk", flat=True))
+    count = queryset.model.objects.filter(pk__in=user_ids).update(**fields)
+    transaction.on_commit(lambda: [invalidate_snapshot(user_id) for user_id in user_ids])
+    return count
 
 
 @admin.register(User)
@@ -103,28 +117,30 @@ class UserAdmin(BaseUserAdmin):
     actions = ["ban_users", "unban_users", "activate_users", "deactivate_users"]
 
     def ban_users(self, request, queryset):
-        count = 0
+        banned = []
         for user in queryset.filter(is_superuser=False):
             user.ban(reason="Banned by admin action", banned_by=request.user)
-            count += 1
-        self.message_user(request, f"{count} user(s) banned.")
+            banned.append(user.pk)
+        # ban() saves (post_save invalidates), but possibly before the action commits
+        transaction.on_commit(lambda: [invalidate_snapshot(user_id) for user_id in banned])
+        self.message_user(request, f"{len(banned)} user(s) banned.")
 
     ban_users.short_description = "Ban selected users"
 
     def unban_users(self, request, queryset):
-        count = queryset.filter(is_banned=True).update(is_banned=False, is_active=True)
+        count = _update_and_invalidate(queryset.filter(is_banned=True), is_banned=False, is_active=True)
         self.message_user(request, f"{count} user(s) unbanned.")
 
     unban_users.short_description = "Unban selected users"
 
     def activate_users(self, request, queryset):
-        count = queryset.update(is_active=True)
+        count = _update_and_invalidate(queryset, is_active=True)
         self.message_user(request, f"{count} user(s) activated.")
 
     activate_users.short_description = "Activate selected users"
 
     def deactivate_users(self, request, queryset):
-        count = queryset.filter(is_superuser=False).update(is_active=False)
+        count = _update_and_invalidate(queryset.filter(is_superuser=False), is_active=False)
         self.message_user(request, f"{count} user(s) deactivated.")
 
     deactivate_users.short_description = "Deactivate selected users"
@@ -1,4 +1,5 @@
-from django.db.models.signals import post_migrate
+from django.conf import settings
+from django.db.models.signals import post_migrate, post_save
 from django.dispatch import receiver
 
 
@@ -7,3 +8,9 @@ def create_default_groups(sender, **kwargs):
     if sender.name == "accounts":
         from apps.accounts.permission_initialier import PermissionInitializer
         PermissionInitializer.create_groups_and_permissions()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_ws_user_snapshot(sender, instance, **kwargs):
+    from apps.accounts.ws_auth import invalidate_snapshot
+    invalidate_snapshot(instance.pk)
@@ -0,0 +1,111 @@
+"""
+Tests for the WebSocket JWT middleware.
+"""
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts import ws_auth
+from apps.accounts.models import User
+from apps.accounts.ws_auth import JWTAuthMiddleware, SnapshotUser, authenticate, token_from_scope
+
+
+class WebSocketAuthTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="ws@example.com", username="wsuser", password="TestPass123!", display_name="WS User"
+        )
+        self.token = str(AccessToken.for_user(self.user))
+
+    def test_valid_token_yields_snapshot_user(self):
+        user = authenticate(self.token)
+        self.assertIsInstance(user, SnapshotUser)
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(user.display_name, "WS User")
+        self.assertTrue(user.is_authenticated)
+
+    def test_warm_snapshot_skips_database(self):
+        authenticate(self.token)
+        with self.assertNumQueries(0):
+            self.assertIsInstance(authenticate(self.token), SnapshotUser)
+
+    def test_invalid_token_is_anonymous(self):
+        self.assertIsInstance(authenticate(self.token[:-4] + "AAAA"), AnonymousUser)
+        self.assertIsInstance(authenticate("not-a-jwt"), AnonymousUser)
+
+    def test_ban_invalidates_snapshot(self):
+        self.assertFalse(authenticate(self.token).is_banned)
+        self.user.ban("spam")
+        user = authenticate(self.token)
+        self.assertIsInstance(user, SnapshotUser)
+        self.assertTrue(user.is_banned)
+
+    def test_inactive_user_is_anonymous(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsInstance(authenticate(self.token), AnonymousUser)
+
+    def test_token_sources(self):
+        self.assertEqual(token_from_scope({"query_string": b"token=abc"}), "abc")
+        self.assertEqual(token_from_scope({"subprotocols": ["ravenna.json.v1", "bearer.abc"]}), "abc")
+        # Nothing the consumer could echo in accept(): the browser would drop the handshake
+        self.assertIsNone(token_from_scope({"subprotocols": ["bearer.abc"]}))
+        self.assertEqual(token_from_scope({"headers": [(b"authorization", b"Bearer abc")]}), "abc")
+        self.assertIsNone(token_from_scope({"query_string": b"", "headers": []}))
+
+    def test_middleware_sets_scope_user(self):
+        seen = {}
+
+        async def inner(scope, receive, send):
+            seen["user"] = scope["user"]
+
+        async def fallback(scope, receive, send):
+            seen["fallback"] = True
+
+        middleware = JWTAuthMiddleware(inner, fallback=fallback)
+        async_to_sync(middleware)({"type": "websocket", "query_string": f"token={self.token}".encode()}, None, None)
+        self.assertEqual(seen["user"].id, self.user.id)
+
+        async_to_sync(middleware)({"type": "websocket", "query_string": b""}, None, None)
+        self.assertTrue(seen["fallback"])
+
+    def test_snapshot_cache_key(self):
+        authenticate(self.token)
+        self.assertEqual(cache.get(ws_auth.snapshot_key(self.user.id))["username"], "wsuser")
+
+
+class AdminActionSnapshotTestCase(TestCase):
+    """Bulk admin actions drop the WebSocket auth snapshot after their update commits."""
+
+    def setUp(self):
+        from django.contrib.admin.sites import AdminSite
+        from django.test import RequestFactory
+        from apps.accounts.admin import UserAdmin
+
+        cache.clear()
+        self.admin = UserAdmin(User, AdminSite())
+        self.admin.message_user = lambda *args, **kwargs: None
+        self.request = RequestFactory().post("/")
+        self.request.user = User.objects.create_superuser(
+            email="root@example.com", username="root", password="TestPass123!"
+        )
+        self.user = User.objects.create_user(email="ws@example.com", username="wsuser", password="TestPass123!")
+        self.token = str(AccessToken.for_user(self.user))
+
+    def _run(self, action):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            action(self.request, User.objects.filter(pk=self.user.pk))
+            # Not dropped before the commit, where a racing handshake could re-cache the old row
+            self.assertIsNotNone(cache.get(ws_auth.snapshot_key(self.user.pk)))
+        self.assertTrue(callbacks)
+
+    def test_deactivate_and_activate(self):
+        authenticate(self.token)
+        self._run(self.admin.deactivate_users)
+        self.assertIsInstance(authenticate(self.token), AnonymousUser)
+
+        self._run(self.admin.activate_users)
+        self.assertIsInstance(authenticate(self.token), SnapshotUser)
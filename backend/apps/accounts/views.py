@@ -9,7 +9,6 @@ from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle, UserRateThrottle
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -41,6 +40,7 @@ from apps.accounts.serializers import (
     UserRegistrationSerializer,
     UserUUIDSerializer,
 )
+from apps.common.throttling import AnonRateThrottle, ScopedRateThrottle, UserRateThrottle
 
 User = get_user_model()
 
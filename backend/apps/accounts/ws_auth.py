@@ -0,0 +1,165 @@
+"""
+Autenticação JWT dos WebSockets sem consulta ao banco no caminho feliz.
+
+`JWTAuthMiddlewareStack` (usado em `core/asgi.py`) procura o access token em:
+
+- `?token=<jwt>` na URL;
+- subprotocolo `bearer.<jwt>` em `Sec-WebSocket-Protocol`, oferecido junto com um
+  subprotocolo da aplicação (`ravenna.json.v1` / `ravenna.proto.v1`). O accept
+  ecoa o da aplicação (ver `apps.game_logic.wire`), nunca o token; o navegador
+  derruba a conexão cujo accept não ecoa nenhum dos subprotocolos oferecidos,
+  então `bearer.<jwt>` sozinho é ignorado;
+- header `Authorization: Bearer <jwt>` (clientes nativos).
+
+O token é verificado (RS256, `exp`) com a chave pública de `SIMPLE_JWT`, carregada
+uma vez por processo. `scope["user"]` vira um `SnapshotUser` montado dos claims e
+de um snapshot em cache (`ws:user:<id>`: ban, ativo, staff, display name) com TTL
+de `WS_USER_SNAPSHOT_TTL` segundos; só um cache miss consulta `users`. O snapshot é
+apagado em todo `User.save()` (ban/unban passam por ele). Token inválido ou expirado
+resulta em `AnonymousUser`; sem token, a conexão segue pelo `AuthMiddlewareStack`
+(sessão Django).
+"""
+import logging
+import uuid
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+import jwt
+from asgiref.sync import sync_to_async
+from channels.auth import AuthMiddlewareStack
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from jwt.algorithms import RSAAlgorithm
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY_PREFIX = "ws:user:"
+SUBPROTOCOL_PREFIX = "bearer."
+APPLICATION_SUBPROTOCOL_PREFIX = "ravenna."
+ACCEPTED_TOKEN_TYPES = {"access", "unity_auth"}
+_SNAPSHOT_FIELDS = ("username", "display_name", "is_banned", "is_active", "is_staff", "is_superuser")
+
+
+class SnapshotUser:
+    """Read-only user built from JWT claims and the cached snapshot; never touches the DB."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, snapshot: dict):
+        self.id = self.pk = user_id
+        self.username = snapshot.get("username", "")
+        self.display_name = snapshot.get("display_name") or self.username
+        self.is_banned = bool(snapshot.get("is_banned"))
+        self.is_active = bool(snapshot.get("is_active", True))
+        self.is_staff = bool(snapshot.get("is_staff"))
+        self.is_superuser = bool(snapshot.get("is_superuser"))
+
+    def __str__(self):
+        return self.display_name
+
+    def __repr__(self):
+        return f"<SnapshotUser {self.id}>"
+
+
+def snapshot_key(user_id) -> str:
+    return f"{SNAPSHOT_KEY_PREFIX}{user_id}"
+
+
+def invalidate_snapshot(user_id) -> None:
+    cache.delete(snapshot_key(user_id))
+
+
+def load_snapshot(user_id) -> dict | None:
+    """Cached {field: value} of the user, loaded from the DB on a miss; None if it does not exist."""
+    from apps.accounts.models import User
+
+    key = snapshot_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = User.objects.filter(pk=user_id).values(*_SNAPSHOT_FIELDS).first() or {}
+        cache.set(key, snapshot, timeout=getattr(settings, "WS_USER_SNAPSHOT_TTL", 30))
+    return snapshot or None
+
+
+@lru_cache(maxsize=1)
+def _verifying_key(pem: str):
+    # Parsed once per process instead of on every decode
+    return RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(pem)
+
+
+def decode_token(token: str) -> dict | None:
+    """Verified claims of an access token, or None."""
+    options = settings.SIMPLE_JWT
+    try:
+        claims = jwt.decode(
+            token,
+            _verifying_key(options["VERIFYING_KEY"]),
+            algorithms=[options.get("ALGORITHM", "RS256")],
+            audience=options.get("AUDIENCE"),
+            issuer=options.get("ISSUER"),
+            leeway=options.get("LEEWAY", 0),
+            options={"require": ["exp"]},
+        )
+    except jwt.PyJWTError as exc:
+        logger.debug("ws auth: rejected token (%s)", exc)
+        return None
+    if claims.get("token_type", "access") not in ACCEPTED_TOKEN_TYPES:
+        return None
+    return claims
+
+
+def authenticate(token: str):
+    """SnapshotUser for a valid token of an active (or banned) user, else AnonymousUser."""
+    claims = decode_token(token)
+    if claims is None:
+        return AnonymousUser()
+    try:
+        user_id = uuid.UUID(str(claims.get(settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id"))))
+    except ValueError:
+        return AnonymousUser()
+    snapshot = load_snapshot(user_id)
+    # ban() also deactivates; keep banned users so consumers can close with 4003
+    if snapshot is None or not (snapshot["is_active"] or snapshot["is_banned"]):
+        return AnonymousUser()
+    return SnapshotUser(user_id, snapshot)
+
+
+def token_from_scope(scope) -> str | None:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if query.get("token"):
+        return query["token"][0]
+    subprotocols = scope.get("subprotocols") or ()
+    # Only usable next to a subprotocol the consumer can echo in accept()
+    if any(s.startswith(APPLICATION_SUBPROTOCOL_PREFIX) for s in subprotocols):
+        for subprotocol in subprotocols:
+            if subprotocol.startswith(SUBPROTOCOL_PREFIX):
+                return subprotocol[len(SUBPROTOCOL_PREFIX):]
+    elif any(s.startswith(SUBPROTOCOL_PREFIX) for s in subprotocols):
+        logger.debug("ws auth: bearer subprotocol offered without an application subprotocol, ignored")
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            kind, _, credentials = value.decode("latin-1").partition(" ")
+            if kind.lower() == "bearer" and credentials:
+                return credentials.strip()
+    return None
+
+
+class JWTAuthMiddleware:
+    """Sets scope["user"] from a JWT; connections without a token go to `fallback`."""
+
+    def __init__(self, inner, fallback=None):
+        self.inner = inner
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        token = token_from_scope(scope)
+        if token is None and self.fallback is not None:
+            return await self.fallback(scope, receive, send)
+        user = await sync_to_async(authenticate)(token) if token else AnonymousUser()
+        return await self.inner(dict(scope, user=user), receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return JWTAuthMiddleware(inner, fallback=AuthMiddlewareStack(inner))
@@ -12,7 +12,6 @@ from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
 from apps.accounts.permissions import IsGameUser
 from apps.blog.models import Category, Comment, MediaImage, Post, PostRevision, PostView, Tag
@@ -36,6 +35,7 @@ from apps.blog.serializers import (
     TagSerializer,
 )
 from apps.blog.services import PostService
+from apps.common.throttling import AnonRateThrottle, UserRateThrottle
 
 
 class StandardPagination(PageNumberPagination):
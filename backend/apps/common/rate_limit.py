@@ -0,0 +1,127 @@
+"""
+Rate limiting por token bucket compartilhado entre processos.
+
+Cada bucket (`ratelimit:<nome>:<identidade>`) é um hash Redis com os tokens
+restantes e o instante da última recarga. `TokenBucket.consume` executa um
+script Lua que recarrega (`capacidade / período` tokens por segundo, relógio do
+próprio Redis via `TIME`), consome e responde numa única ida ao Redis — o
+limite vale para o usuário/IP em todas as conexões, abas e workers.
+
+Fast path local: quando o Redis nega, o processo guarda até quando a
+identidade fica sem tokens e nega as tentativas seguintes sem consultar o
+Redis (ninguém pode liberar tokens antes disso, só a recarga). Assim cada
+checagem custa no máximo um round trip, e spam negado não custa nenhum.
+
+Sem Redis, o bucket é mantido no cache Django (não atômico, como os throttles
+padrão do DRF).
+
+Usado por `ChatConsumer` (mensagens de chat por usuário) e pelos throttles DRF
+de `apps.common.throttling` / `GameServerThrottle`.
+"""
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+_BLOCKED_MAX = 10000
+
+# KEYS: bucket hash | ARGV: capacity, refill per second, cost
+# Returns {allowed (0/1), milliseconds until `cost` tokens are available}
+_CONSUME_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+if allowed == 1 then
+    return {1, 0}
+end
+return {0, math.ceil((cost - tokens) / rate * 1000)}
+"""
+
+_DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# {bucket key: monotonic time until which Redis has no tokens for it}
+_blocked: dict[str, float] = {}
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """"<n>/<period>" (DRF notation, e.g. "120/min") -> (requests, seconds)."""
+    num, period = rate.split("/")
+    return int(num), _DURATIONS[period[0]]
+
+
+class TokenBucket:
+    """`capacity` requests per `period` seconds per identity, with bursts up to `capacity`."""
+
+    def __init__(self, name: str, capacity: int, period: float):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+
+    @classmethod
+    def from_rate(cls, name: str, rate: str) -> "TokenBucket":
+        return cls(name, *parse_rate(rate))
+
+    def key(self, ident) -> str:
+        return f"{KEY_PREFIX}{self.name}:{ident}"
+
+    def consume(self, ident, cost: int = 1) -> tuple[bool, float]:
+        """Take `cost` tokens for `ident`: (allowed, seconds until they would be available)."""
+        key = self.key(ident)
+        until = _blocked.get(key)
+        if until is not None:
+            remaining = until - time.monotonic()
+            if remaining > 0:
+                return False, remaining
+            del _blocked[key]
+
+        try:
+            allowed, wait_ms = _get_conn().eval(_CONSUME_LUA, 1, key, self.capacity, self.rate, cost)
+        except Exception as exc:
+            logger.debug("rate limit %s: Redis unavailable (%s)", self.name, exc)
+            return self._consume_cache(key, cost)
+
+        if allowed:
+            return True, 0.0
+        if len(_blocked) >= _BLOCKED_MAX:
+            now = time.monotonic()
+            for stale in [k for k, t in _blocked.items() if t <= now]:
+                del _blocked[stale]
+        _blocked[key] = time.monotonic() + wait_ms / 1000
+        return False, wait_ms / 1000
+
+    def _consume_cache(self, key: str, cost: int) -> tuple[bool, float]:
+        from django.core.cache import cache
+
+        now = time.time()
+        tokens, ts = cache.get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + max(0.0, now - ts) * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        cache.set(key, (tokens, now), timeout=math.ceil(self.capacity / self.rate) + 1)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+
+def reset_local() -> None:
+    """Forget the locally cached denials (tests)."""
+    _blocked.clear()
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from apps.common import rate_limit
+from apps.common.rate_limit import TokenBucket, parse_rate
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.reset_local()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("120/min"), (120, 60))
+        self.assertEqual(parse_rate("10/hour"), (10, 3600))
+        self.assertEqual(parse_rate("5/s"), (5, 1))
+
+    def test_cache_fallback_allows_burst_then_refills(self):
+        bucket = TokenBucket("test", 3, 30)
+        with mock.patch.object(rate_limit.time, "time", return_value=1000.0):
+            self.assertEqual([bucket.consume("u1")[0] for _ in range(4)], [True, True, True, False])
+            allowed, wait = bucket.consume("u1")
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(wait, 10.0)
+            self.assertTrue(bucket.consume("u2")[0])
+        with mock.patch.object(rate_limit.time, "time", return_value=1010.0):
+            self.assertEqual([bucket.consume("u1")[0] for _ in range(2)], [True, False])
+
+    def test_denial_is_cached_locally(self):
+        conn = mock.Mock()
+        conn.eval.return_value = [0, 2000]
+        bucket = TokenBucket("test", 5, 10)
+        with mock.patch.object(rate_limit, "_get_conn", return_value=conn):
+            self.assertFalse(bucket.consume("u1")[0])
+            allowed, wait = bucket.consume("u1")
+        self.assertFalse(allowed)
+        self.assertGreater(wait, 1.5)
+        self.assertEqual(conn.eval.call_count, 1)
+
+    def test_allowed_request_is_one_round_trip(self):
+        conn = mock.Mock()
+        conn.eval.return_value = [1, 0]
+        with mock.patch.object(rate_limit, "_get_conn", return_value=conn):
+            self.assertEqual(TokenBucket("test", 5, 10).consume("u1"), (True, 0.0))
+        args = conn.eval.call_args.args
+        self.assertEqual(args[1:3], (1, "ratelimit:test:u1"))
+        self.assertEqual(args[3:], (5, 0.5, 1))
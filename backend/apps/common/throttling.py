@@ -0,0 +1,49 @@
+"""
+Throttles DRF sobre o token bucket compartilhado (`apps.common.rate_limit`).
+
+Mesmos nomes, scopes, chaves e taxas (`DEFAULT_THROTTLE_RATES`) dos throttles
+de `rest_framework.throttling`, mas o estado fica num bucket Redis atômico em
+vez da lista de timestamps no cache (que, com vários workers, perde
+incrementos em requisições concorrentes):
+
+```python
+from apps.common.throttling import AnonRateThrottle, ScopedRateThrottle, UserRateThrottle
+```
+"""
+from rest_framework import throttling
+
+from apps.common.rate_limit import TokenBucket
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+    """SimpleRateThrottle whose `num_requests/duration` is enforced by a TokenBucket."""
+
+    _wait = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        bucket = TokenBucket("drf", self.num_requests, self.duration)
+        allowed, wait = bucket.consume(self.key)
+        self._wait = None if allowed else wait
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, TokenBucketThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, TokenBucketThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, TokenBucketThrottle):
+    pass
@@ -10,7 +10,6 @@ from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
 from apps.accounts.permissions import IsNotBanned, IsVerified
 from apps.forum.models import ForumCategory, Reply, Topic, TopicReaction, ReplyReaction
@@ -39,6 +38,7 @@ from apps.forum.serializers import (
     TopicWithRepliesSerializer,
 )
 from apps.forum.services import ForumCategoryService, ReactionService, TopicService
+from apps.common.throttling import AnonRateThrottle, UserRateThrottle
 
 
 class StandardPagination(PageNumberPagination):
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:19
+#
+# Catch-up migration: index names and `equip_slot` choices as declared in
+# models.py, which no earlier migration recorded. Schema only, no data.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Same operations, previously under the autogenerated name
+    replaces = [("game_data", "0009_rename_item_templa_equip_s_idx_item_templa_equip_s_906583_idx_and_more")]
+
+    dependencies = [
+        ('game_data', '0008_seed_elite_loot_item_templates'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='itemtemplate',
+            new_name='item_templa_equip_s_906583_idx',
+            old_name='item_templa_equip_s_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='itemtemplate',
+            new_name='item_templa_weapon__707f84_idx',
+            old_name='item_templa_weapon_t_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='itemtemplate',
+            new_name='item_templa_armor_t_6562ab_idx',
+            old_name='item_templa_armor_t_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='skilltemplate',
+            new_name='skill_templ_class_r_469679_idx',
+            old_name='skill_templ_class_r_idx',
+        ),
+        migrations.AlterField(
+            model_name='itemtemplate',
+            name='equip_slot',
+            field=models.CharField(blank=True, choices=[('weapon', 'Weapon (Main Hand)'), ('offhand', 'Off-Hand (Shield / Dual Wield)'), ('helmet', 'Helmet'), ('chest', 'Chest'), ('gloves', 'Gloves'), ('boots', 'Boots'), ('ring', 'Ring'), ('amulet', 'Amulet')], default='', max_length=20),
+        ),
+    ]
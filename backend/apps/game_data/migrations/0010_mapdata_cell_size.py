@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_data', '0009_catch_up_index_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mapdata',
+            name='cell_size',
+            field=models.PositiveIntegerField(default=128),
+        ),
+    ]
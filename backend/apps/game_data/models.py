@@ -214,6 +214,8 @@ class MapData(UUIDModel):
     min_level = models.IntegerField(default=1)
     max_level = models.IntegerField(default=100)
     max_players = models.IntegerField(default=50)
+    # Side of the interest-management grid cell, in world units (see game_logic.interest)
+    cell_size = models.PositiveIntegerField(default=128)
     environment = models.CharField(max_length=100, blank=True)
     spawn_points = models.JSONField(default=list)
     npcs = models.JSONField(default=list)
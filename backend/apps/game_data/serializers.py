@@ -70,6 +70,7 @@ class MapDataSerializer(serializers.ModelSerializer):
             "min_level",
             "max_level",
             "max_players",
+            "cell_size",
             "environment",
             "spawn_points",
             "npcs",
@@ -5,6 +5,9 @@ Updated for Multi-Character Architecture.
 from django.contrib import admin
 from apps.game_logic.models import (
     Character, 
+    ChatFilterTerm,
+    ChatLogMessage,
+    CharacterStatSheet,
     PlayerInventory, 
     PlayerItem, 
     PlayerSkill, 
@@ -52,6 +55,12 @@ class PlayerStatsAdmin(admin.ModelAdmin):
     search_fields = ["character__name", "character__owner__username"]
     raw_id_fields = ["character"]
 
+@admin.register(CharacterStatSheet)
+class CharacterStatSheetAdmin(admin.ModelAdmin):
+    list_display = ["character", "max_hp", "max_mana", "updated_at"]
+    search_fields = ["character__name", "character__owner__username"]
+    raw_id_fields = ["character"]
+
 @admin.register(QuestProgress)
 class QuestProgressAdmin(admin.ModelAdmin):
     list_display = ["character", "quest_id", "status", "started_at", "completed_at"]
@@ -89,3 +98,17 @@ class PartyAdmin(admin.ModelAdmin):
 class PartyMemberAdmin(admin.ModelAdmin):
     list_display = ["party", "user", "joined_at"]
     raw_id_fields = ["party", "user"]
+
+@admin.register(ChatLogMessage)
+class ChatLogMessageAdmin(admin.ModelAdmin):
+    list_display = ["sent_at", "room", "display_name", "user_id", "text"]
+    list_filter = ["room"]
+    search_fields = ["text", "display_name", "=user_id"]
+    date_hierarchy = "sent_at"
+    ordering = ["-sent_at"]
+
+@admin.register(ChatFilterTerm)
+class ChatFilterTermAdmin(admin.ModelAdmin):
+    list_display = ["term", "action", "whole_word", "is_active", "created_at"]
+    list_filter = ["action", "whole_word", "is_active"]
+    search_fields = ["term"]
@@ -13,6 +13,9 @@ class GameLogicConfig(AppConfig):
     verbose_name = "Game Logic (Dynamic Instances)"
 
     def ready(self):
+        from apps.game_logic.signals import _register_signals
+        _register_signals()
+
         debug = os.environ.get("DEBUG", "False").lower() in ("true", "1")
         secret = os.environ.get("DJANGO_WEBHOOK_SECRET", "changeme")
         if not debug and secret == "changeme":
@@ -0,0 +1,125 @@
+"""
+Fan-out em shards para salas de chat grandes.
+
+Salas listadas em `CHAT_ROOM_SHARDS` (`{"global": 16}` por padrão) não usam o
+grupo `chat_<sala>` com uma entrada por conexão. Em vez disso:
+
+- cada processo (worker Daphne) tem um `ShardRelay` com um único canal, que entra
+  em **um** grupo `chat_<sala>.<k>` por sala com conexões locais, com
+  `k = crc32(canal) % shards` — as conexões do worker ficam todas no shard dele;
+- quem publica faz um `group_send` por shard (`publish`), cada um com só os
+  poucos workers daquele shard;
+- o relay recebe a mensagem uma vez e a entrega às conexões locais da sala
+  direto no event loop, sem passar de novo pelo channel layer.
+
+O custo de um broadcast passa a ser `shards` publicações + uma mensagem por
+worker, independente do número de conexões na sala.
+"""
+import asyncio
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+RELAY_EVENT = "chat.relay"
+_GROUP_REFRESH_SECONDS = 3600
+
+
+def shard_count(room: str) -> int:
+    from django.conf import settings
+    return int(getattr(settings, "CHAT_ROOM_SHARDS", {}).get(room, 0))
+
+
+def shard_group(room: str, shard: int) -> str:
+    return f"chat_{room}.{shard}"
+
+
+async def publish(channel_layer, room: str, message: dict) -> None:
+    """Send `message` (already `wire.prepare`d) to every shard of `room`."""
+    event = {"type": RELAY_EVENT, "room": room, "message": message}
+    for shard in range(shard_count(room)):
+        await channel_layer.group_send(shard_group(room, shard), event)
+
+
+class ShardRelay:
+    """One channel per process that receives sharded room messages and delivers them locally."""
+
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+        self.loop = asyncio.get_running_loop()
+        self.channel: str | None = None
+        self.members: dict[str, set] = {}
+        self.groups: dict[str, str] = {}
+        self.task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def shard_of(self, room: str) -> int:
+        return zlib.crc32(self.channel.encode()) % shard_count(room)
+
+    async def join(self, room: str, consumer) -> None:
+        async with self._lock:
+            if self.channel is None:
+                self.channel = await self.channel_layer.new_channel("chat.relay.")
+            group = self.groups.get(room) or shard_group(room, self.shard_of(room))
+            # Also refreshes the group membership expiry on every local join
+            await self.channel_layer.group_add(group, self.channel)
+            self.groups[room] = group
+            self.members.setdefault(room, set()).add(consumer)
+            if self.task is None:
+                self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def leave(self, room: str, consumer) -> None:
+        async with self._lock:
+            members = self.members.get(room)
+            if members is None:
+                return
+            members.discard(consumer)
+            if not members:
+                del self.members[room]
+                await self.channel_layer.group_discard(self.groups.pop(room), self.channel)
+
+    async def deliver(self, event: dict) -> int:
+        message = event["message"]
+        delivered = 0
+        for consumer in list(self.members.get(event.get("room"), ())):
+            try:
+                await consumer.chat_message(message)
+                delivered += 1
+            except Exception as exc:
+                logger.debug("chat relay: delivery failed (%s)", exc)
+        return delivered
+
+    async def _refresh_groups(self) -> None:
+        for group in list(self.groups.values()):
+            await self.channel_layer.group_add(group, self.channel)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        refresh_at = loop.time() + _GROUP_REFRESH_SECONDS
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(self.channel_layer.receive(self.channel), _GROUP_REFRESH_SECONDS)
+                except asyncio.TimeoutError:
+                    event = None
+                if event is not None and event.get("type") == RELAY_EVENT:
+                    await self.deliver(event)
+                if loop.time() >= refresh_at:
+                    refresh_at = loop.time() + _GROUP_REFRESH_SECONDS
+                    await self._refresh_groups()
+        except Exception as exc:
+            logger.warning("chat relay %s stopped: %s", self.channel, exc)
+        finally:
+            self.task = None
+
+
+# One relay per event loop (Daphne runs one per process; tests create new loops)
+_relays: dict[int, ShardRelay] = {}
+
+
+def relay(channel_layer) -> ShardRelay:
+    loop = asyncio.get_running_loop()
+    current = _relays.get(id(loop))
+    if current is None or current.loop is not loop or current.channel_layer is not channel_layer:
+        current = _relays[id(loop)] = ShardRelay(channel_layer)
+    return current
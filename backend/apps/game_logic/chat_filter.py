@@ -0,0 +1,243 @@
+"""
+Filtro de mensagens do chat (palavrões e links).
+
+`ChatConsumer.receive` passa o texto por `run_filters`, que aplica em ordem os
+filtros de `CHAT_MESSAGE_FILTERS` (caminhos importáveis de funções
+`(room, text) -> (texto | None, ação | None)`; `None` rejeita a mensagem). O
+filtro padrão, `word_filter`, usa um autômato Aho-Corasick compilado a partir de:
+
+- `ChatFilterTerm` ativos (admin): termo, ação `mask` (troca por `*`) ou
+  `reject`, e se só casa com a palavra inteira;
+- `CHAT_FILTER_LINK_PREFIXES` (`http://`, `www.`, ...), com a ação
+  `CHAT_FILTER_LINK_ACTION`; o mascaramento de um link vai até o próximo espaço.
+
+Uma única passada linear sobre o texto (sem diferenciar maiúsculas) encontra
+todas as ocorrências, qualquer que seja o tamanho da lista.
+
+O autômato é versionado como o `quest_index`: os sinais de `ChatFilterTerm`
+trocam o token `game:chat_filter:version` no cache. O consumer confere a versão no
+máximo a cada `CHAT_FILTER_REFRESH_SECONDS` e recompila numa task em segundo
+plano; até terminar, as mensagens usam o autômato anterior.
+
+Mensagens rejeitadas/mascaradas contam em `game:chat:filter:stats`
+(`<sala>:blocked` / `<sala>:masked`), expostas em `chat/filter-stats/` (admin).
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "game:chat_filter:version"
+STATS_KEY = "game:chat:filter:stats"
+
+MASK = "mask"
+REJECT = "reject"
+_COUNTERS = {MASK: "masked", REJECT: "blocked"}
+
+
+def _fold(char: str) -> str:
+    lowered = char.lower()
+    return lowered if len(lowered) == 1 else char
+
+
+class Automaton:
+    """Aho-Corasick automaton over (term, action, whole_word, link) patterns."""
+
+    def __init__(self, patterns=()):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[tuple[int, str, bool, bool]]] = [[]]
+        self.size = 0
+        for term, action, whole_word, link in patterns:
+            folded = "".join(_fold(c) for c in term.strip())
+            if folded:
+                self._insert(folded, (len(folded), action, whole_word, link))
+        self._link_failures()
+
+    def _insert(self, term: str, output: tuple) -> None:
+        node = 0
+        for char in term:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(output)
+        self.size += 1
+
+    def _link_failures(self) -> None:
+        # Breadth-first: depth-1 nodes fail to the root, deeper ones to the longest proper suffix
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def apply(self, text: str) -> tuple[str | None, str | None]:
+        """(filtered text, strongest action taken) — text is None when a reject term matched."""
+        if not self.size:
+            return text, None
+        node = 0
+        masked: list[tuple[int, int]] = []
+        n = len(text)
+        for i, char in enumerate(text):
+            char = _fold(char)
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, action, whole_word, link in self.out[node]:
+                start, end = i - length + 1, i + 1
+                if start > 0 and text[start - 1].isalnum() and (whole_word or link):
+                    continue
+                if whole_word and end < n and text[end].isalnum():
+                    continue
+                if action == REJECT:
+                    return None, REJECT
+                if link:
+                    while end < n and not text[end].isspace():
+                        end += 1
+                masked.append((start, end))
+        if not masked:
+            return text, None
+        chars = list(text)
+        for start, end in masked:
+            for j in range(start, end):
+                if not chars[j].isspace():
+                    chars[j] = "*"
+        return "".join(chars), MASK
+
+
+# ── Versioned word list ──────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_state: dict = {"version": None, "automaton": Automaton(), "checked_at": float("-inf")}
+_tasks: set = set()
+
+
+def invalidate() -> None:
+    """Publish a new word list version (called on ChatFilterTerm save/delete)."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def _current_version() -> str:
+    # Random tokens instead of a counter: a flushed cache can't hand out a version a process already has
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _patterns():
+    from django.conf import settings
+    from apps.game_logic.models import ChatFilterTerm
+
+    for term, action, whole_word in ChatFilterTerm.objects.filter(is_active=True).values_list(
+        "term", "action", "whole_word"
+    ):
+        yield term, action, whole_word, False
+    link_action = getattr(settings, "CHAT_FILTER_LINK_ACTION", REJECT)
+    for prefix in getattr(settings, "CHAT_FILTER_LINK_PREFIXES", ()):
+        yield prefix, link_action, False, True
+
+
+def refresh() -> bool:
+    """Recompile the automaton if the word list changed; True when it was rebuilt."""
+    version = _current_version()
+    _state["checked_at"] = time.monotonic()
+    if _state["version"] == version:
+        return False
+    with _lock:
+        if _state["version"] == version:
+            return False
+        automaton = Automaton(_patterns())
+        _state["automaton"], _state["version"] = automaton, version
+    logger.debug("chat_filter: compiled version %s (%s terms)", version, automaton.size)
+    return True
+
+
+def schedule_refresh() -> None:
+    """From the event loop: when due, re-check the version in a background task."""
+    from asgiref.sync import sync_to_async
+    from django.conf import settings
+
+    interval = getattr(settings, "CHAT_FILTER_REFRESH_SECONDS", 10)
+    if time.monotonic() - _state["checked_at"] < interval:
+        return
+    _state["checked_at"] = time.monotonic()
+    task = asyncio.get_running_loop().create_task(sync_to_async(refresh)())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+# ── Pipeline ─────────────────────────────────────────────────────────────────
+
+def word_filter(room: str, text: str) -> tuple[str | None, str | None]:
+    return _state["automaton"].apply(text)
+
+
+@lru_cache(maxsize=None)
+def _pipeline(paths: tuple[str, ...]) -> list:
+    from django.utils.module_loading import import_string
+    return [import_string(path) for path in paths]
+
+
+def run_filters(room: str, text: str) -> tuple[str | None, str | None]:
+    """Run `CHAT_MESSAGE_FILTERS` over `text`: (text or None when rejected, strongest action)."""
+    from django.conf import settings
+
+    paths = getattr(settings, "CHAT_MESSAGE_FILTERS", ("apps.game_logic.chat_filter.word_filter",))
+    taken = None
+    for message_filter in _pipeline(tuple(paths)):
+        text, action = message_filter(room, text)
+        if text is None:
+            return None, REJECT
+        taken = action or taken
+    return text, taken
+
+
+# ── Per-room counters ────────────────────────────────────────────────────────
+
+_local_stats: Counter = Counter()
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def count(room: str, action: str) -> None:
+    field = f"{room}:{_COUNTERS[action]}"
+    try:
+        _get_conn().hincrby(STATS_KEY, field, 1)
+    except Exception as exc:
+        logger.debug("chat filter count: Redis unavailable (%s)", exc)
+        _local_stats[field] += 1
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """{room: {"blocked": n, "masked": n}} since the counters were last reset."""
+    try:
+        raw = {k.decode(): int(v) for k, v in _get_conn().hgetall(STATS_KEY).items()}
+    except Exception as exc:
+        logger.debug("chat filter stats: Redis unavailable (%s)", exc)
+        raw = dict(_local_stats)
+    result: dict[str, dict[str, int]] = {}
+    for field, value in raw.items():
+        room, _, counter = field.rpartition(":")
+        result.setdefault(room, {"blocked": 0, "masked": 0})[counter] = value
+    return result
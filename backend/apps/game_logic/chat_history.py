@@ -0,0 +1,189 @@
+"""
+Histórico das salas de chat e log de moderação.
+
+Cada `chat.send` aceito pelo `ChatConsumer` vai, num único pipeline Redis, para:
+
+- `game:chat:history:<sala>`: ring buffer da sala (`LPUSH` + `LTRIM` em
+  `CHAT_HISTORY_SIZE` mensagens). Uma conexão nova recebe o buffer inteiro num
+  só frame `chat.history` logo após o `connect`;
+- `game:chat:pending`: fila das mensagens ainda não persistidas.
+
+`tasks.flush_chat_log` (a cada `CHAT_LOG_FLUSH_SECONDS`) troca a fila com RENAME
+e grava as mensagens em `ChatLogMessage` com um `bulk_create` por lote de
+`CHAT_LOG_FLUSH_BATCH_SIZE`; o caminho de envio nunca toca o banco. No
+PostgreSQL a tabela `game_chat_log` é particionada por mês em `sent_at`
+(`ensure_partitions`, chamada por `tasks.ensure_chat_log_partitions`).
+
+Sem Redis, o histórico fica num deque por sala no próprio processo e as
+mensagens não são persistidas.
+"""
+import json
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+HISTORY_KEY_PREFIX  = "game:chat:history:"
+PENDING_KEY         = "game:chat:pending"
+FLUSHING_KEY_PREFIX = "game:chat:flushing:"
+LOG_TABLE           = "game_chat_log"
+
+_local_history: dict[str, deque] = {}
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def history_size() -> int:
+    from django.conf import settings
+    return max(1, int(getattr(settings, "CHAT_HISTORY_SIZE", 50)))
+
+
+def _entry(message: dict) -> dict:
+    return {k: message[k] for k in ("user", "user_id", "text", "ts")}
+
+
+def record(room: str, message: dict) -> bool:
+    """Append a chat.message to the room history and the persistence queue.
+
+    Returns False when Redis is unavailable (history kept in process only).
+    """
+    entry = _entry(message)
+    size = history_size()
+    try:
+        pipeline = _get_conn().pipeline(transaction=False)
+        pipeline.lpush(f"{HISTORY_KEY_PREFIX}{room}", json.dumps(entry, separators=(",", ":")))
+        pipeline.ltrim(f"{HISTORY_KEY_PREFIX}{room}", 0, size - 1)
+        pipeline.rpush(PENDING_KEY, json.dumps({"room": room, **entry}, separators=(",", ":")))
+        pipeline.execute()
+        return True
+    except Exception as exc:
+        logger.debug("chat record: Redis unavailable (%s)", exc)
+    history = _local_history.get(room)
+    if history is None or history.maxlen != size:
+        history = _local_history[room] = deque(history or (), maxlen=size)
+    history.append(entry)
+    return False
+
+
+def recent(room: str) -> list[dict]:
+    """Last `CHAT_HISTORY_SIZE` messages of `room`, oldest first."""
+    try:
+        raw = _get_conn().lrange(f"{HISTORY_KEY_PREFIX}{room}", 0, history_size() - 1)
+        return [json.loads(item) for item in reversed(raw)]
+    except Exception as exc:
+        logger.debug("chat recent: Redis unavailable (%s)", exc)
+    return list(_local_history.get(room, ()))
+
+
+def reset_local() -> None:
+    _local_history.clear()
+
+
+def _log_rows(raw_entries) -> list:
+    from apps.game_logic.models import ChatLogMessage
+
+    rows = []
+    for raw in raw_entries:
+        try:
+            entry = json.loads(raw)
+            rows.append(ChatLogMessage(
+                room=entry["room"],
+                user_id=uuid.UUID(entry["user_id"]),
+                display_name=entry["user"][:100],
+                text=entry["text"],
+                sent_at=datetime.fromtimestamp(entry["ts"] / 1000, tz=timezone.utc),
+            ))
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("chat flush: dropping malformed entry %r (%s)", raw, exc)
+    return rows
+
+
+def flush_pending(batch_size: int) -> int:
+    """Persist every queued message to the chat log; returns the number of rows written."""
+    from apps.game_logic.models import ChatLogMessage
+
+    conn = _get_conn()
+    flushing_key = f"{FLUSHING_KEY_PREFIX}{uuid.uuid4().hex}"
+    try:
+        conn.rename(PENDING_KEY, flushing_key)
+    except Exception as exc:
+        if "no such key" in str(exc).lower():
+            return 0
+        raise
+
+    written = 0
+    start = 0
+    try:
+        while True:
+            raw = conn.lrange(flushing_key, start, start + batch_size - 1)
+            if not raw:
+                break
+            ChatLogMessage.objects.bulk_create(_log_rows(raw), batch_size=batch_size)
+            written += len(raw)
+            start += len(raw)
+    except Exception:
+        # Requeue what was not written, ahead of the messages queued meanwhile
+        remaining = conn.lrange(flushing_key, start, -1)
+        if remaining:
+            conn.lpush(PENDING_KEY, *reversed(remaining))
+        conn.delete(flushing_key)
+        raise
+    conn.delete(flushing_key)
+    return written
+
+
+def _month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def ensure_partitions(months_ahead: int, now: datetime | None = None) -> list[str]:
+    """Create the monthly partitions of the chat log up to `months_ahead` months ahead.
+
+    Months that already have rows in the DEFAULT partition (the task fell behind)
+    are created too. PostgreSQL refuses `PARTITION OF ... FOR VALUES` while
+    DEFAULT holds rows of that range, so each one is created with DEFAULT
+    detached and those rows moved into it, all in one transaction.
+
+    PostgreSQL only (elsewhere `game_chat_log` is a plain table); returns the new partitions.
+    """
+    from django.db import connection, transaction
+
+    if connection.vendor != "postgresql":
+        return []
+    now = now or datetime.now(timezone.utc)
+    default = f"{LOG_TABLE}_default"
+    months = {_month_start(now.year, now.month + offset) for offset in range(months_ahead + 1)}
+    created = []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [default])
+        has_default = cursor.fetchone()[0] is not None
+        if has_default:
+            cursor.execute(f"SELECT DISTINCT date_trunc('month', \"sent_at\" AT TIME ZONE 'UTC') FROM \"{default}\"")
+            months.update(_month_start(row[0].year, row[0].month) for row in cursor.fetchall())
+        for start in sorted(months):
+            end = _month_start(start.year, start.month + 1)
+            name = f"{LOG_TABLE}_{start:%Y%m}"
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+            bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            with transaction.atomic():
+                if has_default:
+                    # Blocks inserts into the log until the commit, so no row lands outside a partition
+                    cursor.execute(f'ALTER TABLE "{LOG_TABLE}" DETACH PARTITION "{default}"')
+                cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{LOG_TABLE}" FOR VALUES {bounds}')
+                if has_default:
+                    range_filter = '"sent_at" >= %s AND "sent_at" < %s'
+                    cursor.execute(
+                        f'INSERT INTO "{LOG_TABLE}" SELECT * FROM "{default}" WHERE {range_filter}', [start, end]
+                    )
+                    cursor.execute(f'DELETE FROM "{default}" WHERE {range_filter}', [start, end])
+                    cursor.execute(f'ALTER TABLE "{LOG_TABLE}" ATTACH PARTITION "{default}" DEFAULT')
+            created.append(name)
+    return created
@@ -10,23 +10,37 @@ WebSocket para chat e eventos de jogo. Montados via `routing.py`.
 Consumer assíncrono para chat em tempo real por salas.
 
 **URL:** `ws://<host>/ws/chat/<room>/`
-**Autenticação:** JWT via `AuthMiddlewareStack`
+**Autenticação:** JWT via `JWTAuthMiddlewareStack` (`?token=`, subprotocolo
+`bearer.<jwt>` junto com `ravenna.*.v1`, ou header `Authorization`; ver
+`apps.accounts.ws_auth`)
 
 **Salas Permitidas:**
 - `global` — chat geral do servidor
 - `faction_<nome>` — canal de facção (ex.: `faction_vanguarda`)
 - `zone_<chave>` — chat por zona do mapa (ex.: `zone_ruins`)
 
-**Rate Limiting:** 5 mensagens por janela de 10 segundos (por conexão, sem Redis).
+**Salas grandes** (`CHAT_ROOM_SHARDS`, ex.: `global`): entrega em shards por worker,
+ver `chat_fanout`.
+
+**Filtro:** palavrões e links são mascarados (`*`) ou a mensagem é rejeitada com
+`chat.error` / `blocked`, por um autômato Aho-Corasick (`chat_filter`).
+
+**Rate Limiting:** 5 mensagens a cada 10 segundos por usuário, somadas todas as
+conexões (token bucket Redis de `apps.common.rate_limit`).
 
 **Mensagem de entrada:**
 ```json
 {"type": "chat.send", "text": "Olá!"}
 ```
-**Mensagem de saída:**
+**Mensagens de saída:**
 ```json
+{"type": "chat.history", "room": "global", "messages": [{"user": "Herói", "user_id": "uuid", "text": "Oi", "ts": 1713999990000}]}
 {"type": "chat.message", "user": "Herói", "user_id": "uuid", "text": "Olá!", "ts": 1714000000000}
 ```
+`chat.history` chega uma vez, logo após o `connect`, com as últimas
+`CHAT_HISTORY_SIZE` mensagens da sala (mais antiga primeiro; omitido se a sala
+está vazia). As mensagens também entram na fila persistida em lote no log de
+moderação (`chat_history`).
 
 **Códigos de Fechamento:**
 - `4001` — não autenticado
@@ -39,26 +53,52 @@ Consumer assíncrono para chat em tempo real por salas.
 Consumer assíncrono para eventos de jogo em tempo real.
 
 **URL:** `ws://<host>/ws/game/<session_id>/`
-**Autenticação:** JWT via `AuthMiddlewareStack`
+**Autenticação:** JWT via `JWTAuthMiddlewareStack` (`?token=`, subprotocolo
+`bearer.<jwt>` junto com `ravenna.*.v1`, ou header `Authorization`; ver
+`apps.accounts.ws_auth`)
 
 **Mensagens de Entrada:**
-- `{"type": "ping"}` — heartbeat, responde com `pong` e atualiza sessão
+- `{"type": "ping"}` — heartbeat, responde com `pong` e atualiza a presença da sessão
+  em Redis (`presence`); o banco é reconciliado em lote por `cleanup_stale_game_sessions`
 - `{"type": "player.move", "map_key": str, "x": float, "y": float}` — movimento do jogador
+- `{"type": "snapshot.resync"}` — pede um keyframe (`world.delta` com `keyframe: true`)
 
 **Mensagens de Saída:**
 - `{"type": "pong"}` — resposta ao ping
-- `{"type": "world.update", "player_id": ..., "display_name": ..., "x": ..., "y": ..., "map_key": ...}` — posição de jogadores no mapa
+- `{"type": "map.full", "map_key": str}` — mapa lotado (`MapData.max_players`); o jogador continua no mapa atual
+- `{"type": "world.delta", "seq": int, "keyframe": bool, "quantum": float, "map_key": str,
+  "entered": [{"player_id", "display_name", "x", "y"}], "moved": [{"player_id", "x", "y"}], "left": [player_id]}`
+  — mudanças desde o último snapshot enviado (`snapshots`), com coordenadas quantizadas
+  (`x * quantum`). Vem dos `world.update` do tick do mapa (`world_ticker`, `WORLD_TICK_RATE` Hz),
+  só das células da grade dentro de `WORLD_INTEREST_RADIUS` ao redor do jogador (`interest`);
+  keyframe a cada `WORLD_KEYFRAME_SECONDS`
 - `{"type": "session.kicked", "reason": str}` — jogador expulso da sessão
 - `{"type": "notification.new", ...}` — notificação do servidor
 
 **Grupos de Canais:**
 - `map_<map_key>` — todos jogadores no mesmo mapa
+- `map_<map_key>.<cx>.<cy>` — célula da grade de interesse (`MapData.cell_size`); cada conexão
+  assina as células ao redor da própria posição
 - `user_<user_id>` — canal privado do jogador (para kick e notificações)
 
 **Requisitos:**
 - Sessão de jogo ativa (`GameSession.is_active=True`) com o `session_id` fornecido.
 - Código `4004` fecha a conexão se sessão inválida ou expirada.
 
+## Formato dos frames
+Os dois consumers negociam o subprotocolo (`Sec-WebSocket-Protocol`): com
+`ravenna.proto.v1` as mensagens de saída vão como frames binários `ServerFrame`
+(`proto/ws_messages.proto`); sem ele (ou com `ravenna.json.v1`) continuam em JSON.
+As mensagens de entrada são sempre JSON. Ver `wire.py`.
+
+## Fila de envio
+Mensagens de grupo (`world.delta`, `chat.message`, `notification.new`) passam pela
+`SendQueue` da conexão (`send_queue`): o `world.delta` pendente é substituído pelo
+mais recente, o chat fica limitado a `WS_SEND_QUEUE_LIMIT` mensagens (descarta as
+mais antigas) e a conexão que fica `WS_SEND_STALL_SECONDS` atrasada (fila não
+vazia ou mais de `WS_SEND_BACKLOG_BYTES` ainda não escritos no socket) é fechada
+com o código `4008`.
+
 ## Configuração (settings)
 ```python
 CHANNEL_LAYERS = {
@@ -72,10 +112,17 @@ CHANNEL_LAYERS = {
 import json
 import logging
 import time
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.utils import timezone
 
+from apps.common.rate_limit import TokenBucket
+from apps.game_logic import (
+    chat_fanout, chat_filter, chat_history, interest, map_population, send_queue, snapshots, wire, world_ticker,
+)
+
 logger = logging.getLogger(__name__)
 
 # ── Chat rooms ────────────────────────────────────────────────────────────────
@@ -86,6 +133,9 @@ _MAX_TEXT_LEN    = 200
 _RATE_WINDOW_SEC = 10
 _RATE_MAX_MSGS   = 5  # messages per window per user
 
+# Shared by every connection of the user, across tabs, reconnects and workers
+_CHAT_RATE = TokenBucket("chat", _RATE_MAX_MSGS, _RATE_WINDOW_SEC)
+
 
 def _valid_room(room: str) -> bool:
     if room in _CHAT_ROOMS:
@@ -97,12 +147,50 @@ def _valid_room(room: str) -> bool:
     return False
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class _WireMixin:
+    """Negotiates the frame codec on connect and sends every message in it (see `wire`)."""
+
+    codec = wire.JSON
+
+    async def _accept_negotiated(self):
+        subprotocol = wire.choose_subprotocol(self.scope.get("subprotocols"))
+        self.codec = wire.SUBPROTOCOLS.get(subprotocol, wire.JSON)
+        await self.accept(subprotocol=subprotocol)
+
+    async def send_message(self, message: dict):
+        data = wire.frame(message, self.codec)
+        if self.codec == wire.PROTO:
+            await self.send(bytes_data=data)
+        else:
+            await self.send(text_data=data)
+
+    def _open_send_queue(self):
+        # Group messages go through the queue; direct replies (pong, errors) are sent inline
+        self.outbox = send_queue.SendQueue(
+            self.send_message,
+            limit=getattr(settings, "WS_SEND_QUEUE_LIMIT", 256),
+            stall_seconds=getattr(settings, "WS_SEND_STALL_SECONDS", 10),
+            on_stall=self._close_stalled,
+            backlog=send_queue.transport_backlog(self.base_send),
+            backlog_limit=getattr(settings, "WS_SEND_BACKLOG_BYTES", 256 * 1024),
+        )
+
+    async def _close_stalled(self):
+        await self.close(code=send_queue.STALL_CLOSE_CODE)
+
+    async def _close_send_queue(self):
+        outbox = getattr(self, "outbox", None)
+        if outbox is not None:
+            outbox.stop()
+            await sync_to_async(send_queue.record)(outbox.counters)
+
+
+class ChatConsumer(_WireMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time text chat.
 
     URL: ws://<host>/ws/chat/<room>/
-    Auth: JWT (via AuthMiddlewareStack — same as GameConsumer).
+    Auth: JWT (via JWTAuthMiddlewareStack — same as GameConsumer).
 
     Allowed rooms:
         global            — server-wide chat
@@ -110,7 +198,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         zone_<key>        — zone-scoped chat (e.g. zone_ruins)
 
     Incoming:  {"type": "chat.send", "text": "<message>"}
-    Outgoing:  {"type": "chat.message", "user": "<display_name>",
+    Outgoing:  {"type": "chat.history", "room": "<room>", "messages": [<chat.message fields>, ...]}
+               {"type": "chat.message", "user": "<display_name>",
                 "user_id": "<uuid>", "text": "...", "ts": <unix_ms>}
     """
 
@@ -130,19 +219,33 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close(code=4004)
             return
 
+        self._open_send_queue()
         self.group_name = f"chat_{self.room}"
-        self._rate_window_start = time.monotonic()
-        self._rate_count = 0
-
-        await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        self.sharded = chat_fanout.shard_count(self.room) > 0
+
+        if self.sharded:
+            await chat_fanout.relay(self.channel_layer).join(self.room, self)
+        else:
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self._accept_negotiated()
+        await sync_to_async(chat_filter.refresh)()
+        history = await sync_to_async(chat_history.recent)(self.room)
+        if history:
+            await self.send_message({"type": "chat.history", "room": self.room, "messages": history})
         logger.debug("chat.connect user=%s room=%s", self.user.id, self.room)
 
     async def disconnect(self, close_code):
-        if hasattr(self, "group_name"):
+        await self._close_send_queue()
+        if not hasattr(self, "group_name"):
+            return
+        if self.sharded:
+            await chat_fanout.relay(self.channel_layer).leave(self.room, self)
+        else:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            return
         try:
             data = json.loads(text_data)
         except json.JSONDecodeError:
@@ -155,52 +258,58 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if not text or len(text) > _MAX_TEXT_LEN:
             return
 
-        # Per-connection rate limiting (no Redis needed — local window)
-        now = time.monotonic()
-        if now - self._rate_window_start > _RATE_WINDOW_SEC:
-            self._rate_window_start = now
-            self._rate_count = 0
-        self._rate_count += 1
-        if self._rate_count > _RATE_MAX_MSGS:
-            await self.send(text_data=json.dumps({"type": "chat.error", "reason": "rate_limited"}))
+        allowed, _ = await sync_to_async(_CHAT_RATE.consume)(self.user.id)
+        if not allowed:
+            await self.send_message({"type": "chat.error", "reason": "rate_limited"})
+            return
+
+        # Word list changes are picked up in the background; this message uses the current automaton
+        chat_filter.schedule_refresh()
+        text, action = chat_filter.run_filters(self.room, text)
+        if action:
+            await sync_to_async(chat_filter.count)(self.room, action)
+        if text is None:
+            await self.send_message({"type": "chat.error", "reason": "blocked"})
             return
 
         display_name = getattr(self.user, "display_name", None) or self.user.username
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                "type":    "chat.message",
-                "user":    display_name,
-                "user_id": str(self.user.id),
-                "text":    text,
-                "ts":      int(time.time() * 1000),
-            },
-        )
+        message = {
+            "type":    "chat.message",
+            "user":    display_name,
+            "user_id": str(self.user.id),
+            "text":    text,
+            "ts":      int(time.time() * 1000),
+        }
+        # Frames are encoded once here instead of once per room member
+        if self.sharded:
+            await chat_fanout.publish(self.channel_layer, self.room, wire.prepare(message))
+        else:
+            await self.channel_layer.group_send(self.group_name, wire.prepare(message))
+        # Room history + moderation queue in Redis; the DB write happens in tasks.flush_chat_log
+        await sync_to_async(chat_history.record)(self.room, message)
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            "type":    "chat.message",
-            "user":    event["user"],
-            "user_id": event["user_id"],
-            "text":    event["text"],
-            "ts":      event["ts"],
-        }))
+        self.outbox.put(event)
 
 
-class GameConsumer(AsyncWebsocketConsumer):
+class GameConsumer(_WireMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time game events.
 
     URL: ws://<host>/ws/game/<session_id>/
-    Auth: JWT Bearer token via query param ?token=<jwt> or Authorization header.
+    Auth: JWT Bearer token via query param ?token=<jwt>, a "bearer.<jwt>" subprotocol
+    offered next to "ravenna.json.v1"/"ravenna.proto.v1" (the one echoed on accept)
+    or Authorization header (JWTAuthMiddlewareStack; scope["user"] is a SnapshotUser).
 
     Supported incoming messages:
         {"type": "ping"}
         {"type": "player.move", "map_key": str, "x": float, "y": float}
+        {"type": "snapshot.resync"}
 
     Outgoing messages:
         {"type": "pong"}
-        {"type": "world.update", "players": [...]}
+        {"type": "map.full", "map_key": str}
+        {"type": "world.delta", "seq": int, "keyframe": bool, "entered": [...], "moved": [...], "left": [...]}
         {"type": "session.kicked", "reason": str}
         {"type": "notification.new", ...}
     """
@@ -224,22 +333,44 @@ class GameConsumer(AsyncWebsocketConsumer):
 
         self.map_group = f"map_{session.last_map_key}" if session.last_map_key else f"session_{self.session_id}"
         self.user_group = f"user_{self.user.id}"
+        self._interest_groups: set[str] = set()
+        self._cell = None
+        self._deltas = snapshots.DeltaTracker(
+            quantum=getattr(settings, "WORLD_DELTA_QUANTUM", 0.5),
+            min_move=getattr(settings, "WORLD_DELTA_MIN_MOVE", 1.0),
+            keyframe_seconds=getattr(settings, "WORLD_KEYFRAME_SECONDS", 5),
+        )
+        self._deltas.reset(session.last_map_key or "")
+        self._open_send_queue()
+        if session.last_map_key:
+            # Reconnecting into the map the session already holds a slot in
+            self._current_map = session.last_map_key
+            await database_sync_to_async(map_population.admit)(self.session_id, session.last_map_key, force=True)
+            self._cell_size = await database_sync_to_async(interest.cell_size)(session.last_map_key)
 
         await self.channel_layer.group_add(self.map_group, self.channel_name)
         await self.channel_layer.group_add(self.user_group, self.channel_name)
-        await self.accept()
+        await self._accept_negotiated()
+        self._last_db_heartbeat = float("-inf")
+        await self._touch_session_heartbeat()
 
         logger.info("ws.connect user=%s session=%s", self.user.id, self.session_id)
 
     async def disconnect(self, close_code):
+        await self._close_send_queue()
         if hasattr(self, "map_group"):
+            world_ticker.forget_player(self.map_group, str(self.user.id))
             await self.channel_layer.group_discard(self.map_group, self.channel_name)
+            await self._set_interest_groups(set())
+            await sync_to_async(map_population.leave)(self.session_id)
         if hasattr(self, "user_group"):
             await self.channel_layer.group_discard(self.user_group, self.channel_name)
 
         logger.info("ws.disconnect user=%s code=%s", getattr(self.user, "id", "?"), close_code)
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            return
         try:
             data = json.loads(text_data)
         except json.JSONDecodeError:
@@ -251,59 +382,117 @@ class GameConsumer(AsyncWebsocketConsumer):
             await self._handle_ping()
         elif msg_type == "player.move":
             await self._handle_player_move(data)
+        elif msg_type == "snapshot.resync":
+            self._deltas.request_keyframe()
+            self._queue_world_delta()
 
     async def _handle_ping(self):
         await self._touch_session_heartbeat()
-        await self.send(text_data=json.dumps({"type": "pong"}))
+        await self.send_message({"type": "pong"})
 
     async def _handle_player_move(self, data: dict):
         map_key = data.get("map_key", "")
         x = data.get("x", 0)
         y = data.get("y", 0)
+        if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+            return
 
         if map_key and map_key != getattr(self, "_current_map", None):
+            if not await database_sync_to_async(map_population.admit)(self.session_id, map_key):
+                await self.send_message({"type": "map.full", "map_key": map_key})
+                return
             old_group = self.map_group
             self.map_group = f"map_{map_key}"
             self._current_map = map_key
+            world_ticker.forget_player(old_group, str(self.user.id))
             await self.channel_layer.group_discard(old_group, self.channel_name)
             await self.channel_layer.group_add(self.map_group, self.channel_name)
+            await self._set_interest_groups(set())
+            self._cell = None
+            self._deltas.reset(map_key)
+            self._cell_size = await database_sync_to_async(interest.cell_size)(map_key)
             await self._update_session_map(map_key)
 
-        await self.channel_layer.group_send(
+        current_map = getattr(self, "_current_map", "") or ""
+        cell = None
+        if current_map:
+            cell = interest.cell_of(x, y, self._cell_size)
+            if cell != self._cell:
+                self._cell = cell
+                await self._set_interest_groups(
+                    interest.interest_groups(current_map, cell, interest.radius_cells(self._cell_size))
+                )
+                if self._deltas.drop_outside(self._is_visible):
+                    self._queue_world_delta()
+
+        # Broadcast on the next tick to the cell the player is in, merged with the other moves
+        world_ticker.record_move(
+            self.channel_layer,
             self.map_group,
+            current_map,
             {
-                "type": "world.update",
                 "player_id": str(self.user.id),
                 "display_name": getattr(self, "char_name", self.user.display_name),
                 "x": x,
                 "y": y,
-                "map_key": map_key,
             },
+            cell,
         )
 
+    async def _set_interest_groups(self, wanted: set[str]):
+        """Join/leave only the cell groups that changed."""
+        for group in wanted - self._interest_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        for group in self._interest_groups - wanted:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self._interest_groups = wanted
+
+    def _is_visible(self, x, y) -> bool:
+        cell = interest.cell_of(x, y, self._cell_size)
+        return interest.cell_group(self._current_map, cell) in self._interest_groups
+
     async def world_update(self, event):
-        await self.send(text_data=json.dumps({"type": "world.update", **event}))
+        # Updates arriving on the map group (no grid) are always in range
+        visible = self._is_visible if self._interest_groups else None
+        self._deltas.fold(event.get("players", ()), visible, event.get("left", ()))
+        self._queue_world_delta()
+
+    def _queue_world_delta(self):
+        # Built when sent: a backed-up client gets one delta with the latest state
+        self.outbox.put_latest("world", self._deltas.pending)
 
     async def session_kicked(self, event):
-        await self.send(text_data=json.dumps({"type": "session.kicked", "reason": event.get("reason", "")}))
+        await self.send_message({"type": "session.kicked", "reason": event.get("reason", "")})
         await self.close(code=4003)
 
     async def notification_new(self, event):
-        await self.send(text_data=json.dumps({"type": "notification.new", **event}))
+        self.outbox.put({**event, "type": "notification.new"})
 
     @database_sync_to_async
     def _get_active_session(self):
         from apps.game_logic.models import GameSession
-        session = GameSession.objects.filter(id=self.session_id, character__owner=self.user, is_active=True).select_related('character').first()
+        session = GameSession.objects.filter(id=self.session_id, character__owner_id=self.user.id, is_active=True).select_related('character').first()
         if session:
             self.char_name = session.character.name
         return session
 
+    async def _touch_session_heartbeat(self):
+        from apps.game_logic import presence
+
+        if await sync_to_async(presence.touch)(self.session_id):
+            return
+        # No Redis: write the heartbeat to the DB, coalesced per connection
+        interval = getattr(settings, "GAME_SESSION_HEARTBEAT_DB_INTERVAL", 30)
+        if time.monotonic() - self._last_db_heartbeat < interval:
+            return
+        self._last_db_heartbeat = time.monotonic()
+        await self._write_session_heartbeat()
+
     @database_sync_to_async
-    def _touch_session_heartbeat(self):
+    def _write_session_heartbeat(self):
         from apps.game_logic.models import GameSession
-        # auto_now field updates on save(); calling save() with update_fields triggers it
-        GameSession.objects.filter(id=self.session_id).update(is_active=True)
+        # .update() skips auto_now, so last_heartbeat_at is set explicitly
+        GameSession.objects.filter(id=self.session_id).update(last_heartbeat_at=timezone.now())
 
     @database_sync_to_async
     def _update_session_map(self, map_key: str):
@@ -0,0 +1,282 @@
+"""
+Fila durável de ingestão de eventos do servidor de jogo (Redis Streams).
+
+Com `GAME_EVENTS_ASYNC=True`, os webhooks (`/events/` e `/events/batch/`) apenas
+verificam o HMAC, anexam o evento a um stream Redis e respondem `202`. Workers
+consumidores drenam os streams e aplicam os eventos via
+`GameLogicService.apply_game_events`.
+
+## Particionamento
+Os eventos são distribuídos em `GAME_EVENTS_STREAM_PARTITIONS` streams
+(`game:events:stream:<n>`) pelo hash do `player_id`. Todos os personagens de um
+jogador caem na mesma partição e cada partição é drenada por um único consumidor
+por vez (lock `game:events:lock:<n>`), o que preserva a ordem por personagem.
+
+O lock tem TTL de 30 s e é renovado a cada rodada, antes de aplicar e antes do
+`XACK`; um consumidor que perdeu o lock não confirma nada (o novo dono recebe os
+eventos de novo e o ledger de idempotência os trata como duplicados).
+
+## Confirmação, retentativas e dead-letter
+- Consumer group `game-events`; eventos aplicados com sucesso recebem `XACK`.
+- Eventos com falha ficam pendentes e são reclamados (`XAUTOCLAIM`) depois de
+  `GAME_EVENTS_RETRY_IDLE_MS`.
+- Os eventos seguintes do mesmo personagem não são aplicados enquanto houver um
+  anterior pendente: ficam retidos (`held`), sem `XACK`, e voltam junto com ele,
+  na ordem do stream.
+- Após `GAME_EVENTS_MAX_DELIVERIES` entregas o evento vai para a lista
+  `game:events:dead` e é confirmado.
+
+## Consumo
+- `python manage.py consume_game_events` — worker de longa duração (um por conjunto de partições).
+- `tasks.drain_game_event_streams` — drenagem periódica via Celery Beat (rede de segurança).
+
+## Métricas
+`stream_metrics()` retorna tamanho, pendentes e lag de cada partição e o tamanho
+da dead-letter; exposto em `GET /api/v1/game-logic/events/metrics/` (admin).
+"""
+import json
+import logging
+import os
+import socket
+import zlib
+
+from django.conf import settings
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY_PREFIX = "game:events:stream:"
+LOCK_KEY_PREFIX   = "game:events:lock:"
+DEAD_LETTER_KEY   = "game:events:dead"
+CONSUMER_GROUP    = "game-events"
+_LOCK_TTL_SEC     = 30
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def _partitions() -> int:
+    return max(1, int(getattr(settings, "GAME_EVENTS_STREAM_PARTITIONS", 8)))
+
+
+def partition_for(player_id) -> int:
+    """Stable partition index for a player (crc32, independent of PYTHONHASHSEED)."""
+    return zlib.crc32(str(player_id).encode()) % _partitions()
+
+
+def stream_key(partition: int) -> str:
+    return f"{STREAM_KEY_PREFIX}{partition}"
+
+
+def default_consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _ensure_group(conn, key: str) -> None:
+    try:
+        conn.xgroup_create(key, CONSUMER_GROUP, id="0", mkstream=True)
+    except Exception as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def enqueue_game_events(events: list[dict]) -> bool:
+    """Append events to their partition streams in one pipeline.
+
+    Returns False when Redis is unavailable so the caller can fall back to
+    synchronous processing instead of dropping events.
+    """
+    maxlen = int(getattr(settings, "GAME_EVENTS_STREAM_MAXLEN", 100_000))
+    try:
+        conn = _get_conn()
+        pipeline = conn.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(
+                stream_key(partition_for(event.get("player_id", ""))),
+                {"payload": json.dumps(event)},
+                maxlen=maxlen,
+                approximate=True,
+            )
+        pipeline.execute()
+        return True
+    except Exception as exc:
+        logger.warning("enqueue_game_events: Redis unavailable (%s), processing synchronously", exc)
+        return False
+
+
+def _acquire_lock(conn, partition: int, consumer: str) -> bool:
+    return bool(conn.set(f"{LOCK_KEY_PREFIX}{partition}", consumer, nx=True, ex=_LOCK_TTL_SEC))
+
+
+def _renew_lock(conn, partition: int, consumer: str) -> bool:
+    """Extend the partition lock if `consumer` still holds it; False once it was lost."""
+    key = f"{LOCK_KEY_PREFIX}{partition}"
+    with conn.pipeline() as pipeline:
+        try:
+            pipeline.watch(key)
+            owner = pipeline.get(key)
+            if owner is None or owner.decode() != consumer:
+                return False
+            pipeline.multi()
+            pipeline.expire(key, _LOCK_TTL_SEC)
+            pipeline.execute()
+        except WatchError:
+            return False
+    return True
+
+
+def _release_lock(conn, partition: int, consumer: str) -> None:
+    key = f"{LOCK_KEY_PREFIX}{partition}"
+    owner = conn.get(key)
+    if owner is not None and owner.decode() == consumer:
+        conn.delete(key)
+
+
+def _dead_letter_exhausted(conn, key: str, partition: int, count: int) -> int:
+    """Move entries delivered too many times to the dead-letter list."""
+    max_deliveries = int(getattr(settings, "GAME_EVENTS_MAX_DELIVERIES", 5))
+    moved = 0
+    for pending in conn.xpending_range(key, CONSUMER_GROUP, min="-", max="+", count=count):
+        if pending["times_delivered"] < max_deliveries:
+            continue
+        msg_id = pending["message_id"]
+        entries = conn.xrange(key, min=msg_id, max=msg_id)
+        payload = entries[0][1].get(b"payload", b"{}").decode() if entries else "{}"
+        conn.lpush(DEAD_LETTER_KEY, json.dumps({
+            "id":        msg_id.decode() if isinstance(msg_id, bytes) else msg_id,
+            "partition": partition,
+            "event":     json.loads(payload),
+        }))
+        conn.xack(key, CONSUMER_GROUP, msg_id)
+        conn.xdel(key, msg_id)
+        moved += 1
+    if moved:
+        logger.error("game event stream %s: moved %s events to dead-letter", partition, moved)
+    return moved
+
+
+def _player_of(fields: dict) -> str:
+    return str(json.loads(fields[b"payload"].decode()).get("player_id", ""))
+
+
+def _waiting_players(conn, key: str, batch_ids: set, count: int) -> dict:
+    """{player_id: oldest msg id} of pending entries that are not in this round's batch."""
+    waiting = [
+        p["message_id"] for p in conn.xpending_range(key, CONSUMER_GROUP, min="-", max="+", count=count)
+        if p["message_id"] not in batch_ids
+    ]
+    players: dict = {}
+    for msg_id in waiting:
+        for entry_id, fields in conn.xrange(key, min=msg_id, max=msg_id):
+            players.setdefault(_player_of(fields), _stream_id(entry_id))
+    return players
+
+
+def _stream_id(msg_id) -> tuple[int, int]:
+    msg_id = msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+    ms, _, seq = msg_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def drain_partition(partition: int, consumer: str | None = None, count: int = 200, block_ms: int | None = None) -> dict:
+    """Process one round of a partition: dead-letter, reclaim stale entries, read new ones.
+
+    Returns counters for the round; `skipped=True` when another consumer holds the partition.
+    """
+    from apps.game_logic.services import GameLogicService
+
+    consumer = consumer or default_consumer_name()
+    conn = _get_conn()
+    key = stream_key(partition)
+    if not _acquire_lock(conn, partition, consumer):
+        return {"partition": partition, "skipped": True}
+
+    try:
+        _ensure_group(conn, key)
+        dead = _dead_letter_exhausted(conn, key, partition, count)
+
+        retry_idle = int(getattr(settings, "GAME_EVENTS_RETRY_IDLE_MS", 30_000))
+        reclaimed = conn.xautoclaim(key, CONSUMER_GROUP, consumer, min_idle_time=retry_idle, start_id="0-0", count=count)[1]
+        fresh = conn.xreadgroup(CONSUMER_GROUP, consumer, {key: ">"}, count=count, block=block_ms)
+        entries = [e for e in reclaimed if e and e[1]]
+        for _, stream_entries in fresh or []:
+            entries.extend(stream_entries)
+
+        if not entries:
+            return {"partition": partition, "processed": 0, "failed": 0, "held": 0, "dead_lettered": dead}
+
+        # An earlier entry of the same player still waits for its retry: hold the later ones
+        waiting = _waiting_players(conn, key, {msg_id for msg_id, _ in entries}, count)
+        held = [
+            (msg_id, fields) for msg_id, fields in entries
+            if _player_of(fields) in waiting and waiting[_player_of(fields)] < _stream_id(msg_id)
+        ]
+        entries = [entry for entry in entries if entry not in held]
+
+        if not _renew_lock(conn, partition, consumer):
+            logger.warning("game event stream %s: lock lost before applying, leaving entries pending", partition)
+            return {"partition": partition, "skipped": True}
+
+        events = [json.loads(fields[b"payload"].decode()) for _, fields in entries]
+        results = GameLogicService.apply_game_events(events, stop_on_failure=True)
+
+        acked = [msg_id for (msg_id, _), result in zip(entries, results) if result["ok"]]
+        if acked and not _renew_lock(conn, partition, consumer):
+            # The new owner redelivers them; the idempotency ledger turns that into duplicates
+            logger.warning("game event stream %s: lock lost before XACK, leaving %s entries pending", partition, len(acked))
+            acked = []
+        if acked:
+            conn.xack(key, CONSUMER_GROUP, *acked)
+            conn.xdel(key, *acked)
+        failed = 0
+        held_ids = [msg_id for msg_id, _ in held]
+        for (msg_id, _), result in zip(entries, results):
+            if result.get("skipped"):
+                held_ids.append(msg_id)
+            elif not result["ok"]:
+                failed += 1
+                logger.warning("game event %s on partition %s failed: %s", msg_id, partition, result.get("error"))
+        if held_ids:
+            # Held entries were not tried; don't let them count towards GAME_EVENTS_MAX_DELIVERIES
+            conn.xclaim(key, CONSUMER_GROUP, consumer, min_idle_time=0, message_ids=held_ids, retrycount=0, justid=True)
+        return {
+            "partition": partition, "processed": len(acked), "failed": failed,
+            "held": len(held_ids), "dead_lettered": dead,
+        }
+    finally:
+        _release_lock(conn, partition, consumer)
+
+
+def drain_all(consumer: str | None = None, count: int = 200) -> dict:
+    """Drain every partition once without blocking."""
+    totals = {"processed": 0, "failed": 0, "held": 0, "dead_lettered": 0, "skipped": 0}
+    for partition in range(_partitions()):
+        round_ = drain_partition(partition, consumer=consumer, count=count)
+        if round_.get("skipped"):
+            totals["skipped"] += 1
+            continue
+        for field in ("processed", "failed", "held", "dead_lettered"):
+            totals[field] += round_[field]
+    return totals
+
+
+def stream_metrics() -> dict:
+    """Per-partition length, pending count and consumer-group lag, plus dead-letter size."""
+    conn = _get_conn()
+    partitions = []
+    for partition in range(_partitions()):
+        key = stream_key(partition)
+        _ensure_group(conn, key)
+        group = next(
+            (g for g in conn.xinfo_groups(key) if (g["name"].decode() if isinstance(g["name"], bytes) else g["name"]) == CONSUMER_GROUP),
+            {},
+        )
+        partitions.append({
+            "partition": partition,
+            "length":    conn.xlen(key),
+            "pending":   group.get("pending", 0),
+            "lag":       group.get("lag"),
+        })
+    return {"partitions": partitions, "dead_letters": conn.llen(DEAD_LETTER_KEY)}
@@ -0,0 +1,81 @@
+"""
+Ledger de idempotência dos eventos do webhook do servidor de jogo.
+
+Cada evento pode trazer um `event_id` (ou o header `Idempotency-Key` no endpoint
+de evento único). O primeiro processamento reivindica a chave no Redis com
+`SET game:events:seen:{event_id} NX EX` e grava o resultado ao final; um reenvio
+encontra a chave e recebe o resultado original em O(1), sem reaplicar o evento.
+
+- Enquanto o evento está em processamento a chave vale `"pending"` com TTL curto
+  (`GAME_EVENTS_DEDUPE_PENDING_TTL`), para que um worker morto não bloqueie
+  os reenvios para sempre. Um reenvio que chega nesse intervalo recebe
+  `IN_PROGRESS` (`ok: False`): o webhook responde `409` e a fila não dá `XACK`,
+  então o evento é tentado de novo em vez de ser perdido.
+- Quem reivindicou a chave a libera (`release`) se o evento falhar ou se a
+  transação que o envolve for desfeita.
+- Resultados ficam `GAME_EVENTS_DEDUPE_TTL` segundos (padrão 24 h).
+- Eventos que concedem recompensas (`REWARD_EVENTS`) também são registrados em
+  `ProcessedGameEvent`, na mesma transação que os aplica — o Redis pode estar
+  fora ou ter expirado a chave e ainda assim o evento não é aplicado duas vezes.
+
+Sem Redis, `claim` sempre retorna None (evento novo) e só o ledger do banco vale.
+"""
+import json
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "game:events:seen:"
+PENDING = "pending"
+IN_PROGRESS = {"ok": False, "in_progress": True, "error": "event in progress, retry later"}
+
+# Events that grant XP, items or quest rewards — deduplicated in the DB as well
+REWARD_EVENTS = frozenset({"xp_gained", "item_collected", "quest_complete"})
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def _key(event_id: str) -> str:
+    return f"{KEY_PREFIX}{event_id}"
+
+
+def claim(event_id: str) -> dict | None:
+    """Reserve `event_id`. Returns None for a new event, else the recorded result."""
+    pending_ttl = int(getattr(settings, "GAME_EVENTS_DEDUPE_PENDING_TTL", 60))
+    try:
+        conn = _get_conn()
+        if conn.set(_key(event_id), PENDING, nx=True, ex=pending_ttl):
+            return None
+        raw = conn.get(_key(event_id))
+    except Exception as exc:
+        logger.debug("idempotency claim: Redis unavailable (%s)", exc)
+        return None
+    if raw is None:
+        # Expired between SET NX and GET — treat as new
+        return None
+    raw = raw.decode() if isinstance(raw, bytes) else raw
+    if raw == PENDING:
+        return dict(IN_PROGRESS)
+    return json.loads(raw)
+
+
+def record(event_id: str, result: dict) -> None:
+    """Store the final result of `event_id` for duplicate deliveries."""
+    ttl = int(getattr(settings, "GAME_EVENTS_DEDUPE_TTL", 86_400))
+    try:
+        _get_conn().set(_key(event_id), json.dumps(result), ex=ttl)
+    except Exception as exc:
+        logger.debug("idempotency record: Redis unavailable (%s)", exc)
+
+
+def release(event_id: str) -> None:
+    """Drop a pending claim so that a retry of a failed event is processed again."""
+    try:
+        _get_conn().delete(_key(event_id))
+    except Exception as exc:
+        logger.debug("idempotency release: Redis unavailable (%s)", exc)
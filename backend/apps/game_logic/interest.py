@@ -0,0 +1,66 @@
+"""
+Gerenciamento de interesse em grade para os `world.update`.
+
+Cada mapa é dividido em células quadradas de `MapData.cell_size` unidades. Cada
+célula tem um grupo de canais `map_<key>.<cx>.<cy>`:
+
+- o tick do mapa (`world_ticker`) publica os jogadores que se moveram no grupo
+  da célula onde cada um está;
+- cada conexão assina as células dentro de `WORLD_INTEREST_RADIUS` unidades
+  (arredondado para células inteiras, ou seja, um quadrado de
+  `(2r + 1)²` células) ao redor do próprio jogador.
+
+Ao cruzar uma célula, a conexão só entra nos grupos novos e sai dos que ficaram
+fora do raio (diferença entre os conjuntos de `interest_groups`). Assim a banda
+por cliente depende da densidade ao redor do jogador, não da população do mapa.
+"""
+import math
+
+CELL_SIZE_CACHE_KEY = "game:map:cell_size"
+CELL_SIZE_CACHE_TTL = 3600
+DEFAULT_CELL_SIZE = 128
+
+
+def cell_sizes() -> dict[str, int]:
+    """{map_key: cell_size} of enabled maps, cached until a MapData row changes."""
+    from django.core.cache import cache
+    from apps.game_data.models import MapData
+
+    result = cache.get(CELL_SIZE_CACHE_KEY)
+    if result is None:
+        result = dict(MapData.objects.filter(is_enabled=True).values_list("map_key", "cell_size"))
+        cache.set(CELL_SIZE_CACHE_KEY, result, timeout=CELL_SIZE_CACHE_TTL)
+    return result
+
+
+def invalidate_cell_sizes() -> None:
+    from django.core.cache import cache
+    cache.delete(CELL_SIZE_CACHE_KEY)
+
+
+def cell_size(map_key: str) -> int:
+    return cell_sizes().get(map_key) or DEFAULT_CELL_SIZE
+
+
+def cell_of(x, y, size: int) -> tuple[int, int]:
+    return math.floor(float(x) / size), math.floor(float(y) / size)
+
+
+def cell_group(map_key: str, cell: tuple[int, int]) -> str:
+    return f"map_{map_key}.{cell[0]}.{cell[1]}"
+
+
+def radius_cells(size: int) -> int:
+    from django.conf import settings
+    radius = getattr(settings, "WORLD_INTEREST_RADIUS", DEFAULT_CELL_SIZE)
+    return max(1, math.ceil(radius / size))
+
+
+def cells_around(cell: tuple[int, int], radius: int) -> set[tuple[int, int]]:
+    cx, cy = cell
+    return {(cx + dx, cy + dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)}
+
+
+def interest_groups(map_key: str, cell: tuple[int, int], radius: int) -> set[str]:
+    """Cell groups a player standing in `cell` subscribes to."""
+    return {cell_group(map_key, c) for c in cells_around(cell, radius)}
@@ -0,0 +1,389 @@
+"""
+Rankings do jogo em Redis Sorted Sets.
+
+## Boards
+| Board             | Chave                                   | Score                          |
+|-------------------|-----------------------------------------|--------------------------------|
+| `global`          | `LEADERBOARD_CACHE_KEY` (`game:leaderboard`) | `level * 1_000_000 + experience` |
+| `faction:<f>`     | `game:leaderboard:faction:<f>`          | idem                           |
+| `class:<c>`       | `game:leaderboard:class:<c>`            | idem                           |
+| `pvp`             | `game:leaderboard:pvp`                  | `pvp_kills`                    |
+
+O membro de cada sorted set é o `character_id` (estável); o nome exibido fica no
+hash `game:leaderboard:names` e é resolvido em lote (HMGET) na leitura, então um
+rename não deixa entrada duplicada.
+
+- `update_character` grava todos os boards do personagem em um único pipeline.
+- `get_page` pagina por offset (ZREVRANGE + ZCARD).
+- `get_rank` devolve a posição do personagem e seus vizinhos via ZREVRANK (O(log N)).
+- `full_rebuild` monta todos os boards em chaves temporárias e troca com RENAME
+  (MULTI), então leitores nunca veem um ranking pela metade.
+
+Sem Redis, as mesmas operações rodam sobre `MemoryBackend`: um `RankedSet` por
+board no processo (ZREVRANK em O(log N) e ZREVRANGE em O(log N + k), com uma
+árvore de Fenwick sobre os buckets, em vez de ordenar o board a cada leitura), com checkpoint periódico no cache do Django
+(`LEADERBOARD_FALLBACK_CHECKPOINT_SECONDS`).
+
+O fallback é de processo único e não equivale aos sorted sets do Redis: cada
+worker só vê as atualizações que ele mesmo aplicou, então com vários workers os
+rankings divergem entre eles. Cada processo grava o próprio checkpoint
+(`game:leaderboard:checkpoint:<worker>`, `LEADERBOARD_FALLBACK_WORKER_ID`, por
+padrão `<hostname>:<pid>`), sem sobrescrever o dos outros. Serve para
+desenvolvimento e para atravessar uma queda do Redis.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from apps.game_logic.ranked_set import RankedSet
+
+logger = logging.getLogger(__name__)
+
+NAMES_KEY = "game:leaderboard:names"
+BOARD_PREFIX = "game:leaderboard:"
+
+FACTIONS = ("vanguarda", "legiao")
+CLASSES = ("paladino", "mage", "archer", "eldari", "cavaleiro_dragao", "ignis", "shadow", "necromante")
+
+
+def global_key() -> str:
+    return getattr(settings, "LEADERBOARD_CACHE_KEY", "game:leaderboard")
+
+
+def board_key(board: str) -> str:
+    """Return the sorted-set key of a board name; raises ValueError for unknown boards."""
+    if board == "global":
+        return global_key()
+    if board == "pvp":
+        return f"{BOARD_PREFIX}pvp"
+    kind, _, value = board.partition(":")
+    if kind == "faction" and value in FACTIONS:
+        return f"{BOARD_PREFIX}faction:{value}"
+    if kind == "class" and value in CLASSES:
+        return f"{BOARD_PREFIX}class:{value}"
+    raise ValueError(f"Unknown leaderboard '{board}'")
+
+
+def progress_score(stats) -> int:
+    return stats.level * 1_000_000 + stats.experience
+
+
+def character_entries(character, stats) -> list[tuple[str, str, int]]:
+    """(key, member, score) for every board the character belongs to."""
+    member = str(character.id)
+    score = progress_score(stats)
+    entries = [(global_key(), member, score)]
+    if character.faction in FACTIONS:
+        entries.append((board_key(f"faction:{character.faction}"), member, score))
+    if character.character_class in CLASSES:
+        entries.append((board_key(f"class:{character.character_class}"), member, score))
+    entries.append((board_key("pvp"), member, stats.pvp_kills))
+    return entries
+
+
+def all_board_keys() -> list[str]:
+    return (
+        [global_key(), board_key("pvp")]
+        + [board_key(f"faction:{f}") for f in FACTIONS]
+        + [board_key(f"class:{c}") for c in CLASSES]
+    )
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class RedisBackend:
+    """Sorted sets and the name hash in Redis."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, entries, names: dict, removals=()) -> None:
+        pipeline = self.conn.pipeline(transaction=False)
+        for key, member in removals:
+            pipeline.zrem(key, member)
+        for key, member, score in entries:
+            pipeline.zadd(key, {member: score})
+        if names:
+            pipeline.hset(NAMES_KEY, mapping=names)
+        pipeline.execute()
+
+    def remove(self, member: str) -> None:
+        pipeline = self.conn.pipeline(transaction=False)
+        for key in all_board_keys():
+            pipeline.zrem(key, member)
+        pipeline.hdel(NAMES_KEY, member)
+        pipeline.execute()
+
+    def rebuild(self, rows, chunk_size: int) -> int:
+        """Build every board into temporary keys, then swap them in with one MULTI of RENAMEs."""
+        suffix = f":rebuild:{uuid.uuid4().hex}"
+        touched: set[str] = set()
+        count = 0
+        pipeline = self.conn.pipeline(transaction=False)
+        try:
+            for character, stats in rows:
+                for key, member, score in character_entries(character, stats):
+                    pipeline.zadd(key + suffix, {member: score})
+                    touched.add(key)
+                pipeline.hset(NAMES_KEY + suffix, str(character.id), character.name)
+                touched.add(NAMES_KEY)
+                count += 1
+                if count % chunk_size == 0:
+                    pipeline.execute()
+            pipeline.execute()
+
+            swap = self.conn.pipeline(transaction=True)
+            for key in all_board_keys() + [NAMES_KEY]:
+                if key in touched:
+                    swap.rename(key + suffix, key)
+                else:
+                    swap.delete(key)
+            swap.execute()
+        except Exception:
+            if touched:
+                self.conn.delete(*[key + suffix for key in touched])
+            raise
+        return count
+
+    def range(self, key: str, start: int, stop: int) -> list[tuple[str, int]]:
+        return [
+            (m.decode() if isinstance(m, bytes) else m, int(s))
+            for m, s in self.conn.zrevrange(key, start, stop, withscores=True)
+        ]
+
+    def rank(self, key: str, member: str) -> int | None:
+        return self.conn.zrevrank(key, member)
+
+    def count(self, key: str) -> int:
+        return self.conn.zcard(key)
+
+    def names(self, members: list[str]) -> dict[str, str]:
+        if not members:
+            return {}
+        values = self.conn.hmget(NAMES_KEY, members)
+        return {
+            m: (v.decode() if isinstance(v, bytes) else v)
+            for m, v in zip(members, values) if v is not None
+        }
+
+
+class MemoryBackend:
+    """In-process fallback: one RankedSet per board, checkpointed to the Django cache.
+
+    Updates are serialized by a lock, so concurrent requests of the same process
+    never overwrite each other. Single-process only: other workers never see
+    these updates. Each process checkpoints under its own key, so a worker
+    restarted with the same `LEADERBOARD_FALLBACK_WORKER_ID` starts from its last
+    snapshot instead of an empty board.
+    """
+
+    CHECKPOINT_KEY_PREFIX = "game:leaderboard:checkpoint:"
+
+    @property
+    def checkpoint_key(self) -> str:
+        worker = getattr(settings, "LEADERBOARD_FALLBACK_WORKER_ID", "") or f"{socket.gethostname()}:{os.getpid()}"
+        return f"{self.CHECKPOINT_KEY_PREFIX}{worker}"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the in-process boards; the next access restores the checkpoint."""
+        with self._lock:
+            self._boards: dict[str, RankedSet] = {}
+            self._names: dict[str, str] = {}
+            self._restored = False
+            self._dirty = False
+            self._last_checkpoint = time.monotonic()
+
+    def _ensure_restored(self) -> None:
+        if self._restored:
+            return
+        from django.core.cache import cache
+        snapshot = cache.get(self.checkpoint_key) or {}
+        for key, items in snapshot.get("boards", {}).items():
+            self._boards[key] = RankedSet(items)
+        self._names.update(snapshot.get("names", {}))
+        self._restored = True
+
+    def _board(self, key: str) -> RankedSet:
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = RankedSet()
+        return board
+
+    def checkpoint(self) -> None:
+        """Write a snapshot of every board to the Django cache."""
+        from django.core.cache import cache
+        with self._lock:
+            self._ensure_restored()
+            snapshot = {
+                "boards": {key: board.to_dict() for key, board in self._boards.items()},
+                "names": dict(self._names),
+            }
+            self._dirty = False
+            self._last_checkpoint = time.monotonic()
+        cache.set(self.checkpoint_key, snapshot, timeout=None)
+
+    def _changed(self) -> None:
+        self._dirty = True
+        interval = getattr(settings, "LEADERBOARD_FALLBACK_CHECKPOINT_SECONDS", 30)
+        if time.monotonic() - self._last_checkpoint >= interval:
+            self.checkpoint()
+
+    def write(self, entries, names: dict, removals=()) -> None:
+        with self._lock:
+            self._ensure_restored()
+            for key, member in removals:
+                self._board(key).discard(member)
+            for key, member, score in entries:
+                self._board(key).add(member, score)
+            self._names.update(names)
+            self._changed()
+
+    def remove(self, member: str) -> None:
+        with self._lock:
+            self._ensure_restored()
+            for key in all_board_keys():
+                self._board(key).discard(member)
+            self._names.pop(member, None)
+            self._changed()
+
+    def rebuild(self, rows, chunk_size: int) -> int:
+        items: dict[str, dict] = {key: {} for key in all_board_keys()}
+        names: dict[str, str] = {}
+        count = 0
+        for character, stats in rows:
+            for key, member, score in character_entries(character, stats):
+                items[key][member] = score
+            names[str(character.id)] = character.name
+            count += 1
+        boards = {key: RankedSet(values) for key, values in items.items()}
+        with self._lock:
+            self._boards, self._names, self._restored = boards, names, True
+        self.checkpoint()
+        return count
+
+    def range(self, key: str, start: int, stop: int) -> list[tuple[str, int]]:
+        with self._lock:
+            self._ensure_restored()
+            return self._board(key).range(start, stop)
+
+    def rank(self, key: str, member: str) -> int | None:
+        with self._lock:
+            self._ensure_restored()
+            return self._board(key).rank(member)
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            self._ensure_restored()
+            return len(self._board(key))
+
+    def names(self, members: list[str]) -> dict[str, str]:
+        with self._lock:
+            self._ensure_restored()
+            return {m: self._names[m] for m in members if m in self._names}
+
+
+_memory_backend = MemoryBackend()
+
+
+def _redis_backend() -> RedisBackend:
+    from django_redis import get_redis_connection
+    return RedisBackend(get_redis_connection("default"))
+
+
+def _fallback_backend() -> MemoryBackend:
+    return _memory_backend
+
+
+def _run(operation):
+    """Run `operation(backend)` on Redis, falling back when Redis is unavailable."""
+    try:
+        return operation(_redis_backend())
+    except Exception as exc:
+        logger.debug("leaderboard: Redis unavailable (%s), using fallback", exc)
+        return operation(_fallback_backend())
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def update_character(character, stats) -> None:
+    """Write every board of a character and its display name in one round trip."""
+    entries = character_entries(character, stats)
+    # Members written by the old "user_id:name" scheme are dropped on the way;
+    # ones left under a since-changed name go at the next full_rebuild
+    legacy = [(global_key(), f"{character.owner_id}:{character.name}")]
+    _run(lambda backend: backend.write(entries, {str(character.id): character.name}, legacy))
+
+
+def write_entries(entries: list[tuple[str, str, int]], names: dict[str, str]) -> None:
+    """Write precomputed (key, member, score) entries and names (used by the rebuild task)."""
+    _run(lambda backend: backend.write(entries, names))
+
+
+def remove_character(character_id) -> None:
+    _run(lambda backend: backend.remove(str(character_id)))
+
+
+def full_rebuild(rows_factory, chunk_size: int = 500) -> int:
+    """Replace every board atomically with the rows yielded by `rows_factory()`.
+
+    Readers keep seeing the previous boards until the swap, and characters that
+    are gone from the DB (deleted, deactivated, legacy members) disappear.
+    `rows_factory` is called again if the Redis attempt fails and the fallback runs.
+    """
+    return _run(lambda backend: backend.rebuild(rows_factory(), chunk_size))
+
+
+def _decorate(backend, rows: list[tuple[str, int]], first_rank: int) -> list[dict]:
+    names = backend.names([member for member, _ in rows])
+    return [
+        {
+            "rank": first_rank + i,
+            "character_id": member,
+            "display_name": names.get(member, member),
+            "score": score,
+        }
+        for i, (member, score) in enumerate(rows)
+    ]
+
+
+def get_page(board: str = "global", offset: int = 0, limit: int = 10) -> dict:
+    """Return one page of a board: {"results", "total", "next_offset"}."""
+    key = board_key(board)
+    offset = max(0, int(offset))
+    limit = max(1, int(limit))
+
+    def operation(backend):
+        rows = backend.range(key, offset, offset + limit - 1)
+        total = backend.count(key)
+        next_offset = offset + len(rows) if offset + len(rows) < total else None
+        return {"results": _decorate(backend, rows, offset + 1), "total": total, "next_offset": next_offset}
+
+    return _run(operation)
+
+
+def get_rank(board: str, character_id, neighbours: int = 5) -> dict | None:
+    """Rank of a character plus `neighbours` entries above and below, or None if unranked."""
+    key = board_key(board)
+    member = str(character_id)
+    neighbours = max(0, int(neighbours))
+
+    def operation(backend):
+        rank = backend.rank(key, member)
+        if rank is None:
+            return None
+        start = max(0, rank - neighbours)
+        rows = backend.range(key, start, rank + neighbours)
+        entries = _decorate(backend, rows, start + 1)
+        own = next(e for e in entries if e["character_id"] == member)
+        return {"rank": rank + 1, "score": own["score"], "total": backend.count(key), "entries": entries}
+
+    return _run(operation)
@@ -0,0 +1,46 @@
+"""
+Management command: long-running consumer for the game event streams.
+
+Each worker drains the partitions it is given; a per-partition lock guarantees
+a single active consumer per partition, so per-character ordering is kept even
+when workers overlap.
+
+Usage:
+    python manage.py consume_game_events                    # all partitions
+    python manage.py consume_game_events --partitions 0,1   # subset (one worker per subset)
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.game_logic.event_queue import default_consumer_name, drain_partition
+
+
+class Command(BaseCommand):
+    help = "Consume game-server events from the Redis streams and apply them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partitions", default="", help="Comma-separated partition indexes (default: all).")
+        parser.add_argument("--count", type=int, default=200, help="Max entries read per partition per round.")
+        parser.add_argument("--block-ms", type=int, default=1000, help="XREADGROUP block timeout in milliseconds.")
+        parser.add_argument("--once", action="store_true", help="Run a single round and exit.")
+
+    def handle(self, *args, **options):
+        total = int(getattr(settings, "GAME_EVENTS_STREAM_PARTITIONS", 8))
+        raw = options["partitions"]
+        partitions = [int(p) for p in raw.split(",") if p.strip()] if raw else list(range(total))
+        consumer = default_consumer_name()
+        # Blocking on every partition would serialise the round; only block when idle
+        block_ms = options["block_ms"] if len(partitions) == 1 else None
+
+        self.stdout.write(f"Consuming partitions {partitions} as {consumer}")
+        while True:
+            processed = 0
+            for partition in partitions:
+                round_ = drain_partition(partition, consumer=consumer, count=options["count"], block_ms=block_ms)
+                processed += round_.get("processed", 0) + round_.get("failed", 0)
+            if options["once"]:
+                break
+            if not processed and block_ms is None:
+                time.sleep(options["block_ms"] / 1000)
@@ -0,0 +1,216 @@
+"""
+Índice de população online por mapa, com admissão atômica contra `MapData.max_players`.
+
+## Estrutura Redis
+| Chave                     | Tipo | Conteúdo                                 |
+|---------------------------|------|------------------------------------------|
+| `game:map:session`        | hash | `session_id` → `map_key` atual           |
+| `game:map:members:<map>`  | set  | `session_id` das sessões no mapa         |
+| `game:map:population`     | hash | `map_key` → número de sessões no mapa    |
+
+`admit` e `leave` são scripts Lua: a verificação de lotação, a saída do mapa
+anterior e a entrada no novo acontecem numa única operação, então dois jogadores
+disputando a última vaga não estouram o limite. Todas as chaves tocadas vão em
+`KEYS`: o Python lê o mapa atual da sessão antes, e o script confere que ele não
+mudou (senão devolve `-1` e a chamada é repetida). `populations()` é um HGETALL.
+
+A admissão é opcional por mapa: só mapas habilitados em `MapData`
+(`capacities()`) são contados. Para qualquer outro `map_key`, `admit` apenas
+tira a sessão do mapa anterior e aceita, sem criar chaves para ele — o cliente
+não cria chaves arbitrárias. `has_room` é a verificação somente leitura usada
+dentro de transações; a admissão em si (`admit`) roda depois do commit.
+
+Mantido por `GameConsumer` (connect / player.move / disconnect), por
+`start_game_session`/`end_game_session` e por `cleanup_stale_game_sessions`.
+
+Sem Redis, a admissão e as contagens caem para uma consulta em
+`GameSession.last_map_key` das sessões ativas.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+SESSION_MAP_KEY = "game:map:session"
+MEMBERS_PREFIX = "game:map:members:"
+POPULATION_KEY = "game:map:population"
+CAPACITY_CACHE_KEY = "game:map:capacity"
+CAPACITY_CACHE_TTL = 3600
+
+_SCRIPT_ATTEMPTS = 3
+
+# KEYS: session hash, population hash, members of the new map, members of the current map
+# ARGV: session_id, map_key, capacity (0 = unlimited), current map read beforehand ("" = none)
+# Returns 1 admitted, 0 full, -1 the current map changed since it was read
+_ADMIT_LUA = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if (current or '') ~= ARGV[4] then
+    return -1
+end
+if current == ARGV[2] then
+    return 1
+end
+local capacity = tonumber(ARGV[3])
+if capacity > 0 and redis.call('SCARD', KEYS[3]) >= capacity then
+    return 0
+end
+if current then
+    if redis.call('SREM', KEYS[4], ARGV[1]) == 1 then
+        redis.call('HINCRBY', KEYS[2], current, -1)
+    end
+end
+if redis.call('SADD', KEYS[3], ARGV[1]) == 1 then
+    redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+return 1
+"""
+
+# KEYS: session hash, population hash, members of each session's current map
+# ARGV: session_id..., then the current map of each one, read beforehand
+# Returns the sessions removed, or -1 when a current map changed since it was read
+_LEAVE_LUA = """
+local n = #KEYS - 2
+for i = 1, n do
+    if redis.call('HGET', KEYS[1], ARGV[i]) ~= ARGV[n + i] then
+        return -1
+    end
+end
+for i = 1, n do
+    local current = ARGV[n + i]
+    if redis.call('SREM', KEYS[2 + i], ARGV[i]) == 1 then
+        if redis.call('HINCRBY', KEYS[2], current, -1) <= 0 then
+            redis.call('HDEL', KEYS[2], current)
+        end
+    end
+    redis.call('HDEL', KEYS[1], ARGV[i])
+end
+return n
+"""
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def capacities() -> dict[str, int]:
+    """{map_key: max_players} of enabled maps, cached until a MapData row changes."""
+    from django.core.cache import cache
+    from apps.game_data.models import MapData
+
+    result = cache.get(CAPACITY_CACHE_KEY)
+    if result is None:
+        result = dict(MapData.objects.filter(is_enabled=True).values_list("map_key", "max_players"))
+        cache.set(CAPACITY_CACHE_KEY, result, timeout=CAPACITY_CACHE_TTL)
+    return result
+
+
+def invalidate_capacities() -> None:
+    from django.core.cache import cache
+    cache.delete(CAPACITY_CACHE_KEY)
+
+
+def _db_population() -> dict[str, int]:
+    from django.db.models import Count
+    from apps.game_logic.models import GameSession
+
+    qs = GameSession.objects.filter(is_active=True).exclude(last_map_key__isnull=True).exclude(last_map_key="")
+    return dict(qs.values("last_map_key").annotate(n=Count("id")).values_list("last_map_key", "n"))
+
+
+def has_room(map_key: str, exclude=()) -> bool:
+    """Read-only capacity check, ignoring the sessions in `exclude` (about to leave).
+
+    Maps without a configured capacity always have room.
+    """
+    capacity = capacities().get(map_key, 0)
+    if capacity <= 0:
+        return True
+    exclude = [str(s) for s in exclude]
+    try:
+        conn = _get_conn()
+        members = f"{MEMBERS_PREFIX}{map_key}"
+        occupied = conn.scard(members)
+        if exclude:
+            occupied -= sum(conn.smismember(members, exclude))
+        return occupied < capacity
+    except Exception as exc:
+        logger.debug("map has_room: Redis unavailable (%s)", exc)
+    from apps.game_logic.models import GameSession
+    others = GameSession.objects.filter(is_active=True, last_map_key=map_key).exclude(id__in=exclude)
+    return others.count() < capacity
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def admit(session_id, map_key: str, force: bool = False) -> bool:
+    """Move `session_id` into `map_key` if the map has room. `force` skips the capacity check.
+
+    Maps that are not enabled in `MapData` are not tracked: the session just
+    leaves its previous map and is admitted.
+    """
+    known = capacities()
+    if map_key not in known:
+        leave(session_id)
+        return True
+    capacity = 0 if force else known[map_key]
+    session_id = str(session_id)
+    try:
+        conn = _get_conn()
+        for _ in range(_SCRIPT_ATTEMPTS):
+            current = _decode(conn.hget(SESSION_MAP_KEY, session_id)) or ""
+            admitted = conn.eval(
+                _ADMIT_LUA, 4, SESSION_MAP_KEY, POPULATION_KEY,
+                f"{MEMBERS_PREFIX}{map_key}", f"{MEMBERS_PREFIX}{current or map_key}",
+                session_id, map_key, capacity, current,
+            )
+            if admitted != -1:
+                return bool(admitted)
+        logger.warning("map admit: session %s kept changing maps, giving up", session_id)
+        return False
+    except Exception as exc:
+        logger.debug("map admit: Redis unavailable (%s)", exc)
+    if capacity <= 0:
+        return True
+    from apps.game_logic.models import GameSession
+    others = GameSession.objects.filter(is_active=True, last_map_key=map_key).exclude(id=session_id)
+    return others.count() < capacity
+
+
+def leave(*session_ids) -> None:
+    """Drop sessions from whatever map they are in."""
+    if not session_ids:
+        return
+    session_ids = [str(s) for s in session_ids]
+    try:
+        conn = _get_conn()
+        for _ in range(_SCRIPT_ATTEMPTS):
+            current = dict(zip(session_ids, (_decode(m) for m in conn.hmget(SESSION_MAP_KEY, session_ids))))
+            placed = [s for s in session_ids if current[s]]
+            if not placed:
+                return
+            removed = conn.eval(
+                _LEAVE_LUA, 2 + len(placed), SESSION_MAP_KEY, POPULATION_KEY,
+                *[f"{MEMBERS_PREFIX}{current[s]}" for s in placed],
+                *placed, *[current[s] for s in placed],
+            )
+            if removed != -1:
+                return
+        logger.warning("map leave: sessions kept changing maps, giving up")
+    except Exception as exc:
+        logger.debug("map leave: Redis unavailable (%s)", exc)
+
+
+def populations() -> dict[str, int]:
+    """{map_key: online sessions} for every populated map."""
+    try:
+        raw = _get_conn().hgetall(POPULATION_KEY)
+        return {
+            (k.decode() if isinstance(k, bytes) else k): int(v)
+            for k, v in raw.items() if int(v) > 0
+        }
+    except Exception as exc:
+        logger.debug("map populations: Redis unavailable (%s)", exc)
+    return _db_population()
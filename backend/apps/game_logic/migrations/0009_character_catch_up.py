@@ -0,0 +1,339 @@
+"""
+Catch-up migration: move player data from the user account to a Character.
+
+`models.py` already had `Character` and the `character` FKs, but no migration
+created them. This brings the schema in line with the models; it is separate
+from the slot bitmap (0010), which only adds `PlayerInventory.slot_bitmap`.
+
+Runs in three steps so populated databases keep their data:
+
+1. create `Character` and add the `character` FKs as nullable;
+2. create one `Character` per user that owns any game data (name from the
+   username, class/race/faction from the old `PlayerStats` columns) and point
+   every row at it;
+3. make the FKs required and drop the old `owner`/`player` columns.
+
+The reverse fills `owner`/`player` back from `character.owner` before the
+columns become required again.
+"""
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# (model, old user FK column) that move to `character`
+_OWNED = [
+    ("playerstats", "owner"),
+    ("playerinventory", "owner"),
+    ("playerskill", "owner"),
+    ("questprogress", "owner"),
+    ("gamesession", "player"),
+]
+_DEFAULTS = {"character_class": "paladino", "race": "humano", "faction": "vanguarda"}
+
+
+def _unique_name(base: str, taken: set) -> str:
+    base = (base or "hero")[:32]
+    name, n = base, 1
+    while name.lower() in taken:
+        n += 1
+        suffix = f"-{n}"
+        name = base[:32 - len(suffix)] + suffix
+    taken.add(name.lower())
+    return name
+
+
+def create_characters(apps, schema_editor):
+    Character = apps.get_model("game_logic", "Character")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    PlayerStats = apps.get_model("game_logic", "PlayerStats")
+
+    owner_ids = set()
+    for model_name, column in _OWNED:
+        model = apps.get_model("game_logic", model_name)
+        owner_ids.update(model.objects.values_list(f"{column}_id", flat=True).distinct())
+    if not owner_ids:
+        return
+
+    identity = {
+        row["owner_id"]: row
+        for row in PlayerStats.objects.filter(owner_id__in=owner_ids).values(
+            "owner_id", "character_class", "race", "faction"
+        )
+    }
+    taken = {name.lower() for name in Character.objects.values_list("name", flat=True)}
+    characters = []
+    for user_id, username in User.objects.filter(pk__in=owner_ids).values_list("pk", "username").order_by("date_joined"):
+        row = identity.get(user_id, {})
+        characters.append(Character(
+            id=uuid.uuid4(),
+            owner_id=user_id,
+            name=_unique_name(username, taken),
+            **{field: row.get(field) or default for field, default in _DEFAULTS.items()},
+        ))
+    Character.objects.bulk_create(characters, batch_size=1000)
+
+    # One character per owner, so the subquery is unambiguous
+    for model_name, column in _OWNED:
+        model = apps.get_model("game_logic", model_name)
+        model.objects.update(character_id=Subquery(
+            Character.objects.filter(owner_id=OuterRef(f"{column}_id")).values("id")[:1]
+        ))
+
+
+def restore_owners(apps, schema_editor):
+    Character = apps.get_model("game_logic", "Character")
+    PlayerStats = apps.get_model("game_logic", "PlayerStats")
+
+    for model_name, column in _OWNED:
+        model = apps.get_model("game_logic", model_name)
+        model.objects.update(**{f"{column}_id": Subquery(
+            Character.objects.filter(pk=OuterRef("character_id")).values("owner_id")[:1]
+        )})
+    PlayerStats.objects.update(**{
+        field: Subquery(Character.objects.filter(pk=OuterRef("character_id")).values(field)[:1])
+        for field in _DEFAULTS
+    })
+
+
+class Migration(migrations.Migration):
+
+    # Same operations, previously under the autogenerated name
+    replaces = [("game_logic", "0009_character_alter_gamesession_options_and_more")]
+
+    dependencies = [
+        ('game_data', '0009_catch_up_index_names'),
+        ('game_logic', '0008_party'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # ── 1. Character + nullable FKs ───────────────────────────────────────────
+        migrations.CreateModel(
+            name='Character',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('character_class', models.CharField(choices=[('paladino', 'Paladino'), ('mage', 'Mage'), ('archer', 'Archer'), ('eldari', 'Eldari'), ('cavaleiro_dragao', 'Cavaleiro Dragão'), ('ignis', 'Ignis'), ('shadow', 'Shadow'), ('necromante', 'Necromante')], max_length=20)),
+                ('race', models.CharField(choices=[('humano', 'Humano'), ('elfo', 'Elfo'), ('draconato', 'Draconato'), ('morto_vivo', 'Morto-Vivo')], max_length=20)),
+                ('faction', models.CharField(choices=[('vanguarda', 'Vanguarda da Alvorada'), ('legiao', 'Legião do Eclipse')], max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='characters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Character',
+                'verbose_name_plural': 'Characters',
+                'db_table': 'game_characters',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='playerskill',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='questprogress',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='character',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='game_logic.character'),
+        ),
+        migrations.AddField(
+            model_name='playerinventory',
+            name='character',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='game_logic.character'),
+        ),
+        migrations.AddField(
+            model_name='playerskill',
+            name='character',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='skills', to='game_logic.character'),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='character',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='game_logic.character'),
+        ),
+        migrations.AddField(
+            model_name='questprogress',
+            name='character',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quest_progress', to='game_logic.character'),
+        ),
+        # Nullable before the backfill, so the reverse can restore them before making them required
+        migrations.AlterField(
+            model_name='gamesession',
+            name='player',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='game_sessions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='playerinventory',
+            name='owner',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='playerskill',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='skills', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='playerstats',
+            name='owner',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='questprogress',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='quest_progress', to=settings.AUTH_USER_MODEL),
+        ),
+
+        # ── 2. Backfill ──────────────────────────────────────────────────────────
+        migrations.RunPython(create_characters, restore_owners),
+
+        # ── 3. Required FKs, old columns out ─────────────────────────────────────
+        migrations.AlterField(
+            model_name='gamesession',
+            name='character',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='game_logic.character'),
+        ),
+        migrations.AlterField(
+            model_name='playerinventory',
+            name='character',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='game_logic.character'),
+        ),
+        migrations.AlterField(
+            model_name='playerskill',
+            name='character',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skills', to='game_logic.character'),
+        ),
+        migrations.AlterField(
+            model_name='playerstats',
+            name='character',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='game_logic.character'),
+        ),
+        migrations.AlterField(
+            model_name='questprogress',
+            name='character',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quest_progress', to='game_logic.character'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='playerskill',
+            unique_together={('character', 'skill_template')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='questprogress',
+            unique_together={('character', 'quest_id')},
+        ),
+        migrations.RemoveIndex(
+            model_name='playerstats',
+            name='player_stat_faction_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='playerstats',
+            name='player_stat_class_idx',
+        ),
+        migrations.RemoveField(
+            model_name='gamesession',
+            name='hwid',
+        ),
+        migrations.RemoveField(
+            model_name='gamesession',
+            name='player',
+        ),
+        migrations.RemoveField(
+            model_name='playerinventory',
+            name='owner',
+        ),
+        migrations.RemoveField(
+            model_name='playerskill',
+            name='owner',
+        ),
+        migrations.RemoveField(
+            model_name='questprogress',
+            name='owner',
+        ),
+        migrations.RemoveField(
+            model_name='playerstats',
+            name='owner',
+        ),
+        migrations.RemoveField(
+            model_name='playerstats',
+            name='character_class',
+        ),
+        migrations.RemoveField(
+            model_name='playerstats',
+            name='faction',
+        ),
+        migrations.RemoveField(
+            model_name='playerstats',
+            name='race',
+        ),
+
+        # ── Model state catching up with models.py ───────────────────────────────
+        migrations.AlterModelOptions(
+            name='gamesession',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='party',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='partymember',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='playerinventory',
+            options={'verbose_name': 'Player Inventory'},
+        ),
+        migrations.AlterModelOptions(
+            name='playeritem',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='playerskill',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='playerstats',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='questprogress',
+            options={},
+        ),
+        migrations.AddField(
+            model_name='party',
+            name='members',
+            field=models.ManyToManyField(related_name='parties', through='game_logic.PartyMember', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='gamesession',
+            name='last_map_key',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='playerstats',
+            name='last_pos_x',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='playerstats',
+            name='last_pos_y',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='questtemplate',
+            name='objectives',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='questtemplate',
+            name='rewards',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_logic', '0009_character_catch_up'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerinventory',
+            name='slot_bitmap',
+            field=models.BinaryField(blank=True, default=bytes),
+        ),
+    ]
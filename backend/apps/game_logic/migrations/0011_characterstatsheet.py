@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:45
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_logic', '0010_playerinventory_slot_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CharacterStatSheet',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('equipment_bonuses', models.JSONField(default=dict)),
+                ('passive_bonuses', models.JSONField(default=dict)),
+                ('max_hp', models.IntegerField(default=0)),
+                ('max_mana', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('character', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stat_sheet', to='game_logic.character')),
+            ],
+            options={
+                'verbose_name': 'Character Stat Sheet',
+                'db_table': 'character_stat_sheets',
+            },
+        ),
+    ]
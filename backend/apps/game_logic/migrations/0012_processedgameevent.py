@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:57
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_logic', '0011_characterstatsheet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedGameEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('event_type', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processed_events', to='game_logic.character')),
+            ],
+            options={
+                'db_table': 'game_processed_events',
+            },
+        ),
+    ]
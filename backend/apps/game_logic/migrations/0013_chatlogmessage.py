@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:45
+
+import uuid
+from datetime import datetime, timezone
+from django.db import migrations, models
+
+
+def _month_start(year, month):
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def create_chat_log(apps, schema_editor):
+    model = apps.get_model("game_logic", "ChatLogMessage")
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(model)
+        return
+    # Range-partitioned by month; the partition key has to be part of the primary key.
+    # tasks.ensure_chat_log_partitions keeps creating the partitions ahead of time.
+    schema_editor.execute(
+        'CREATE TABLE "game_chat_log" ('
+        '"id" uuid NOT NULL, "room" varchar(64) NOT NULL, "user_id" uuid NOT NULL, '
+        '"display_name" varchar(100) NOT NULL, "text" text NOT NULL, "sent_at" timestamp with time zone NOT NULL, '
+        'PRIMARY KEY ("id", "sent_at")) PARTITION BY RANGE ("sent_at")'
+    )
+    schema_editor.execute('CREATE INDEX "game_chat_log_room_sent" ON "game_chat_log" ("room", "sent_at")')
+    schema_editor.execute('CREATE INDEX "game_chat_log_user_sent" ON "game_chat_log" ("user_id", "sent_at")')
+    now = datetime.now(timezone.utc)
+    for offset in range(2):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(now.year, now.month + offset + 1)
+        schema_editor.execute(
+            f'CREATE TABLE "game_chat_log_{start:%Y%m}" PARTITION OF "game_chat_log" '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    # Catches rows outside every range; ensure_partitions moves them out when it creates their month
+    schema_editor.execute('CREATE TABLE "game_chat_log_default" PARTITION OF "game_chat_log" DEFAULT')
+
+
+def drop_chat_log(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model("game_logic", "ChatLogMessage"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_logic', '0012_processedgameevent'),
+    ]
+
+    operations = [
+        # The table is created by create_chat_log (partitioned on PostgreSQL)
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ChatLogMessage',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('room', models.CharField(max_length=64)),
+                        ('user_id', models.UUIDField()),
+                        ('display_name', models.CharField(max_length=100)),
+                        ('text', models.TextField()),
+                        ('sent_at', models.DateTimeField()),
+                    ],
+                    options={
+                        'db_table': 'game_chat_log',
+                        'indexes': [models.Index(fields=['room', 'sent_at'], name='game_chat_log_room_sent'), models.Index(fields=['user_id', 'sent_at'], name='game_chat_log_user_sent')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_chat_log, drop_chat_log),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:05
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_logic', '0013_chatlogmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatFilterTerm',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('action', models.CharField(choices=[('mask', 'Mask'), ('reject', 'Reject')], default='mask', max_length=10)),
+                ('whole_word', models.BooleanField(default=True, help_text='Only match when not part of a longer word')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'game_chat_filter_terms',
+                'ordering': ['term'],
+            },
+        ),
+    ]
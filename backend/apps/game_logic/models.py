@@ -28,6 +28,10 @@ class QuestTemplate(UUIDModel):
         verbose_name = "Quest Template"
         verbose_name_plural = "Quest Templates"
         ordering = ["level_required", "name"]
+        indexes = [
+            models.Index(fields=["quest_type", "is_active"], name="quest_tmpl_type_active_idx"),
+            models.Index(fields=["level_required"], name="quest_tmpl_level_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.get_quest_type_display()}] {self.name}"
@@ -90,6 +94,8 @@ class PlayerInventory(UUIDModel):
     gold = models.IntegerField(default=0)
     slots_used = models.IntegerField(default=0)
     max_slots = models.IntegerField(default=100)
+    # One bit per slot (see slot_bitmap.py); maintained by GameLogicService
+    slot_bitmap = models.BinaryField(default=bytes, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -119,6 +125,18 @@ class PlayerItem(UUIDModel):
     class Meta:
         db_table = "player_items"
         unique_together = ["inventory", "slot_index"]
+        indexes = [
+            models.Index(fields=["inventory", "slot_index"], name="player_item_invento_4ede40_idx"),
+            models.Index(fields=["inventory", "item_template"], name="player_item_invento_84a0c1_idx"),
+            models.Index(fields=["inventory", "equip_slot"], name="player_item_inv_slot_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["inventory", "equip_slot"],
+                condition=models.Q(equip_slot__gt=""),
+                name="unique_equipped_slot_per_inventory",
+            ),
+        ]
 
 
 class PlayerStats(UUIDModel):
@@ -202,6 +220,27 @@ class PlayerSkill(UUIDModel):
         unique_together = ["character", "skill_template"]
 
 
+class CharacterStatSheet(UUIDModel):
+    """Denormalized combat stats: summed equipment/passive bonuses and derived vitals.
+
+    Recomputed by GameLogicService whenever equipment, skills or attributes change.
+    """
+    character = models.OneToOneField(
+        Character,
+        on_delete=models.CASCADE,
+        related_name="stat_sheet"
+    )
+    equipment_bonuses = models.JSONField(default=dict)
+    passive_bonuses = models.JSONField(default=dict)
+    max_hp = models.IntegerField(default=0)
+    max_mana = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "character_stat_sheets"
+        verbose_name = "Character Stat Sheet"
+
+
 class GameSession(UUIDModel):
     character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name='sessions')
     last_map_key = models.CharField(max_length=100, null=True, blank=True)
@@ -215,6 +254,61 @@ class GameSession(UUIDModel):
         db_table = 'game_sessions'
 
 
+class ProcessedGameEvent(UUIDModel):
+    """Durable dedupe ledger for reward-granting webhook events (see idempotency.py)."""
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=50)
+    character = models.ForeignKey(
+        Character,
+        on_delete=models.CASCADE,
+        related_name="processed_events"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = "game_processed_events"
+
+
+class ChatLogMessage(UUIDModel):
+    """Moderation log of chat messages, batch-inserted by tasks.flush_chat_log (see chat_history.py).
+
+    On PostgreSQL the table is range-partitioned by month on `sent_at` (migration 0013).
+    """
+    room = models.CharField(max_length=64)
+    user_id = models.UUIDField()
+    display_name = models.CharField(max_length=100)
+    text = models.TextField()
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "game_chat_log"
+        indexes = [
+            models.Index(fields=["room", "sent_at"], name="game_chat_log_room_sent"),
+            models.Index(fields=["user_id", "sent_at"], name="game_chat_log_user_sent"),
+        ]
+
+
+class ChatFilterTerm(UUIDModel):
+    """Word blocked in chat; compiled into the Aho-Corasick filter (see chat_filter.py)."""
+    ACTION_CHOICES = [
+        ("mask", "Mask"),
+        ("reject", "Reject"),
+    ]
+
+    term = models.CharField(max_length=100, unique=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default="mask")
+    whole_word = models.BooleanField(default=True, help_text="Only match when not part of a longer word")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "game_chat_filter_terms"
+        ordering = ["term"]
+
+    def __str__(self):
+        return f"{self.term} ({self.action})"
+
+
 class Party(UUIDModel):
     leader = models.ForeignKey("accounts.User", on_delete=models.CASCADE, related_name="led_parties")
     members = models.ManyToManyField("accounts.User", through="PartyMember", related_name="parties")
@@ -224,6 +318,10 @@ class Party(UUIDModel):
 
     class Meta:
         db_table = "parties"
+        indexes = [
+            models.Index(fields=["is_active"], name="parties_is_active_idx"),
+            models.Index(fields=["leader"], name="parties_leader_idx"),
+        ]
 
 
 class PartyMember(UUIDModel):
@@ -0,0 +1,152 @@
+"""
+Write-behind da posição e HP dos jogadores.
+
+Com `POSITION_WRITE_BEHIND=True`, `GameLogicService.save_player_position` grava a
+última posição/HP no hash Redis `game:pos:pending` (campo = character_id,
+valor = "x:y:hp"; a última escrita vence) em vez de emitir um UPDATE por chamada.
+
+- `tasks.flush_player_positions` (a cada `POSITION_FLUSH_SECONDS`) troca o hash
+  com RENAME e persiste as entradas sujas com um `bulk_update` por lote de
+  `POSITION_FLUSH_BATCH_SIZE` personagens.
+- `player_disconnected` força o flush síncrono do personagem.
+
+Uma entrada só sai do Redis depois que a transação que a gravou commita
+(`transaction.on_commit`): `flush_character` grava sem apagar e, no commit,
+remove o campo se ele não mudou nesse meio tempo. O hash trocado por
+`flush_positions` (`game:pos:flushing:<unix_ts>:<uuid>`) é apagado no commit; se
+sobrar (rollback, worker morto entre o RENAME e o DELETE), o próximo flush o
+devolve ao pendente com `HSETNX` (posição mais nova vence) depois de
+`POSITION_FLUSH_ORPHAN_SECONDS`.
+
+Sem Redis, `buffer_position` retorna False e o chamador faz o UPDATE direto.
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY         = "game:pos:pending"
+FLUSHING_KEY_PREFIX = "game:pos:flushing:"
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def _decode(raw: bytes) -> tuple[int, int, int]:
+    pos_x, pos_y, hp = raw.decode().split(":")
+    return int(pos_x), int(pos_y), int(hp)
+
+
+def buffer_position(character_id, pos_x: int, pos_y: int, hp: int) -> bool:
+    """Record the latest position/HP of a character. Returns False when Redis is unavailable."""
+    try:
+        _get_conn().hset(PENDING_KEY, str(character_id), f"{int(pos_x)}:{int(pos_y)}:{int(hp)}")
+        return True
+    except Exception as exc:
+        logger.debug("buffer_position: Redis unavailable (%s)", exc)
+        return False
+
+
+def _flushing_key() -> str:
+    # The timestamp lets a later flush tell an abandoned hash from one still in use
+    return f"{FLUSHING_KEY_PREFIX}{int(time.time())}:{uuid.uuid4().hex}"
+
+
+def _merge_back(conn, flushing_key: str) -> int:
+    """Put a flushing hash's entries back (unless a newer position arrived) and drop it."""
+    with conn.pipeline() as pipeline:
+        try:
+            pipeline.watch(flushing_key)
+            leftover = pipeline.hgetall(flushing_key)
+            pipeline.multi()
+            for character_id, value in leftover.items():
+                pipeline.hsetnx(PENDING_KEY, character_id, value)
+            pipeline.delete(flushing_key)
+            pipeline.execute()
+        except WatchError:
+            # Deleted (committed) or merged by someone else meanwhile
+            return 0
+    return len(leftover)
+
+
+def recover_orphans(conn) -> int:
+    """Merge back flushing hashes older than POSITION_FLUSH_ORPHAN_SECONDS; returns the entries recovered."""
+    cutoff = time.time() - int(getattr(settings, "POSITION_FLUSH_ORPHAN_SECONDS", 300))
+    recovered = 0
+    for key in conn.scan_iter(match=f"{FLUSHING_KEY_PREFIX}*", count=100):
+        key = key.decode() if isinstance(key, bytes) else key
+        created, _, _ = key[len(FLUSHING_KEY_PREFIX):].partition(":")
+        if created.isdigit() and int(created) > cutoff:
+            continue
+        recovered += _merge_back(conn, key)
+    if recovered:
+        logger.warning("position_buffer: recovered %s positions from abandoned flushes", recovered)
+    return recovered
+
+
+def _discard_if_unchanged(conn, field: str, raw: bytes) -> None:
+    """After commit: drop the pending entry unless a newer position replaced it."""
+    with conn.pipeline() as pipeline:
+        try:
+            pipeline.watch(PENDING_KEY)
+            if pipeline.hget(PENDING_KEY, field) != raw:
+                return
+            pipeline.multi()
+            pipeline.hdel(PENDING_KEY, field)
+            pipeline.execute()
+        except WatchError:
+            # The hash changed meanwhile; the periodic flush writes the entry again (idempotent)
+            pass
+
+
+def flush_positions() -> int:
+    """Persist every dirty position; returns the number of characters written."""
+    from apps.game_logic.services import GameLogicService
+
+    conn = _get_conn()
+    recover_orphans(conn)
+    flushing_key = _flushing_key()
+    try:
+        conn.rename(PENDING_KEY, flushing_key)
+    except Exception as exc:
+        if "no such key" in str(exc).lower():
+            return 0
+        raise
+
+    raw = conn.hgetall(flushing_key)
+    positions = {k.decode(): _decode(v) for k, v in raw.items()}
+    try:
+        written = GameLogicService.save_player_positions_bulk(positions)
+    except Exception:
+        _merge_back(conn, flushing_key)
+        raise
+    transaction.on_commit(lambda: conn.delete(flushing_key))
+    return written
+
+
+def flush_character(character_id) -> bool:
+    """Synchronously persist the buffered position of one character, if any.
+
+    The entry stays buffered until the caller's transaction commits.
+    """
+    from apps.game_logic.services import GameLogicService
+
+    field = str(character_id)
+    try:
+        conn = _get_conn()
+        raw = conn.hget(PENDING_KEY, field)
+    except Exception as exc:
+        logger.debug("position flush_character: Redis unavailable (%s)", exc)
+        return False
+    if raw is None:
+        return False
+    GameLogicService.save_player_positions_bulk({field: _decode(raw)})
+    transaction.on_commit(lambda: _discard_if_unchanged(conn, field, raw))
+    return True
@@ -0,0 +1,57 @@
+"""
+Presença das sessões de jogo em Redis.
+
+Cada `ping` do `GameConsumer` faz `ZADD game:presence:sessions <agora> <session_id>`
+(O(log N), sem tocar no banco). `tasks.cleanup_stale_game_sessions` reconcilia
+`GameSession` em lote:
+
+1. sessões vivas (`ZRANGEBYSCORE <cutoff> +inf`) têm `last_heartbeat_at` gravado
+   com um `bulk_update`;
+2. sessões ativas com `last_heartbeat_at` anterior ao cutoff são encerradas com
+   um único UPDATE (cobre também sessões que nunca entraram no Redis);
+3. membros vencidos saem do sorted set (`ZREMRANGEBYSCORE -inf <cutoff>`).
+
+Sem Redis, `touch` retorna False e o consumer grava o heartbeat no banco, no
+máximo uma vez a cada `GAME_SESSION_HEARTBEAT_DB_INTERVAL` segundos por conexão.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_KEY = "game:presence:sessions"
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def touch(session_id, now: float | None = None) -> bool:
+    """Record a heartbeat of `session_id`. Returns False when Redis is unavailable."""
+    try:
+        _get_conn().zadd(PRESENCE_KEY, {str(session_id): now if now is not None else time.time()})
+        return True
+    except Exception as exc:
+        logger.debug("presence touch: Redis unavailable (%s)", exc)
+        return False
+
+
+def forget(*session_ids) -> None:
+    if not session_ids:
+        return
+    try:
+        _get_conn().zrem(PRESENCE_KEY, *[str(s) for s in session_ids])
+    except Exception as exc:
+        logger.debug("presence forget: Redis unavailable (%s)", exc)
+
+
+def live_since(cutoff: float) -> dict[str, float]:
+    """{session_id: last heartbeat epoch} of every session seen after `cutoff`."""
+    rows = _get_conn().zrangebyscore(PRESENCE_KEY, cutoff, "+inf", withscores=True)
+    return {(m.decode() if isinstance(m, bytes) else m): score for m, score in rows}
+
+
+def drop_before(cutoff: float) -> int:
+    """Remove sessions whose last heartbeat is at or before `cutoff`."""
+    return _get_conn().zremrangebyscore(PRESENCE_KEY, "-inf", cutoff)
@@ -0,0 +1,68 @@
+"""
+Índice compilado de objetivos de quest para o progresso de abates (`npc_killed`).
+
+`update_kill_progress` é chamado em cada abate; em vez de carregar todas as
+`QuestProgress` em andamento e reparsear o JSON `objectives` de cada template,
+consulta este índice em memória:
+
+    kill_key ("kill_<npc_type>") → {quest_id: [(objective_key, target_count), ...]}
+
+O índice é versionado: a versão é um token aleatório no cache compartilhado
+(`game:quest_index:version`), trocado pelos sinais de `QuestTemplate`
+(save/delete). Cada processo recompila o índice quando percebe uma versão nova,
+então todos os workers convergem sem reiniciar.
+"""
+import logging
+import threading
+import uuid
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "game:quest_index:version"
+
+_lock = threading.Lock()
+_compiled: dict = {"version": None, "by_kill_key": {}}
+
+
+def invalidate() -> None:
+    """Publish a new index version (called on QuestTemplate save/delete)."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def _current_version() -> str:
+    # Random tokens instead of a counter: a flushed cache restarting at 1 could match a stale index
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _compile() -> dict:
+    from apps.game_logic.models import QuestTemplate
+
+    by_kill_key: dict[str, dict[str, list[tuple[str, int]]]] = {}
+    for quest_id, objectives in QuestTemplate.objects.values_list("id", "objectives"):
+        compiled = [
+            (obj["key"], int(obj.get("target_count", 1)))
+            for obj in (objectives or [])
+            if isinstance(obj, dict) and obj.get("key")
+        ]
+        for key, _ in compiled:
+            if key.startswith("kill_"):
+                by_kill_key.setdefault(key, {})[str(quest_id)] = compiled
+    return by_kill_key
+
+
+def quests_for_kill(kill_key: str) -> dict[str, list[tuple[str, int]]]:
+    """Return {quest_id: compiled objectives} for every quest tracking `kill_key`."""
+    version = _current_version()
+    if _compiled["version"] != version:
+        with _lock:
+            if _compiled["version"] != version:
+                _compiled["by_kill_key"] = _compile()
+                _compiled["version"] = version
+                logger.debug("quest_index: compiled version %s (%s kill keys)", version, len(_compiled["by_kill_key"]))
+    return _compiled["by_kill_key"].get(kill_key, {})
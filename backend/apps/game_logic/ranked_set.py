@@ -0,0 +1,161 @@
+"""
+Conjunto ordenado com consulta de posição (order statistic) em memória.
+
+Usado pelo fallback dos rankings quando o Redis não está disponível: oferece as
+mesmas operações de um Sorted Set (ZADD, ZREM, ZREVRANK, ZREVRANGE, ZCARD) sem
+reordenar o board inteiro a cada leitura.
+
+A estrutura é uma lista de buckets ordenados (no estilo de `sortedcontainers`):
+cada bucket guarda até `2 * LOAD` chaves `(-score, member)` e `_maxes` guarda a
+maior chave de cada bucket. Localizar um membro é uma busca binária em `_maxes`
+seguida de outra dentro do bucket; inserções e remoções só movem memória dentro
+de um bucket. Ordem: maior score primeiro, empates por `member` crescente.
+
+Uma árvore de Fenwick sobre os tamanhos dos buckets (`_index`) dá a soma dos
+buckets anteriores e localiza o bucket de uma posição em O(log B), então `rank`
+é O(log N) e `range` O(log N + k). A árvore é atualizada em O(log B) a cada
+inserção/remoção e reconstruída (O(B)) só quando um bucket se divide ou esvazia.
+"""
+from bisect import bisect_left, insort
+
+
+class RankedSet:
+    """{member: score} kept ordered by descending score, with rank lookup."""
+
+    LOAD = 256
+
+    def __init__(self, items: dict[str, int] | None = None):
+        self._scores: dict[str, int] = {}
+        self._buckets: list[list[tuple[int, str]]] = []
+        self._maxes: list[tuple[int, str]] = []
+        # Fenwick tree (1-based) over len(bucket)
+        self._index: list[int] = [0]
+        if items:
+            self._scores = {member: int(score) for member, score in items.items()}
+            keys = sorted((-score, member) for member, score in self._scores.items())
+            self._buckets = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+            self._maxes = [bucket[-1] for bucket in self._buckets]
+            self._rebuild_index()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._scores
+
+    def score(self, member: str) -> int | None:
+        return self._scores.get(member)
+
+    def to_dict(self) -> dict[str, int]:
+        return dict(self._scores)
+
+    def add(self, member: str, score: int) -> None:
+        """Insert `member` or move it to its new score."""
+        score = int(score)
+        old = self._scores.get(member)
+        if old == score:
+            return
+        if old is not None:
+            self._remove_key((-old, member))
+        self._scores[member] = score
+        self._insert_key((-score, member))
+
+    def discard(self, member: str) -> None:
+        old = self._scores.pop(member, None)
+        if old is not None:
+            self._remove_key((-old, member))
+
+    def rank(self, member: str) -> int | None:
+        """0-based position of `member` (highest score first), or None."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        key = (-score, member)
+        index = bisect_left(self._maxes, key)
+        return self._prefix(index) + bisect_left(self._buckets[index], key)
+
+    def range(self, start: int, stop: int) -> list[tuple[str, int]]:
+        """(member, score) from position `start` to `stop` inclusive, like ZREVRANGE."""
+        start = max(0, start)
+        stop = min(stop, len(self._scores) - 1)
+        result: list[tuple[str, int]] = []
+        if stop < start:
+            return result
+        index, offset = self._locate(start)
+        wanted = stop - start + 1
+        while len(result) < wanted:
+            bucket = self._buckets[index]
+            for neg_score, member in bucket[offset:offset + wanted - len(result)]:
+                result.append((member, -neg_score))
+            index, offset = index + 1, 0
+        return result
+
+    # ── Fenwick index over bucket sizes ──────────────────────────────────────
+
+    def _rebuild_index(self) -> None:
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._index = tree
+
+    def _index_add(self, bucket_index: int, delta: int) -> None:
+        i = bucket_index + 1
+        while i < len(self._index):
+            self._index[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket_index: int) -> int:
+        """Number of members in the buckets before `bucket_index`."""
+        total, i = 0, bucket_index
+        while i > 0:
+            total += self._index[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> tuple[int, int]:
+        """(bucket index, offset inside it) of the member at `position`."""
+        i, step = 0, 1 << (len(self._index) - 1).bit_length()
+        while step:
+            if i + step < len(self._index) and self._index[i + step] <= position:
+                i += step
+                position -= self._index[i]
+            step >>= 1
+        return i, position
+
+    def _insert_key(self, key: tuple[int, str]) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_index()
+            return
+        index = bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            index -= 1
+            self._buckets[index].append(key)
+            self._maxes[index] = key
+        else:
+            insort(self._buckets[index], key)
+        bucket = self._buckets[index]
+        if len(bucket) > 2 * self.LOAD:
+            half = bucket[self.LOAD:]
+            del bucket[self.LOAD:]
+            self._buckets.insert(index + 1, half)
+            self._maxes[index] = bucket[-1]
+            self._maxes.insert(index + 1, half[-1])
+            self._rebuild_index()
+        else:
+            self._index_add(index, 1)
+
+    def _remove_key(self, key: tuple[int, str]) -> None:
+        index = bisect_left(self._maxes, key)
+        bucket = self._buckets[index]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[index] = bucket[-1]
+            self._index_add(index, -1)
+        else:
+            del self._buckets[index]
+            del self._maxes[index]
+            self._rebuild_index()
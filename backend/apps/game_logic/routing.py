@@ -14,12 +14,12 @@ Define os padrões de URL para os WebSocket consumers, montados pelo
 ## Como Montar (config/asgi.py)
 ```python
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
+from apps.accounts.ws_auth import JWTAuthMiddlewareStack
 from apps.game_logic.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "websocket": JWTAuthMiddlewareStack(
         URLRouter(websocket_urlpatterns)
     ),
 })
@@ -0,0 +1,247 @@
+"""
+Fila de envio por conexão WebSocket.
+
+Os handlers de grupo (`world.update`, `chat.message`, notificações) não fazem
+mais `await self.send` direto: colocam a mensagem na `SendQueue` da conexão e
+voltam na hora, e uma task por conexão despacha a fila em ordem. Um cliente
+lento deixa de segurar o `receive` do channel layer daquele consumer (e o relay
+dos shards de chat, que entrega a várias conexões em sequência).
+
+A fila é limitada e coalescente:
+
+- `put(message)`: mensagens comuns (chat, notificações) em FIFO, até
+  `WS_SEND_QUEUE_LIMIT`; cheia, descarta a mais antiga (`dropped`);
+- `put_latest(key, message)`: uma vaga por chave — a mensagem nova substitui a
+  que ainda não saiu (`coalesced`). `message` pode ser uma função chamada só na
+  hora do envio (o `GameConsumer` passa `DeltaTracker.pending`, então o cliente
+  recebe um único `world.delta` com o estado mais recente).
+
+O atraso é medido no transporte: no Daphne o `send` entrega o frame ao Twisted e
+retorna na hora, então a task lê os bytes ainda não escritos no socket
+(`transport_backlog`) e para de despachar enquanto passarem de
+`WS_SEND_BACKLOG_BYTES` — as mensagens ficam na fila, onde valem o limite e a
+coalescência. Se a conexão ficar atrasada (fila não vazia ou transporte acima do
+limite) por mais de `WS_SEND_STALL_SECONDS`, é fechada com o código `4008`
+(`on_stall`). A verificação roda num timer, e não só quando chega mensagem nova.
+
+Os contadores de cada conexão são somados em `game:ws:send_queue:stats` ao
+desconectar (`record`), com `stats()` para leitura.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "game:ws:send_queue:stats"
+STALL_CLOSE_CODE = 4008
+
+
+def transport_backlog(send):
+    """Return a callable giving the unsent bytes of the connection behind `send`, or None.
+
+    Daphne passes `partial(server.handle_reply, protocol)` as the ASGI send; the
+    protocol's transport is a Twisted `FileDescriptor` (or an asyncio transport
+    under other servers).
+    """
+    protocol = send.args[0] if isinstance(send, partial) and send.args else None
+    transport = getattr(protocol, "transport", None)
+    if transport is None:
+        return None
+    if hasattr(transport, "get_write_buffer_size"):
+        return transport.get_write_buffer_size
+    if hasattr(transport, "dataBuffer"):
+        return lambda: len(transport.dataBuffer) - transport.offset + transport._tempDataLen
+    return None
+
+
+class SendQueue:
+    """Bounded, coalescing outbound queue of one connection, drained by its own task."""
+
+    def __init__(
+        self,
+        send,
+        limit: int = 256,
+        stall_seconds: float = 10.0,
+        on_stall=None,
+        clock=time.monotonic,
+        backlog=None,
+        backlog_limit: int = 256 * 1024,
+        poll_seconds: float = 0.05,
+    ):
+        self._send = send
+        self.limit = limit
+        self.stall_seconds = stall_seconds
+        self.on_stall = on_stall
+        self.clock = clock
+        # Unsent transport bytes (see transport_backlog); None when the server does not expose them
+        self.backlog = backlog
+        self.backlog_limit = backlog_limit
+        self.poll_seconds = poll_seconds
+        # Entries are message dicts, or (key,) markers whose current value lives in _latest
+        self._items: deque = deque()
+        self._latest: dict[str, object] = {}
+        self._plain = 0
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self.behind_since: float | None = None
+        self.stalled = False
+        self.counters: Counter = Counter()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, message: dict) -> None:
+        if self._plain >= self.limit:
+            for index, item in enumerate(self._items):
+                if isinstance(item, dict):
+                    del self._items[index]
+                    break
+            self._plain -= 1
+            self.counters["dropped"] += 1
+        self._items.append(message)
+        self._plain += 1
+        self._wake()
+
+    def put_latest(self, key: str, message) -> None:
+        if key in self._latest:
+            self.counters["coalesced"] += 1
+        else:
+            self._items.append((key,))
+        self._latest[key] = message
+        self._wake()
+
+    def _wake(self) -> None:
+        self._behind()
+        self._ready.set()
+        if self._task is None:
+            self._task = self._spawn(self._run())
+
+    def _congested(self) -> bool:
+        if self.backlog is None:
+            return False
+        try:
+            return self.backlog() > self.backlog_limit
+        except Exception:
+            return False
+
+    def _behind(self) -> None:
+        if self.behind_since is None:
+            self.behind_since = self.clock()
+            self._arm(self.stall_seconds)
+        else:
+            self._check_stall()
+
+    def _caught_up(self) -> None:
+        self.behind_since = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _arm(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(max(delay, 0), self._on_timer)
+
+    def _on_timer(self) -> None:
+        # Fires even when nothing new is queued (a stuck send, or a client that stopped reading)
+        self._timer = None
+        if self.behind_since is None or self.stalled:
+            return
+        remaining = self.behind_since + self.stall_seconds - self.clock()
+        if remaining > 0:
+            self._arm(remaining)
+        else:
+            self._stall()
+
+    def _check_stall(self) -> None:
+        if not self.stalled and self.clock() - self.behind_since > self.stall_seconds:
+            self._stall()
+
+    def _stall(self) -> None:
+        self.stalled = True
+        self.counters["stalled"] += 1
+        logger.info(
+            "send queue: %s messages behind for %.1fs, closing", len(self._items), self.clock() - self.behind_since
+        )
+        if self.on_stall is not None:
+            self._spawn(self.on_stall())
+
+    def _spawn(self, coro) -> asyncio.Task:
+        return asyncio.get_running_loop().create_task(coro)
+
+    def _pop(self):
+        item = self._items.popleft()
+        if isinstance(item, dict):
+            self._plain -= 1
+            return item
+        message = self._latest.pop(item[0])
+        return message() if callable(message) else message
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            while not self.stalled:
+                if self._congested():
+                    # The server accepted earlier frames but the socket has not taken them yet
+                    self._behind()
+                    await asyncio.sleep(self.poll_seconds)
+                    continue
+                if not self._items:
+                    break
+                message = self._pop()
+                if message is None:
+                    continue
+                try:
+                    await self._send(message)
+                except Exception as exc:
+                    logger.debug("send queue: send failed (%s)", exc)
+            self._ready.clear()
+            self._caught_up()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._caught_up()
+        self._items.clear()
+        self._latest.clear()
+        self._plain = 0
+
+
+# ── Counters ─────────────────────────────────────────────────────────────────
+
+_local_stats: Counter = Counter()
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def record(counters: Counter) -> None:
+    """Add a closed connection's counters to the shared totals."""
+    counters = {name: value for name, value in counters.items() if value}
+    if not counters:
+        return
+    try:
+        pipe = _get_conn().pipeline(transaction=False)
+        for name, value in counters.items():
+            pipe.hincrby(STATS_KEY, name, value)
+        pipe.execute()
+    except Exception as exc:
+        logger.debug("send queue stats: Redis unavailable (%s)", exc)
+        _local_stats.update(counters)
+
+
+def stats() -> dict[str, int]:
+    """{"dropped": n, "coalesced": n, "stalled": n} over all closed connections."""
+    try:
+        raw = {k.decode(): int(v) for k, v in _get_conn().hgetall(STATS_KEY).items()}
+    except Exception as exc:
+        logger.debug("send queue stats: Redis unavailable (%s)", exc)
+        raw = dict(_local_stats)
+    return {name: raw.get(name, 0) for name in ("dropped", "coalesced", "stalled")}
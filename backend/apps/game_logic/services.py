@@ -22,8 +22,10 @@ falhas parciais não corrompam o estado.
 Obtém ou cria `PlayerInventory` + `PlayerStats` com lock pessimista
 (`select_for_update`) para evitar condição de corrida em criações simultâneas.
 
-#### add_item_to_inventory(user, item_template_id, quantity)
-Adiciona item ao inventário com empilhamento automático (stacking).
+#### add_item_to_inventory(user, item_template_id, quantity) / add_items_to_inventory(character, grants)
+Adiciona item(ns) ao inventário com empilhamento automático (stacking). O plano é
+montado em memória com o bitmap de ocupação (`slot_bitmap`) e gravado com um
+`bulk_update` de pilhas e um `bulk_create`; `slots_used` é mantido incrementalmente.
 Lança `ValueError` se inventário cheio ou quantidade < 1.
 
 #### equip_item(user, item_id) / unequip_item(user, item_id)
@@ -44,8 +46,49 @@ Lança `ValueError` se pontos insuficientes.
 Cria o personagem inicial do jogador no onboarding com stats base por classe.
 Lança `ValueError` se personagem já existe.
 
-#### get_leaderboard(limit) / update_leaderboard_score(user, score)
-Lê/atualiza ranking no Redis (sorted set `game:leaderboard`).
+#### get_leaderboard(limit, board, offset) / update_leaderboard_cache(character, stats)
+Lê/atualiza os rankings no Redis (`leaderboard`: global, por facção, por classe e
+PvP; membro = character_id, nomes no hash `game:leaderboard:names`).
+
+#### apply_game_event(character, event_type, data)
+Aplica um evento do webhook do servidor de jogo ao personagem. Usado tanto
+pelo endpoint de evento único quanto pelo endpoint em lote (`/events/batch/`).
+
+Com `event_id` o evento é aplicado no máximo uma vez (`idempotency`: ledger Redis
+com TTL + `ProcessedGameEvent` para eventos de recompensa); reenvios recebem o
+resultado original com `duplicate: True`.
+
+#### save_player_position(character, x, y, hp) / save_player_positions_bulk(positions)
+Persiste posição/HP. Com `POSITION_WRITE_BEHIND` o valor vai para o buffer Redis
+(`position_buffer`) e é gravado em lote por `flush_player_positions`.
+
+#### apply_experience_bulk(amounts)
+Aplica XP acumulado pelo buffer (`xp_buffer`) a vários personagens com um único
+SELECT ... FOR UPDATE e um `bulk_update`, processando level ups.
+
+#### recompute_stat_sheet(character) / get_stat_sheet(character)
+Mantém `CharacterStatSheet`: bônus de equipamento e passivas somados e HP/mana
+máximos derivados (espelho do `AttributeCalculator`), que o documento de estado
+serve como `max_hp`/`max_mana`. Recalculado só em equip/unequip, learn/upgrade
+skill e allocate_points; leitura = um fetch por PK.
+
+#### build_character_state(character) / get_cached_character_state(character_id)
+Documento de estado do servidor de jogo (`game:player_state:{character_id}`,
+com `state_version`, `character_id` e `party_id`). `GameStateView` serve do cache
+e só recorre ao banco em miss; mutações reagendam o preload após o commit e
+`save_player_position` atualiza posição/HP no documento em cache.
+
+#### get_character_states_bulk(user_ids, character_ids)
+Versão em lote do estado acima para boot de mapa/servidor (`game-state/bulk/`):
+lê o cache com `get_many` e resolve os misses com um número fixo de consultas.
+
+#### update_kill_progress(character, npc_type)
+Avança objetivos `kill_<npc_type>` consultando o índice compilado
+(`quest_index`); abates que nenhuma quest rastreia não tocam o banco.
+
+#### apply_game_events(events)
+Aplica um lote de eventos agrupados por personagem (uma transação por personagem,
+savepoint por evento) e retorna o resultado de cada evento pelo índice.
 
 ## Observações
 - Nunca chame `save()` diretamente em modelos de jogo fora deste service.
@@ -53,12 +96,17 @@ Lê/atualiza ranking no Redis (sorted set `game:leaderboard`).
   (`/api/v1/game-logic/events/`) que chamam este service internamente.
 """
 import logging
+import uuid
 
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
 from django.utils import timezone
 from apps.accounts.models import User
 from apps.game_data.models import ItemTemplate
-from apps.game_logic.models import Character, Party, PartyMember, PlayerInventory, PlayerItem, PlayerSkill, PlayerStats, QuestProgress, QuestTemplate
+from apps.game_logic import idempotency, leaderboard, position_buffer, quest_index, xp_buffer
+from apps.game_logic.slot_bitmap import SlotBitmap
+from apps.game_logic.models import Character, CharacterStatSheet, Party, PartyMember, PlayerInventory, PlayerItem, PlayerSkill, PlayerStats, ProcessedGameEvent, QuestProgress, QuestTemplate
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +116,222 @@ class GameLogicService:
     XP_PER_LEVEL = 100
     POINTS_PER_LEVEL = 5
 
+    # XP granted per `player_action` webhook, keyed by C# action_id
+    XP_PER_ACTION: dict[int, int] = {1: 5, 2: 5, 3: 10, 4: 2}
+
+    @staticmethod
+    def apply_game_event(
+        character: Character | None,
+        event_type: str,
+        data: dict,
+        event_id: str | None = None,
+        claims: list | None = None,
+    ) -> dict:
+        """Apply a single game-server webhook event to a character.
+
+        Unknown event types and events without a resolved character are no-ops.
+        Errors raised by the underlying service methods propagate to the caller.
+
+        With an `event_id` the event is applied at most once: a repeated delivery
+        returns the recorded result with `duplicate: True` (see `idempotency`),
+        and one arriving while the first is still being applied gets the
+        retryable `idempotency.IN_PROGRESS`. Event ids claimed here are appended
+        to `claims`, so a caller whose enclosing transaction rolls back can
+        release them.
+        """
+        if character is None:
+            return {"ok": True}
+        if not event_id:
+            GameLogicService._dispatch_game_event(character, event_type, data or {})
+            return {"ok": True}
+
+        event_id = str(event_id)
+        previous = idempotency.claim(event_id)
+        if previous is not None:
+            if previous.get("in_progress"):
+                return previous
+            return {**previous, "duplicate": True}
+        if claims is not None:
+            claims.append(event_id)
+
+        result = {"ok": True}
+        try:
+            with transaction.atomic():
+                if event_type in idempotency.REWARD_EVENTS:
+                    try:
+                        with transaction.atomic():
+                            ProcessedGameEvent.objects.create(
+                                event_id=event_id, event_type=event_type, character=character
+                            )
+                    except IntegrityError:
+                        transaction.on_commit(lambda: idempotency.record(event_id, result))
+                        return {**result, "duplicate": True}
+                GameLogicService._dispatch_game_event(character, event_type, data or {})
+        except Exception:
+            idempotency.release(event_id)
+            raise
+        transaction.on_commit(lambda: idempotency.record(event_id, result))
+        return result
+
+    @staticmethod
+    def _dispatch_game_event(character: Character, event_type: str, data: dict) -> None:
+
+        if event_type == "xp_gained":
+            amount = min(int(data.get("amount", 0)), 10_000)
+            if amount > 0:
+                GameLogicService.gain_experience(character, amount, bypass_anticheat=True)
+
+        elif event_type == "item_collected":
+            item_id  = data.get("item_template_id")
+            quantity = int(data.get("quantity", 1))
+            if item_id:
+                GameLogicService.add_item_to_inventory(character, item_id, quantity)
+
+        elif event_type == "player_connected":
+            GameLogicService.start_game_session(
+                character,
+                ip=data.get("ip_address", ""),
+                map_key=data.get("map_key", "world_main"),
+            )
+
+        elif event_type == "player_action":
+            xp = GameLogicService.XP_PER_ACTION.get(int(data.get("action_id", 0)), 0)
+            if xp:
+                buffered = (
+                    getattr(settings, "XP_BUFFER_ENABLED", False)
+                    and xp_buffer.buffer_experience(character.id, xp)
+                )
+                if not buffered:
+                    GameLogicService.gain_experience(character, xp, bypass_anticheat=True)
+
+        elif event_type == "player_disconnected":
+            pos_x = int(data.get("pos_x", 0))
+            pos_y = int(data.get("pos_y", 0))
+            hp    = int(data.get("hp", 0))
+            if getattr(settings, "XP_BUFFER_ENABLED", False):
+                xp_buffer.flush_character(character.id)
+            GameLogicService.end_game_session(character)
+            if hp > 0:
+                GameLogicService.save_player_position(character, pos_x, pos_y, hp)
+            if getattr(settings, "POSITION_WRITE_BEHIND", False):
+                position_buffer.flush_character(character.id)
+
+        elif event_type == "player_position":
+            hp = int(data.get("hp", 0))
+            if hp > 0:
+                GameLogicService.save_player_position(
+                    character, int(data.get("pos_x", 0)), int(data.get("pos_y", 0)), hp
+                )
+
+        elif event_type == "player_killed":
+            victim_char_id = data.get("victim_character_id")
+            if victim_char_id:
+                victim_char = Character.objects.filter(id=victim_char_id, is_active=True).first()
+                if victim_char:
+                    GameLogicService.record_pvp_kill(killer=character, victim=victim_char)
+
+        elif event_type == "player_died":
+            try:
+                GameLogicService.apply_death_penalty(character)
+            except Exception as exc:
+                logger.warning("apply_death_penalty failed for char %s: %s", character.id, exc)
+
+        elif event_type == "npc_killed":
+            npc_type = data.get("npc_type", "")
+            if npc_type:
+                GameLogicService.update_kill_progress(character, npc_type)
+
+        elif event_type == "quest_complete":
+            quest_id = data.get("quest_id")
+            if quest_id:
+                try:
+                    GameLogicService.complete_quest(character, quest_id)
+                except Exception:
+                    pass
+
+    @staticmethod
+    def apply_game_events(events: list[dict], stop_on_failure: bool = False) -> list[dict]:
+        """Apply a batch of webhook events and return one result dict per event.
+
+        Users and their active characters are resolved up front; each character's
+        events run in arrival order inside one transaction, with a savepoint per
+        event so a single failure does not discard the rest of the batch.
+
+        With `stop_on_failure` a failed event stops that character's later events,
+        which come back as `ok: False, skipped: True` without being applied (the
+        stream consumer retries them after the failed one, in order).
+        """
+        results: list[dict | None] = [None] * len(events)
+        player_ids: set[uuid.UUID] = set()
+        for index, event in enumerate(events):
+            if not isinstance(event, dict) or not event.get("event_type") or not event.get("player_id"):
+                results[index] = {"index": index, "ok": False, "error": "event_type and player_id required"}
+                continue
+            try:
+                player_ids.add(uuid.UUID(str(event["player_id"])))
+            except ValueError:
+                results[index] = {"index": index, "ok": False, "error": "player not found"}
+
+        users = {
+            str(u.id): u
+            for u in User.objects.filter(id__in=player_ids).prefetch_related(
+                Prefetch(
+                    "characters",
+                    queryset=Character.objects.filter(is_active=True).order_by("-created_at"),
+                    to_attr="active_characters",
+                )
+            )
+        }
+
+        # Group event indexes by character, keeping arrival order
+        groups: dict = {}
+        for index, event in enumerate(events):
+            if results[index] is not None:
+                continue
+            user = users.get(str(uuid.UUID(str(event["player_id"]))))
+            if user is None:
+                results[index] = {"index": index, "ok": False, "error": "player not found"}
+                continue
+            char = None
+            char_id = event.get("character_id")
+            if char_id:
+                char = next((c for c in user.active_characters if str(c.id) == str(char_id)), None)
+            if char is None and user.active_characters:
+                char = user.active_characters[0]
+            if char is None:
+                results[index] = {"index": index, "ok": True}
+                continue
+            groups.setdefault(char.id, (char, []))[1].append(index)
+
+        for char, indexes in groups.values():
+            claims: list[str] = []
+            try:
+                with transaction.atomic():
+                    halted = False
+                    for index in indexes:
+                        event = events[index]
+                        if halted:
+                            results[index] = {"index": index, "ok": False, "skipped": True, "error": "earlier event failed"}
+                            continue
+                        try:
+                            with transaction.atomic():
+                                result = GameLogicService.apply_game_event(
+                                    char, event["event_type"], event.get("data") or {}, event.get("event_id"), claims
+                                )
+                            results[index] = {"index": index, **result}
+                        except Exception as exc:
+                            results[index] = {"index": index, "ok": False, "error": str(exc)}
+                        halted = stop_on_failure and not results[index]["ok"]
+            except Exception as exc:
+                logger.error("apply_game_events: transaction failed for char %s: %s", char.id, exc)
+                # Nothing was committed, so the retries must not see these events as pending
+                for event_id in claims:
+                    idempotency.release(event_id)
+                for index in indexes:
+                    results[index] = {"index": index, "ok": False, "error": "transaction failed"}
+
+        return results
+
     @staticmethod
     @transaction.atomic
     def get_or_create_player_instances(character: Character):
@@ -76,67 +340,97 @@ class GameLogicService:
         stats, _ = PlayerStats.objects.select_for_update().get_or_create(character=character)
         return {"inventory": inventory, "stats": stats}
 
+    @staticmethod
+    def _load_slot_bitmap(inventory: PlayerInventory) -> SlotBitmap:
+        """Return the occupancy bitmap of a locked inventory, rebuilding it if stale."""
+        if SlotBitmap.is_valid(inventory.slot_bitmap, inventory.max_slots, inventory.slots_used):
+            return SlotBitmap(inventory.max_slots, inventory.slot_bitmap)
+        slots = PlayerItem.objects.filter(inventory=inventory).values_list("slot_index", flat=True)
+        bitmap = SlotBitmap.from_slots(inventory.max_slots, slots)
+        inventory.slots_used = bitmap.count()
+        return bitmap
+
     @staticmethod
     @transaction.atomic
     def add_item_to_inventory(character: Character, item_template_id: str, quantity: int = 1) -> PlayerInventory:
         """Add item to character inventory with locking."""
-        inventory, _ = PlayerInventory.objects.select_for_update().get_or_create(character=character)
-        item_template = ItemTemplate.objects.get(id=item_template_id)
+        return GameLogicService.add_items_to_inventory(character, [(item_template_id, quantity)])
 
-        if quantity < 1:
-            raise ValueError("Quantity must be at least 1")
+    @staticmethod
+    @transaction.atomic
+    def add_items_to_inventory(character: Character, grants: list) -> PlayerInventory:
+        """Add several (item_template_id, quantity) grants in one planned write.
 
-        def get_first_free_slot_index() -> int:
-            used = set(
-                PlayerItem.objects.filter(inventory=inventory).values_list("slot_index", flat=True)
-            )
-            for i in range(inventory.max_slots):
-                if i not in used:
-                    return i
-            raise ValueError("Inventory is full")
-
-        remaining = quantity
-
-        if item_template.stack_size > 1:
-            stacks = PlayerItem.objects.select_for_update().filter(
-                inventory=inventory,
-                item_template=item_template,
-                quantity__lt=item_template.stack_size,
-            ).order_by("slot_index")
-
-            for stack in stacks:
-                can_add = item_template.stack_size - stack.quantity
-                add_now = min(can_add, remaining)
-                if add_now > 0:
-                    stack.quantity += add_now
-                    stack.save(update_fields=["quantity", "updated_at"])
-                    remaining -= add_now
-                if remaining == 0:
-                    break
-
-            while remaining > 0:
-                slot_index = get_first_free_slot_index()
-                add_now = min(item_template.stack_size, remaining)
-                PlayerItem.objects.create(
-                    inventory=inventory,
-                    item_template=item_template,
-                    quantity=add_now,
-                    slot_index=slot_index,
+        Stacks are topped up first, then new items take the lowest free slots
+        from the occupancy bitmap. All changes are written with one
+        `bulk_update` (stacks) and one `bulk_create` (new items); nothing is
+        written when the inventory cannot hold every grant.
+        """
+        inventory, _ = PlayerInventory.objects.select_for_update().get_or_create(character=character)
+
+        template_ids = {str(template_id) for template_id, _ in grants}
+        templates = {str(t.id): t for t in ItemTemplate.objects.filter(id__in=template_ids)}
+        for template_id in template_ids:
+            if template_id not in templates:
+                raise ItemTemplate.DoesNotExist(f"ItemTemplate {template_id} does not exist")
+        for _, quantity in grants:
+            if quantity < 1:
+                raise ValueError("Quantity must be at least 1")
+
+        stackable = [t.id for t in templates.values() if t.stack_size > 1]
+        open_stacks: dict[str, list[PlayerItem]] = {}
+        if stackable:
+            for stack in (
+                PlayerItem.objects.select_for_update()
+                .filter(inventory=inventory, item_template_id__in=stackable)
+                .order_by("slot_index")
+            ):
+                open_stacks.setdefault(str(stack.item_template_id), []).append(stack)
+
+        bitmap = GameLogicService._load_slot_bitmap(inventory)
+        touched: dict = {}
+        new_items: list[PlayerItem] = []
+        for template_id, quantity in grants:
+            template = templates[str(template_id)]
+            remaining = quantity
+            if template.stack_size > 1:
+                for stack in open_stacks.get(str(template.id), []):
+                    add_now = min(template.stack_size - stack.quantity, remaining)
+                    if add_now > 0:
+                        stack.quantity += add_now
+                        touched[stack.id] = stack
+                        remaining -= add_now
+                    if remaining == 0:
+                        break
+                per_item = template.stack_size
+            else:
+                per_item = 1
+            if remaining == 0:
+                continue
+            count = -(-remaining // per_item)
+            for slot_index in bitmap.take_free(count):
+                add_now = min(per_item, remaining)
+                item = PlayerItem(
+                    inventory=inventory, item_template=template, quantity=add_now, slot_index=slot_index,
                 )
+                new_items.append(item)
+                if per_item > 1 and add_now < per_item:
+                    open_stacks.setdefault(str(template.id), []).append(item)
                 remaining -= add_now
-        else:
-            while remaining > 0:
-                slot_index = get_first_free_slot_index()
-                PlayerItem.objects.create(
-                    inventory=inventory,
-                    item_template=item_template,
-                    quantity=1,
-                    slot_index=slot_index,
-                )
-                remaining -= 1
 
-        inventory.slots_used = PlayerItem.objects.filter(inventory=inventory).count()
-        inventory.save(update_fields=["slots_used", "updated_at"])
+        if touched:
+            now = timezone.now()
+            for stack in touched.values():
+                stack.updated_at = now
+            PlayerItem.objects.bulk_update(
+                [s for s in touched.values() if not s._state.adding], ["quantity", "updated_at"]
+            )
+        if new_items:
+            PlayerItem.objects.bulk_create(new_items)
+
+        inventory.slots_used = bitmap.count()
+        inventory.slot_bitmap = bitmap.to_bytes()
+        inventory.save(update_fields=["slots_used", "slot_bitmap", "updated_at"])
 
         return inventory
 
@@ -153,9 +447,12 @@ class GameLogicService:
         if not item:
             raise ValueError("Invalid item index")
 
+        bitmap = GameLogicService._load_slot_bitmap(inventory)
         item.delete()
-        inventory.slots_used = PlayerItem.objects.filter(inventory=inventory).count()
-        inventory.save(update_fields=["slots_used", "updated_at"])
+        bitmap.release(item_index)
+        inventory.slots_used = bitmap.count()
+        inventory.slot_bitmap = bitmap.to_bytes()
+        inventory.save(update_fields=["slots_used", "slot_bitmap", "updated_at"])
 
         return inventory
 
@@ -183,6 +480,7 @@ class GameLogicService:
         if stats.mana > stats.max_mana: stats.mana = stats.max_mana
 
         stats.save()
+        GameLogicService._refresh_state_cache(character)
         return stats
 
     @staticmethod
@@ -212,48 +510,70 @@ class GameLogicService:
         GameLogicService._refresh_state_cache(character)
         return stats
 
+    @staticmethod
+    @transaction.atomic
+    def apply_experience_bulk(amounts: dict[str, int]) -> list[PlayerStats]:
+        """Grant coalesced XP to many characters with one locked read and one bulk_update.
+
+        `amounts` maps character id → XP accumulated by the XP buffer. Level ups
+        are processed exactly like `gain_experience`, which also creates missing
+        PlayerStats rows. Characters that leveled up get their cached state
+        rebuilt; the others only have `experience` patched in it, after the commit.
+        """
+        amounts = {str(cid): int(xp) for cid, xp in amounts.items() if int(xp) > 0}
+        if not amounts:
+            return []
+
+        locked = PlayerStats.objects.select_for_update().select_related("character__owner")
+        stats_list = list(locked.filter(character_id__in=list(amounts)))
+        missing = set(amounts) - {str(stats.character_id) for stats in stats_list}
+        if missing:
+            PlayerStats.objects.bulk_create(
+                [PlayerStats(character_id=cid) for cid in Character.objects.filter(id__in=missing).values_list("id", flat=True)],
+                ignore_conflicts=True,
+            )
+            stats_list += list(locked.filter(character_id__in=missing))
+        now = timezone.now()
+        leveled: list[Character] = []
+        for stats in stats_list:
+            level_before = stats.level
+            stats.experience += amounts[str(stats.character_id)]
+            while stats.experience >= GameLogicService.XP_PER_LEVEL:
+                stats.experience -= GameLogicService.XP_PER_LEVEL
+                stats.level += 1
+                stats.points_remaining += GameLogicService.POINTS_PER_LEVEL
+            stats.updated_at = now
+            if stats.level != level_before:
+                leveled.append(stats.character)
+
+        PlayerStats.objects.bulk_update(stats_list, ["experience", "level", "points_remaining", "updated_at"])
+        for stats in stats_list:
+            GameLogicService.update_leaderboard_cache(stats.character, stats)
+        for character in leveled:
+            GameLogicService._refresh_state_cache(character)
+        leveled_ids = {character.id for character in leveled}
+        patches = {
+            stats.character_id: stats.experience for stats in stats_list if stats.character_id not in leveled_ids
+        }
+        transaction.on_commit(lambda: [
+            GameLogicService._patch_cached_state(character_id, experience=experience)
+            for character_id, experience in patches.items()
+        ])
+        return stats_list
+
     @staticmethod
     def update_leaderboard_cache(character: Character, stats: PlayerStats):
-        """Update Redis Sorted Set leaderboard. Score = level * 1_000_000 + experience."""
-        from django.conf import settings
-        key = getattr(settings, "LEADERBOARD_CACHE_KEY", "game:leaderboard")
-        score = stats.level * 1_000_000 + stats.experience
-        user = character.owner
-        member = f"{user.id}:{character.name}"
-        try:
-            from django_redis import get_redis_connection
-            conn = get_redis_connection("default")
-            conn.zadd(key, {member: score})
-        except Exception:
-            from django.core.cache import cache
-            lb = cache.get(key, {})
-            lb[member] = score
-            cache.set(key, lb, timeout=3600)
+        """Update every leaderboard of the character (global, faction, class, PvP) in one pipeline.
+
+        Score = level * 1_000_000 + experience (PvP board: pvp_kills). See `leaderboard`.
+        """
+        leaderboard.update_character(character, stats)
 
     @staticmethod
-    def get_leaderboard(limit: int = 10) -> list[dict]:
-        """Return top-N players using Redis ZREVRANGE (O(log N + M))."""
-        from django.conf import settings
-        key = getattr(settings, "LEADERBOARD_CACHE_KEY", "game:leaderboard")
+    def get_leaderboard(limit: int = 10, board: str = "global", offset: int = 0) -> list[dict]:
+        """Return a page of a leaderboard using ZREVRANGE (O(log N + M))."""
         size = min(limit, getattr(settings, "LEADERBOARD_SIZE", 100))
-        try:
-            from django_redis import get_redis_connection
-            conn = get_redis_connection("default")
-            entries = conn.zrevrange(key, 0, size - 1, withscores=True)
-            results = []
-            for rank, (member_bytes, score) in enumerate(entries, start=1):
-                member = member_bytes.decode() if isinstance(member_bytes, bytes) else member_bytes
-                _, display_name = member.split(":", 1) if ":" in member else (member, member)
-                results.append({"rank": rank, "display_name": display_name, "score": int(score)})
-            return results
-        except Exception:
-            from django.core.cache import cache
-            lb: dict = cache.get(key, {})
-            sorted_lb = sorted(lb.items(), key=lambda x: x[1], reverse=True)[:size]
-            return [
-                {"rank": i + 1, "display_name": m.split(":", 1)[-1], "score": int(s)}
-                for i, (m, s) in enumerate(sorted_lb)
-            ]
+        return leaderboard.get_page(board, offset=offset, limit=size)["results"]
 
     @staticmethod
     @transaction.atomic
@@ -275,23 +595,55 @@ class GameLogicService:
 
         stats.points_remaining -= total
         stats.save(update_fields=allowed + ["points_remaining", "updated_at"])
+        GameLogicService.recompute_stat_sheet(character, stats)
         GameLogicService._refresh_state_cache(character)
         return stats
 
     @staticmethod
     @transaction.atomic
     def start_game_session(character: Character, hwid: str = "", ip: str = "", map_key: str = "") -> object:
+        """Start a session, ending the previous ones; raises ValueError when `map_key` is full.
+
+        Only maps with a configured capacity are checked. The Redis admission runs
+        after commit, so a rolled back start leaves no slot taken.
+        """
+        from apps.game_logic import map_population
+        from apps.game_logic.models import GameSession
+        ended = GameLogicService._end_active_sessions(character)
+        if map_key and not map_population.has_room(map_key, exclude=ended):
+            raise ValueError(f"Map '{map_key}' is full")
+        session = GameSession.objects.create(
+            character=character, ip_address=ip, is_active=True, last_map_key=map_key or None
+        )
+        if map_key:
+            transaction.on_commit(lambda: GameLogicService._admit_session(session.id, map_key))
+        return session
+
+    @staticmethod
+    def _admit_session(session_id, map_key: str) -> None:
+        """After commit: take the map slot; a session that lost the last slot to a concurrent start is ended."""
+        from apps.game_logic import map_population
         from apps.game_logic.models import GameSession
         from django.utils import timezone
-        GameSession.objects.filter(character=character, is_active=True).update(is_active=False, ended_at=timezone.now())
-        return GameSession.objects.create(character=character, ip_address=ip, is_active=True)
+        if not map_population.admit(session_id, map_key):
+            logger.warning("start_game_session: map %s filled up before session %s was admitted", map_key, session_id)
+            GameSession.objects.filter(id=session_id).update(is_active=False, ended_at=timezone.now())
 
     @staticmethod
     @transaction.atomic
     def end_game_session(character: Character):
+        GameLogicService._end_active_sessions(character)
+
+    @staticmethod
+    def _end_active_sessions(character: Character) -> list:
+        from apps.game_logic import map_population
         from apps.game_logic.models import GameSession
         from django.utils import timezone
-        GameSession.objects.filter(character=character, is_active=True).update(is_active=False, ended_at=timezone.now())
+        active = list(GameSession.objects.filter(character=character, is_active=True).values_list("id", flat=True))
+        if active:
+            GameSession.objects.filter(id__in=active).update(is_active=False, ended_at=timezone.now())
+            transaction.on_commit(lambda: map_population.leave(*active))
+        return active
 
     @staticmethod
     @transaction.atomic
@@ -305,6 +657,7 @@ class GameLogicService:
         victim_stats, _ = PlayerStats.objects.select_for_update().get_or_create(character=victim)
         victim_stats.pvp_deaths += 1
         victim_stats.save(update_fields=["pvp_deaths", "updated_at"])
+        GameLogicService.update_leaderboard_cache(killer, killer_stats)
 
     @staticmethod
     @transaction.atomic
@@ -345,14 +698,23 @@ class GameLogicService:
             inventory.gold += gold
             inventory.save(update_fields=["gold", "updated_at"])
 
-        for item_reward in items:
-            item_id = item_reward.get("item_template_id")
-            qty = int(item_reward.get("quantity", 1))
-            if item_id and qty > 0:
-                try:
-                    GameLogicService.add_item_to_inventory(character, item_id, qty)
-                except Exception as exc:
-                    logger.warning("complete_quest: failed to deliver item %s: %s", item_id, exc)
+        grants = [
+            (item_reward.get("item_template_id"), int(item_reward.get("quantity", 1)))
+            for item_reward in items
+        ]
+        grants = [(item_id, qty) for item_id, qty in grants if item_id and qty > 0]
+        if grants:
+            try:
+                with transaction.atomic():
+                    GameLogicService.add_items_to_inventory(character, grants)
+            except Exception:
+                # Deliver what fits, one grant at a time
+                for item_id, qty in grants:
+                    try:
+                        with transaction.atomic():
+                            GameLogicService.add_item_to_inventory(character, item_id, qty)
+                    except Exception as exc:
+                        logger.warning("complete_quest: failed to deliver item %s: %s", item_id, exc)
 
         if template.is_repeatable:
             progress.status = "in_progress"
@@ -363,41 +725,81 @@ class GameLogicService:
 
     @staticmethod
     def save_player_position(character: Character, pos_x: int, pos_y: int, hp: int) -> None:
-        """Persist last known position and HP for cross-restart state restore."""
+        """Persist last known position and HP for cross-restart state restore.
+
+        With POSITION_WRITE_BEHIND the value is buffered in Redis and written by
+        `flush_player_positions`; otherwise (or without Redis) it is saved now.
+        """
         safe_hp = max(1, min(hp, 99_999))
-        PlayerStats.objects.filter(character=character).update(
-            last_pos_x=pos_x,
-            last_pos_y=pos_y,
-            health=safe_hp,
-        )
+        if not (getattr(settings, "POSITION_WRITE_BEHIND", False) and position_buffer.buffer_position(
+            character.id, pos_x, pos_y, hp
+        )):
+            PlayerStats.objects.filter(character=character).update(
+                last_pos_x=pos_x,
+                last_pos_y=pos_y,
+                health=safe_hp,
+            )
+        # Keep the cached state (served by GameStateView) in step with the buffer
+        GameLogicService._patch_cached_state(character.id, pos_x=pos_x, pos_y=pos_y, hp=safe_hp)
+
+    @staticmethod
+    def save_player_positions_bulk(positions: dict[str, tuple[int, int, int]]) -> int:
+        """Persist many (pos_x, pos_y, hp) entries keyed by character id.
+
+        One bulk_update (a single UPDATE ... CASE statement) per
+        POSITION_FLUSH_BATCH_SIZE characters. Returns the number of rows written.
+        """
+        if not positions:
+            return 0
+        batch_size = int(getattr(settings, "POSITION_FLUSH_BATCH_SIZE", 2000))
+        character_ids = list(positions)
+        written = 0
+        for start in range(0, len(character_ids), batch_size):
+            chunk = character_ids[start:start + batch_size]
+            rows = list(PlayerStats.objects.filter(character_id__in=chunk).only("id", "character_id"))
+            now = timezone.now()
+            for stats in rows:
+                pos_x, pos_y, hp = positions[str(stats.character_id)]
+                stats.last_pos_x = pos_x
+                stats.last_pos_y = pos_y
+                stats.health = max(1, min(hp, 99_999))
+                stats.updated_at = now
+            PlayerStats.objects.bulk_update(rows, ["last_pos_x", "last_pos_y", "health", "updated_at"])
+            written += len(rows)
+        return written
 
     @staticmethod
-    @transaction.atomic
     def update_kill_progress(character: Character, npc_type: str) -> list:
-        """Increment kill counters in active quests that match npc_type."""
+        """Increment kill counters in active quests that match npc_type.
+
+        Uses the compiled `quest_index`, so only progress rows of quests that
+        track `kill_<npc_type>` are locked; a kill no quest tracks costs no query.
+        """
         kill_key = f"kill_{npc_type}"
+        tracked = quest_index.quests_for_kill(kill_key)
+        if not tracked:
+            return []
+        with transaction.atomic():
+            return GameLogicService._advance_kill_objectives(character, kill_key, tracked)
+
+    @staticmethod
+    def _advance_kill_objectives(character: Character, kill_key: str, tracked: dict) -> list:
+        # quest_id is free text; accept both the canonical and the hex UUID forms
+        lookup: dict[str, str] = {}
+        for quest_id in tracked:
+            lookup[quest_id] = quest_id
+            lookup[quest_id.replace("-", "")] = quest_id
         progresses = list(
             QuestProgress.objects.select_for_update()
-            .filter(character=character, status="in_progress")
+            .filter(character=character, status="in_progress", quest_id__in=list(lookup))
         )
         updated = []
         for progress in progresses:
-            try:
-                template = QuestTemplate.objects.get(id=progress.quest_id)
-            except Exception:
-                continue
-
-            objectives = template.objectives or []
-            matching = [obj for obj in objectives if isinstance(obj, dict) and obj.get("key") == kill_key]
-            if not matching:
-                continue
-
+            objectives = tracked[lookup[progress.quest_id]]
             current = dict(progress.current_objectives or {})
             changed = False
-            for obj in matching:
-                key = obj["key"]
-                target = int(obj.get("target_count", 1))
-                if int(current.get(key, 0)) < target:
+            for key, target in objectives:
+                if key == kill_key and int(current.get(key, 0)) < target:
                     current[key] = int(current.get(key, 0)) + 1
                     changed = True
 
@@ -408,11 +810,7 @@ class GameLogicService:
             progress.save(update_fields=["current_objectives", "updated_at"])
             updated.append(progress)
 
-            all_done = all(
-                int(current.get(obj["key"], 0)) >= int(obj.get("target_count", 1))
-                for obj in objectives
-                if isinstance(obj, dict) and obj.get("key")
-            )
+            all_done = all(int(current.get(key, 0)) >= target for key, target in objectives)
             if all_done:
                 try:
                     GameLogicService.complete_quest(character, progress.quest_id)
@@ -424,19 +822,20 @@ class GameLogicService:
     @staticmethod
     def get_equipment_bonuses(character: Character) -> dict:
         """Return dict of summed stat bonuses from all currently equipped items."""
+        equipped = PlayerItem.objects.filter(
+            inventory__character=character
+        ).exclude(equip_slot="").select_related("item_template")
+        return GameLogicService._sum_equipment_bonuses(equipped)
+
+    @staticmethod
+    def _sum_equipment_bonuses(equipped_items) -> dict:
         bonuses: dict = {
             "phys_damage": 0, "mag_damage": 0,
             "phys_defense": 0, "mag_defense": 0,
             "health": 0, "mana": 0,
             "attack_speed": 0.0, "speed": 0,
         }
-        inventory = PlayerInventory.objects.filter(character=character).first()
-        if not inventory:
-            return bonuses
-        equipped = PlayerItem.objects.filter(
-            inventory=inventory
-        ).exclude(equip_slot="").select_related("item_template")
-        for item in equipped:
+        for item in equipped_items:
             t = item.item_template
             bonuses["phys_damage"]  += t.base_phys_damage
             bonuses["mag_damage"]   += t.base_mag_damage
@@ -586,6 +985,7 @@ class GameLogicService:
 
         item.equip_slot = equip_slot
         item.save(update_fields=["equip_slot", "updated_at"])
+        GameLogicService.recompute_stat_sheet(character)
         GameLogicService._refresh_state_cache(character)
         return item
 
@@ -599,38 +999,62 @@ class GameLogicService:
         PlayerItem.objects.select_for_update().filter(
             inventory=inventory, equip_slot=equip_slot
         ).update(equip_slot="")
+        GameLogicService.recompute_stat_sheet(character)
         GameLogicService._refresh_state_cache(character)
 
+    # Bump when the cached state document changes shape; older documents are misses
+    PLAYER_STATE_VERSION = 4
+    PLAYER_STATE_TTL = 3600
+
     @staticmethod
-    def preload_character_state_to_redis(character: Character) -> None:
-        """Write the full character state to cache (Redis in prod).
-        Key: game:player_state:{character_id}
-        """
-        from django.core.cache import cache
+    def player_state_key(character_id) -> str:
+        return f"game:player_state:{character_id}"
+
+    @staticmethod
+    def default_character_key(user_id) -> str:
+        return f"game:player_default_char:{user_id}"
+
+    @staticmethod
+    def build_character_state(character: Character) -> dict | None:
+        """Build the game-server state document of a character from the DB."""
         stats = PlayerStats.objects.filter(character=character).first()
         if not stats:
-            return
-        bonuses = GameLogicService.get_equipment_bonuses(character)
+            return None
+        sheet = GameLogicService.get_stat_sheet(character)
         skill_qs = PlayerSkill.objects.filter(character=character, is_equipped=True).select_related("skill_template")
+        party_id = (
+            Party.objects.filter(memberships__user_id=character.owner_id, is_active=True)
+            .values_list("id", flat=True)
+            .first()
+        )
+        return GameLogicService._state_document(character, stats, sheet, skill_qs, party_id)
+
+    @staticmethod
+    def _state_document(character, stats, sheet, equipped_skills, party_id) -> dict:
+        # Max HP/mana are the derived vitals of the stat sheet (attributes, equipment and passives)
         skill_list = [
             {
                 "server_id": s.skill_template.server_id,
                 "current_level": s.current_level,
                 "slot_index": s.slot_index,
             }
-            for s in skill_qs
+            for s in equipped_skills
             if s.skill_template.server_id is not None
         ]
-        passive_bonuses = GameLogicService.compute_passive_bonuses(character)
-        state = {
+        return {
+            "state_version": GameLogicService.PLAYER_STATE_VERSION,
+            "character_id": str(character.id),
+            "owner_id":     str(character.owner_id),
             "name":         character.name,
             "hp":           stats.health,
-            "max_hp":       stats.max_health,
+            "max_hp":       sheet.max_hp,
             "mana":         stats.mana,
-            "max_mana":     stats.max_mana,
+            "max_mana":     sheet.max_mana,
             "pos_x":        stats.last_pos_x,
             "pos_y":        stats.last_pos_y,
             "level":        stats.level,
+            "experience":   stats.experience,
+            "points_remaining": stats.points_remaining,
             "strength":     stats.strength,
             "agility":      stats.agility,
             "intelligence": stats.intelligence,
@@ -638,16 +1062,182 @@ class GameLogicService:
             "faction":      character.faction,
             "character_class": character.character_class,
             "race":         character.race,
-            "equipment_bonuses": bonuses,
-            "passive_bonuses":   passive_bonuses,
+            "equipment_bonuses": sheet.equipment_bonuses,
+            "passive_bonuses":   sheet.passive_bonuses,
             "skills":       skill_list,
+            "party_id":     str(party_id) if party_id else None,
         }
-        cache.set(f"game:player_state:{character.id}", state, timeout=3600)
 
     @staticmethod
-    def _refresh_state_cache(character: Character) -> None:
-        """Schedule a cache refresh to run after the current transaction commits."""
-        transaction.on_commit(lambda: GameLogicService.preload_character_state_to_redis(character))
+    def get_character_states_bulk(user_ids: list, character_ids: list) -> tuple[list[dict], list[str]]:
+        """Resolve many game-server states at once.
+
+        Warm states are read from the cache with `get_many`; the misses are built
+        with a fixed set of queries (characters, stats, stat sheets, skills,
+        party memberships, plus equipped items when sheets are missing) however
+        large the batch. Returns (states, ids that could not be resolved).
+        """
+        from django.core.cache import cache
+
+        user_ids = list(dict.fromkeys(str(u) for u in user_ids))
+        character_ids = list(dict.fromkeys(str(c) for c in character_ids))
+
+        pointer_keys = {GameLogicService.default_character_key(u): u for u in user_ids}
+        pointers = cache.get_many(list(pointer_keys))
+        resolved_users = {pointer_keys[k]: str(v) for k, v in pointers.items()}
+
+        wanted = character_ids + [c for c in resolved_users.values() if c not in character_ids]
+        cached = cache.get_many([GameLogicService.player_state_key(c) for c in wanted])
+        states: dict[str, dict] = {}
+        for state in cached.values():
+            if state and state.get("state_version") == GameLogicService.PLAYER_STATE_VERSION:
+                states[state["character_id"]] = state
+
+        missing_chars = [c for c in character_ids if c not in states]
+        missing_users = [
+            u for u in user_ids
+            if resolved_users.get(u) not in states
+            or states[resolved_users[u]]["owner_id"] != u
+        ]
+        if missing_chars or missing_users:
+            built, defaults = GameLogicService._build_character_states(missing_chars, missing_users)
+            states.update(built)
+            resolved_users.update(defaults)
+            to_cache = {GameLogicService.player_state_key(c): st for c, st in built.items()}
+            to_cache.update({GameLogicService.default_character_key(u): c for u, c in defaults.items()})
+            if to_cache:
+                cache.set_many(to_cache, timeout=GameLogicService.PLAYER_STATE_TTL)
+
+        results: list[dict] = []
+        seen: set[str] = set()
+        missing: list[str] = []
+        for c in character_ids:
+            if c in states:
+                if c not in seen:
+                    results.append(states[c])
+                    seen.add(c)
+            else:
+                missing.append(c)
+        for u in user_ids:
+            c = resolved_users.get(u)
+            if c in states and states[c]["owner_id"] == u:
+                if c not in seen:
+                    results.append(states[c])
+                    seen.add(c)
+            else:
+                missing.append(u)
+        return results, missing
+
+    @staticmethod
+    def _build_character_states(character_ids: list[str], user_ids: list[str]) -> tuple[dict, dict]:
+        """Set-based DB path of get_character_states_bulk: ({char_id: state}, {user_id: default char_id})."""
+        from django.db.models import Q
+
+        query = Q(id__in=character_ids) | Q(owner_id__in=user_ids)
+        characters = list(Character.objects.filter(query, is_active=True).order_by("owner_id", "-created_at"))
+        defaults: dict[str, str] = {}
+        for character in characters:
+            owner = str(character.owner_id)
+            if owner in user_ids and owner not in defaults:
+                defaults[owner] = str(character.id)
+        needed = {c for c in character_ids} | set(defaults.values())
+        characters = [c for c in characters if str(c.id) in needed]
+        if not characters:
+            return {}, defaults
+
+        stats_by_char = {
+            str(st.character_id): st for st in PlayerStats.objects.filter(character__in=characters)
+        }
+        sheets = {
+            str(sh.character_id): sh for sh in CharacterStatSheet.objects.filter(character__in=characters)
+        }
+        skills_by_char: dict[str, list[PlayerSkill]] = {}
+        for ps in PlayerSkill.objects.filter(character__in=characters).select_related("skill_template"):
+            skills_by_char.setdefault(str(ps.character_id), []).append(ps)
+        party_by_owner = dict(
+            PartyMember.objects.filter(
+                user_id__in={c.owner_id for c in characters}, party__is_active=True
+            ).values_list("user_id", "party_id")
+        )
+
+        without_sheet = [c for c in characters if str(c.id) not in sheets and str(c.id) in stats_by_char]
+        if without_sheet:
+            equipped_by_char: dict[str, list[PlayerItem]] = {}
+            for item in (
+                PlayerItem.objects.filter(inventory__character__in=without_sheet)
+                .exclude(equip_slot="").select_related("item_template", "inventory")
+            ):
+                equipped_by_char.setdefault(str(item.inventory.character_id), []).append(item)
+            new_sheets = []
+            for character in without_sheet:
+                key = str(character.id)
+                values = GameLogicService._stat_sheet_values(
+                    stats_by_char[key],
+                    GameLogicService._sum_equipment_bonuses(equipped_by_char.get(key, [])),
+                    GameLogicService._sum_passive_bonuses(skills_by_char.get(key, [])),
+                )
+                new_sheets.append(CharacterStatSheet(character=character, **values))
+            CharacterStatSheet.objects.bulk_create(new_sheets, ignore_conflicts=True)
+            sheets.update({str(sh.character_id): sh for sh in new_sheets})
+
+        states: dict[str, dict] = {}
+        for character in characters:
+            key = str(character.id)
+            stats = stats_by_char.get(key)
+            if stats is None:
+                continue
+            equipped = [ps for ps in skills_by_char.get(key, []) if ps.is_equipped]
+            states[key] = GameLogicService._state_document(
+                character, stats, sheets[key], equipped, party_by_owner.get(character.owner_id),
+            )
+        return states, defaults
+
+    @staticmethod
+    def preload_character_state_to_redis(character: Character) -> dict | None:
+        """Write the full character state to cache (Redis in prod) and return it.
+        Key: game:player_state:{character_id}
+        """
+        from django.core.cache import cache
+        state = GameLogicService.build_character_state(character)
+        if state is not None:
+            cache.set(
+                GameLogicService.player_state_key(character.id), state, timeout=GameLogicService.PLAYER_STATE_TTL
+            )
+        return state
+
+    @staticmethod
+    def get_cached_character_state(character_id) -> dict | None:
+        """Return the cached state document, or None on a miss or an outdated version."""
+        from django.core.cache import cache
+        state = cache.get(GameLogicService.player_state_key(character_id))
+        if not state or state.get("state_version") != GameLogicService.PLAYER_STATE_VERSION:
+            return None
+        return state
+
+    @staticmethod
+    def _patch_cached_state(character_id, **fields) -> None:
+        """Update fields of a cached state in place (no-op on a miss)."""
+        from django.core.cache import cache
+        state = GameLogicService.get_cached_character_state(character_id)
+        if state is None:
+            return
+        state.update(fields)
+        cache.set(GameLogicService.player_state_key(character_id), state, timeout=GameLogicService.PLAYER_STATE_TTL)
+
+    @staticmethod
+    def _refresh_state_cache(target: Character | User) -> None:
+        """Schedule a cache refresh to run after the current transaction commits.
+
+        Accepts a Character, or a User to refresh all of their active characters
+        (party changes affect every character of the account).
+        """
+        if isinstance(target, User):
+            def refresh_all():
+                for character in Character.objects.filter(owner=target, is_active=True):
+                    GameLogicService.preload_character_state_to_redis(character)
+            transaction.on_commit(refresh_all)
+            return
+        transaction.on_commit(lambda: GameLogicService.preload_character_state_to_redis(target))
 
     # ── Class / racial passive server_ids (mirrors game_data/0006 migration) ────
     _CLASS_PASSIVE_SERVER_ID: dict[str, int] = {
@@ -776,6 +1366,8 @@ class GameLogicService:
         GameLogicService._grant_passives_to_char(character)
         
         GameLogicService.preload_character_state_to_redis(character)
+        from django.core.cache import cache
+        transaction.on_commit(lambda: cache.delete(GameLogicService.default_character_key(user.id)))
         return character
 
     @staticmethod
@@ -806,6 +1398,11 @@ class GameLogicService:
     @staticmethod
     def compute_passive_bonuses(character: Character) -> dict:
         """Accumulate all passive stat bonuses for a character."""
+        passives = PlayerSkill.objects.filter(character=character).select_related("skill_template")
+        return GameLogicService._sum_passive_bonuses(passives)
+
+    @staticmethod
+    def _sum_passive_bonuses(player_skills) -> dict:
         bonuses: dict[str, int] = {
             "str": 0, "agi": 0, "int": 0, "vit": 0,
             "max_hp_pct": 0,    "max_mana_pct": 0,
@@ -813,8 +1410,7 @@ class GameLogicService:
             "phys_defense_pct": 0, "mag_defense_pct": 0,
             "move_speed_pct": 0, "attack_range_pct": 0,
         }
-        passives = PlayerSkill.objects.filter(character=character).select_related("skill_template")
-        for ps in passives:
+        for ps in player_skills:
             t = ps.skill_template
             if not (t.is_passive or t.is_racial_passive):
                 continue
@@ -827,6 +1423,45 @@ class GameLogicService:
                 bonuses[key] += int(effects.get(key, 0))
         return bonuses
 
+    @staticmethod
+    def _stat_sheet_values(stats: PlayerStats | None, equipment: dict, passives: dict) -> dict:
+        """Field values of a CharacterStatSheet (AttributeCalculator order)."""
+        vit = (stats.vitality if stats else 10) + passives["vit"]
+        intel = (stats.intelligence if stats else 10) + passives["int"]
+        return {
+            "equipment_bonuses": equipment,
+            "passive_bonuses": passives,
+            "max_hp": (100 + vit * 15 + equipment["health"]) * (100 + passives["max_hp_pct"]) // 100,
+            "max_mana": (50 + intel * 10 + equipment["mana"]) * (100 + passives["max_mana_pct"]) // 100,
+        }
+
+    @staticmethod
+    def recompute_stat_sheet(character: Character, stats: PlayerStats | None = None) -> CharacterStatSheet:
+        """Rebuild the materialized stat sheet of a character.
+
+        Called inside equip/unequip, learn/upgrade skill and allocate_points so
+        readers get equipment bonuses, passives and derived vitals in one fetch.
+        Derived vitals follow AttributeCalculator: flat passives are added to the
+        attribute, the equipment bonus to the result, then the % passive applies.
+        """
+        if stats is None:
+            stats = PlayerStats.objects.filter(character=character).first()
+        values = GameLogicService._stat_sheet_values(
+            stats,
+            GameLogicService.get_equipment_bonuses(character),
+            GameLogicService.compute_passive_bonuses(character),
+        )
+        sheet, _ = CharacterStatSheet.objects.update_or_create(character=character, defaults=values)
+        return sheet
+
+    @staticmethod
+    def get_stat_sheet(character: Character) -> CharacterStatSheet:
+        """Return the stat sheet (one primary-key fetch), building it on first use."""
+        sheet = CharacterStatSheet.objects.filter(character_id=character.id).first()
+        if sheet is None:
+            sheet = GameLogicService.recompute_stat_sheet(character)
+        return sheet
+
     @staticmethod
     def grant_starter_skills_to_char(character: Character) -> list[PlayerSkill]:
         """Create PlayerSkill records for each starter skill of the given character."""
@@ -905,7 +1540,8 @@ class GameLogicService:
 
         skill.current_level += 1
         skill.save(update_fields=["current_level", "updated_at"])
-        GameLogicService._refresh_state_cache(user)
+        GameLogicService.recompute_stat_sheet(character)
+        GameLogicService._refresh_state_cache(character)
         return skill
 
     @staticmethod
@@ -919,6 +1555,7 @@ class GameLogicService:
         if not created:
             player_skill.current_level += 1
             player_skill.save(update_fields=["current_level", "updated_at"])
+        GameLogicService.recompute_stat_sheet(character)
         GameLogicService._refresh_state_cache(character)
         return player_skill
 
@@ -929,12 +1566,19 @@ class GameLogicService:
     def create_party(leader: User) -> Party:
         """Create a new party with leader as the first member. Disbands any existing active party."""
         # Disband any party the user currently leads
+        ex_members = list(
+            User.objects.filter(
+                party_memberships__party__leader=leader, party_memberships__party__is_active=True
+            ).exclude(id=leader.id).distinct()
+        )
         Party.objects.filter(leader=leader, is_active=True).update(is_active=False)
         # Leave any party the user is currently a member of
         PartyMember.objects.filter(user=leader, party__is_active=True).delete()
 
         party = Party.objects.create(leader=leader)
         PartyMember.objects.create(party=party, user=leader)
+        for ex_member in ex_members:
+            GameLogicService._refresh_state_cache(ex_member)
         GameLogicService._refresh_state_cache(leader)
         return party
 
@@ -0,0 +1,42 @@
+import logging
+from django.db.models.signals import post_save, post_delete
+
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_quest_index():
+    try:
+        from apps.game_logic import quest_index
+        quest_index.invalidate()
+        logger.debug("quest objective index invalidated")
+    except Exception as exc:
+        logger.warning("quest objective index invalidation failed: %s", exc)
+
+
+def _invalidate_map_caches():
+    try:
+        from apps.game_logic import interest, map_population
+        map_population.invalidate_capacities()
+        interest.invalidate_cell_sizes()
+    except Exception as exc:
+        logger.warning("map cache invalidation failed: %s", exc)
+
+
+def _invalidate_chat_filter():
+    try:
+        from apps.game_logic import chat_filter
+        chat_filter.invalidate()
+    except Exception as exc:
+        logger.warning("chat filter invalidation failed: %s", exc)
+
+
+def _register_signals():
+    from apps.game_data.models import MapData
+    from apps.game_logic.models import ChatFilterTerm, QuestTemplate
+
+    post_save.connect(lambda sender, **kw: _invalidate_quest_index(), sender=QuestTemplate, weak=False)
+    post_delete.connect(lambda sender, **kw: _invalidate_quest_index(), sender=QuestTemplate, weak=False)
+    post_save.connect(lambda sender, **kw: _invalidate_map_caches(), sender=MapData, weak=False)
+    post_delete.connect(lambda sender, **kw: _invalidate_map_caches(), sender=MapData, weak=False)
+    post_save.connect(lambda sender, **kw: _invalidate_chat_filter(), sender=ChatFilterTerm, weak=False)
+    post_delete.connect(lambda sender, **kw: _invalidate_chat_filter(), sender=ChatFilterTerm, weak=False)
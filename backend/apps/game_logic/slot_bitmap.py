@@ -0,0 +1,73 @@
+"""
+Bitmap de ocupação de slots do inventário.
+
+`PlayerInventory.slot_bitmap` guarda um bit por slot (bit i = slot i ocupado),
+atualizado na mesma transação que cria/remove `PlayerItem`. Com ele a
+alocação de slots livres é feita em memória, sem reler todos os `slot_index`
+do inventário a cada item.
+
+O bitmap é tratado como cache: se o tamanho não corresponde a `max_slots` ou a
+contagem de bits diverge de `slots_used` (itens gravados fora do service, ex.
+admin), ele é reconstruído a partir do banco com uma única consulta.
+"""
+
+
+class SlotBitmap:
+    """Mutable occupancy bitmap for `max_slots` inventory slots."""
+
+    def __init__(self, max_slots: int, raw: bytes | None = None):
+        self.max_slots = max_slots
+        size = (max_slots + 7) // 8
+        data = bytes(raw or b"")
+        self._bits = bytearray(data[:size].ljust(size, b"\x00"))
+
+    @classmethod
+    def from_slots(cls, max_slots: int, slots) -> "SlotBitmap":
+        bitmap = cls(max_slots)
+        for slot in slots:
+            if 0 <= slot < max_slots:
+                bitmap.occupy(slot)
+        return bitmap
+
+    @staticmethod
+    def is_valid(raw: bytes | None, max_slots: int, slots_used: int) -> bool:
+        """True when `raw` matches the inventory size and its recorded slot count."""
+        raw = bytes(raw or b"")
+        if len(raw) != (max_slots + 7) // 8:
+            return False
+        return sum(bin(byte).count("1") for byte in raw) == slots_used
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+    def is_occupied(self, slot: int) -> bool:
+        return bool(self._bits[slot >> 3] & (1 << (slot & 7)))
+
+    def occupy(self, slot: int) -> None:
+        self._bits[slot >> 3] |= 1 << (slot & 7)
+
+    def release(self, slot: int) -> None:
+        self._bits[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def count(self) -> int:
+        return sum(bin(byte).count("1") for byte in self._bits)
+
+    def take_free(self, n: int) -> list[int]:
+        """Reserve the `n` lowest free slots; raises ValueError if there are fewer."""
+        taken: list[int] = []
+        if n <= 0:
+            return taken
+        for byte_index, byte in enumerate(self._bits):
+            if byte == 0xFF:
+                continue
+            for bit in range(8):
+                slot = (byte_index << 3) | bit
+                if slot >= self.max_slots:
+                    break
+                if not byte & (1 << bit):
+                    taken.append(slot)
+                    if len(taken) == n:
+                        for s in taken:
+                            self.occupy(s)
+                        return taken
+        raise ValueError("Inventory is full")
@@ -0,0 +1,149 @@
+"""
+Snapshots delta do mundo por conexão.
+
+`GameConsumer` não repassa os `world.update` do tick: cada conexão tem um
+`DeltaTracker` que guarda o último estado enviado ao cliente (a base que ele
+tem aplicada — o WebSocket é confiável e ordenado, então enviado = recebido) e
+transforma cada update em um `world.delta` com:
+
+- `entered`: entidades novas na área de interesse (com `display_name`);
+- `moved`: entidades que andaram pelo menos `WORLD_DELTA_MIN_MOVE` unidades
+  desde a posição que o cliente tem;
+- `left`: entidades que saíram da área de interesse ou do mapa.
+
+Coordenadas vão quantizadas em inteiros de `WORLD_DELTA_QUANTUM` unidades
+(`x = round(x_mundo / quantum)`). A cada `WORLD_KEYFRAME_SECONDS`, ou quando o
+cliente pede `{"type": "snapshot.resync"}`, sai um keyframe (`keyframe: true`)
+com todas as entidades da visão, que substitui o estado do cliente.
+
+A saída é sempre explícita: uma entidade só deixa a visão quando fica fora do
+alcance (`visible` / `drop_outside`) ou quando o `world.update` a traz em
+`left` (troca de mapa ou desconexão, via `world_ticker.forget_player`). Quem
+está parado continua na visão e nos keyframes, por mais tempo que fique sem
+aparecer nos updates.
+
+`observe` monta a mensagem na hora. O consumer usa `fold` + `pending`: os
+updates entram na visão assim que chegam e a mensagem só é montada quando a fila
+de envio da conexão (`send_queue`) a despacha, então um cliente lento recebe um
+único delta com tudo o que mudou em vez de uma fila de deltas velhos.
+"""
+import time
+
+
+class DeltaTracker:
+    """Per-connection view of nearby entities and the baseline the client holds."""
+
+    def __init__(self, quantum: float, min_move: float, keyframe_seconds: float, clock=time.monotonic):
+        self.quantum = quantum
+        self.min_move_q = max(1, round(min_move / quantum))
+        self.keyframe_seconds = keyframe_seconds
+        self.clock = clock
+        self.map_key = ""
+        self.seq = 0
+        self.reset()
+
+    def reset(self, map_key: str = "") -> None:
+        """Forget everything (map change); the next message is a keyframe."""
+        self.map_key = map_key
+        self.view: dict[str, dict] = {}
+        self.sent: dict[str, tuple[int, int]] = {}
+        self.last_keyframe = float("-inf")
+        # Folded since the last message: touched ids (insertion-ordered) and ids that left the view
+        self._touched: dict[str, None] = {}
+        self._left: set[str] = set()
+
+    def request_keyframe(self) -> None:
+        self.last_keyframe = float("-inf")
+
+    def _quantize(self, value) -> int:
+        return round(float(value) / self.quantum)
+
+    def _message(self, keyframe: bool, entered, moved, left) -> dict:
+        self.seq += 1
+        return {
+            "type": "world.delta",
+            "seq": self.seq,
+            "keyframe": keyframe,
+            "quantum": self.quantum,
+            "map_key": self.map_key,
+            "entered": entered,
+            "moved": moved,
+            "left": left,
+        }
+
+    def observe(self, players, visible=None, left=()) -> dict | None:
+        """Fold one world.update into the view; returns the message to send, or None."""
+        self.fold(players, visible, left)
+        return self.pending()
+
+    def fold(self, players, visible=None, left=()) -> None:
+        """Fold one world.update into the view; the message is built later by `pending`."""
+        for player_id in left:
+            if self.view.pop(player_id, None) is not None:
+                self._forget(player_id)
+        for player in players:
+            player_id = player["player_id"]
+            if visible is not None and not visible(player["x"], player["y"]):
+                if self.view.pop(player_id, None) is not None:
+                    self._forget(player_id)
+                continue
+            self.view[player_id] = {
+                "player_id": player_id,
+                "display_name": player.get("display_name", ""),
+                "x": self._quantize(player["x"]),
+                "y": self._quantize(player["y"]),
+            }
+            self._touched[player_id] = None
+            self._left.discard(player_id)
+
+    def _forget(self, player_id: str) -> None:
+        self._touched.pop(player_id, None)
+        self._left.add(player_id)
+
+    def pending(self) -> dict | None:
+        """Message for everything folded since the last one (a keyframe when due), or None."""
+        touched, left = list(self._touched), self._left
+        self._touched, self._left = {}, set()
+        if self.clock() - self.last_keyframe >= self.keyframe_seconds:
+            return self.keyframe()
+        return self._delta(touched, left)
+
+    def drop_outside(self, visible) -> bool:
+        """After the own player changed cell: entities now out of range leave (on the next `pending`)."""
+        gone = [
+            player_id for player_id, entity in self.view.items()
+            if not visible(entity["x"] * self.quantum, entity["y"] * self.quantum)
+        ]
+        for player_id in gone:
+            del self.view[player_id]
+            self._forget(player_id)
+        return bool(gone)
+
+    def keyframe(self) -> dict:
+        self.sent = {pid: (e["x"], e["y"]) for pid, e in self.view.items()}
+        self.last_keyframe = self.clock()
+        self._touched, self._left = {}, set()
+        entered = [
+            {"player_id": e["player_id"], "display_name": e["display_name"], "x": e["x"], "y": e["y"]}
+            for e in self.view.values()
+        ]
+        return self._message(True, entered, [], [])
+
+    def _delta(self, touched: list[str], left: set[str]) -> dict | None:
+        entered, moved = [], []
+        for player_id in touched:
+            entity = self.view[player_id]
+            base = self.sent.get(player_id)
+            position = (entity["x"], entity["y"])
+            if base is None:
+                entered.append({"player_id": player_id, "display_name": entity["display_name"],
+                                "x": position[0], "y": position[1]})
+            elif max(abs(position[0] - base[0]), abs(position[1] - base[1])) >= self.min_move_q:
+                moved.append({"player_id": player_id, "x": position[0], "y": position[1]})
+            else:
+                continue
+            self.sent[player_id] = position
+        left_ids = sorted(pid for pid in left if self.sent.pop(pid, None) is not None)
+        if not (entered or moved or left_ids):
+            return None
+        return self._message(False, entered, moved, left_ids)
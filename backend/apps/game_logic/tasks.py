@@ -6,17 +6,25 @@ agendadas pelo Celery Beat ou disparadas por eventos do jogo.
 
 ## Tarefas
 
-### rebuild_leaderboard_cache
-Reconstrói o Sorted Set do ranking no Redis a partir dos dados do banco.
-- Executa em batch de 500 jogadores com pipeline Redis para performance.
+### rebuild_leaderboard_cache(mode="incremental" | "full")
+Reconstrói os rankings (`leaderboard`: global, facção, classe, PvP) a partir do banco.
+- `incremental`: só personagens com `PlayerStats`/`Character` alterados desde a marca d'água
+  (`game:leaderboard:watermark`); personagens desativados saem dos rankings.
+- `full`: monta os boards em chaves temporárias e troca com RENAME atômico (remove
+  personagens apagados e membros antigos).
+- Retorna `{"mode", "rows", "removed", "seconds"}` para dimensionar o agendamento.
 - Fallback automático para LocMemCache se Redis estiver indisponível.
-- **Agendar:** a cada 10 minutos via Celery Beat.
+- **Agendar:** incremental a cada minuto e full a cada hora via Celery Beat.
   ```python
-  # settings/celery.py
   CELERY_BEAT_SCHEDULE = {
-      "rebuild-leaderboard": {
+      "rebuild-leaderboard-cache": {
           "task": "apps.game_logic.tasks.rebuild_leaderboard_cache",
-          "schedule": crontab(minute="*/10"),
+          "schedule": 60,
+      },
+      "rebuild-leaderboard-full": {
+          "task": "apps.game_logic.tasks.rebuild_leaderboard_cache",
+          "schedule": crontab(minute=15),
+          "kwargs": {"mode": "full"},
       },
   }
   ```
@@ -29,8 +37,32 @@ Entrega as recompensas de uma missão concluída de forma assíncrona.
   deliver_quest_rewards.delay(str(user.id), str(quest_id))
   ```
 
+### drain_game_event_streams
+Drena uma rodada de cada partição da fila de eventos (`event_queue`), sem bloquear.
+- Rede de segurança para os workers `consume_game_events`; no-op se `GAME_EVENTS_ASYNC=False`.
+- **Agendar:** a cada 5 segundos via Celery Beat.
+
+### flush_xp_buffer
+Aplica o XP acumulado pelo buffer de `player_action` (`xp_buffer`) em um único `bulk_update`.
+- No-op se `XP_BUFFER_ENABLED=False`.
+- **Agendar:** a cada `XP_BUFFER_FLUSH_SECONDS` (padrão 5 s) via Celery Beat.
+
+### flush_player_positions
+Persiste as posições/HP sujas do buffer write-behind (`position_buffer`) com `bulk_update`.
+- No-op se `POSITION_WRITE_BEHIND=False`.
+- **Agendar:** a cada `POSITION_FLUSH_SECONDS` (padrão 10 s) via Celery Beat.
+
+### purge_processed_game_events
+Remove do ledger `ProcessedGameEvent` os registros mais antigos que
+`GAME_EVENTS_DEDUPE_DB_RETENTION_DAYS` (padrão 7 dias).
+- **Agendar:** diariamente via Celery Beat.
+
 ### cleanup_stale_game_sessions
-Marca como inativas sessões de jogo sem heartbeat por mais de 60 segundos.
+Reconcilia `GameSession` com a presença em Redis (`presence`) e marca como inativas
+sessões sem heartbeat por mais de `GAME_SESSION_STALE_SECONDS` (60 s).
+- Heartbeats vivos são gravados com um `bulk_update`; as sessões vencidas são
+  encerradas com um único UPDATE e saem do índice de população (`map_population`).
+  Os pings do WebSocket não tocam no banco.
 - **Agendar:** a cada 2 minutos via Celery Beat.
 - Jogadores desconectados abruptamente terão sua sessão encerrada automaticamente.
 
@@ -51,55 +83,78 @@ from celery import shared_task
 logger = logging.getLogger(__name__)
 
 
+LEADERBOARD_WATERMARK_KEY = "game:leaderboard:watermark"
+
+
+def _leaderboard_rows(queryset):
+    stats_qs = (
+        queryset.select_related("character")
+        .only(
+            "level", "experience", "pvp_kills",
+            "character__id", "character__name", "character__faction",
+            "character__character_class", "character__is_active",
+        )
+    )
+    for stats in stats_qs.iterator(chunk_size=500):
+        yield stats.character, stats
+
+
 @shared_task
-def rebuild_leaderboard_cache() -> dict:
+def rebuild_leaderboard_cache(mode: str = "incremental") -> dict:
     """
-    Rebuild the Redis leaderboard Sorted Set from the database.
-    Run periodically (e.g. every 10 min) to recover from cache eviction or Redis restart.
+    Rebuild the leaderboards (global, faction, class, PvP) from the database.
+
+    - incremental: only characters whose stats or character row changed since the
+      last watermark; deactivated characters are removed. Falls back to a full
+      rebuild when there is no watermark yet.
+    - full: rebuild every board into temporary keys and swap them in atomically.
     """
+    import time
+    from datetime import timedelta
     from django.conf import settings
+    from django.core.cache import cache
+    from django.db.models import Q
+    from django.utils import timezone
+    from apps.game_logic import leaderboard
     from apps.game_logic.models import PlayerStats
-    from apps.game_logic.services import GameLogicService
 
-    key = getattr(settings, "LEADERBOARD_CACHE_KEY", "game:leaderboard")
-    entries = (
-        PlayerStats.objects.select_related("owner")
-        .only("level", "experience", "owner__id", "owner__display_name", "owner__username")
-        .iterator(chunk_size=500)
-    )
+    started = time.monotonic()
+    run_at = timezone.now()
+    watermark = cache.get(LEADERBOARD_WATERMARK_KEY) if mode == "incremental" else None
+    overlap = timedelta(seconds=getattr(settings, "LEADERBOARD_WATERMARK_OVERLAP_SECONDS", 30))
 
-    try:
-        from django_redis import get_redis_connection
-        conn = get_redis_connection("default")
-        pipeline = conn.pipeline(transaction=False)
-        count = 0
-        for stats in entries:
-            score = stats.level * 1_000_000 + stats.experience
-            display = stats.owner.display_name or stats.owner.username
-            member = f"{stats.owner.id}:{display}"
-            pipeline.zadd(key, {member: score})
-            count += 1
-            if count % 500 == 0:
-                pipeline.execute()
-                pipeline = conn.pipeline(transaction=False)
-        pipeline.execute()
-        logger.info("rebuild_leaderboard_cache: synced %s players to Redis", count)
-        return {"synced": count}
-    except Exception as exc:
-        # Fallback to LocMemCache if Redis unavailable
-        from django.core.cache import cache
-        lb = {}
-        count = 0
-        for stats in PlayerStats.objects.select_related("owner").only(
-            "level", "experience", "owner__id", "owner__display_name", "owner__username"
-        ).iterator(chunk_size=500):
-            score = stats.level * 1_000_000 + stats.experience
-            display = stats.owner.display_name or stats.owner.username
-            lb[f"{stats.owner.id}:{display}"] = score
-            count += 1
-        cache.set(key, lb, timeout=3600)
-        logger.warning("rebuild_leaderboard_cache: Redis unavailable (%s), used LocMem fallback", exc)
-        return {"synced": count, "fallback": True}
+    if watermark is None:
+        mode = "full"
+        rows = leaderboard.full_rebuild(
+            lambda: _leaderboard_rows(PlayerStats.objects.filter(character__is_active=True))
+        )
+        removed = None
+    else:
+        changed = PlayerStats.objects.filter(Q(updated_at__gt=watermark) | Q(character__updated_at__gt=watermark))
+        entries, names, removed_ids = [], {}, []
+        rows = 0
+        for character, stats in _leaderboard_rows(changed):
+            rows += 1
+            if not character.is_active:
+                removed_ids.append(character.id)
+                continue
+            entries.extend(leaderboard.character_entries(character, stats))
+            names[str(character.id)] = character.name
+            if len(names) >= 500:
+                leaderboard.write_entries(entries, names)
+                entries, names = [], {}
+        if entries:
+            leaderboard.write_entries(entries, names)
+        for character_id in removed_ids:
+            leaderboard.remove_character(character_id)
+        removed = len(removed_ids)
+
+    # Rows committed while this run was reading are picked up by the next one
+    cache.set(LEADERBOARD_WATERMARK_KEY, run_at - overlap, timeout=None)
+    seconds = round(time.monotonic() - started, 3)
+    result = {"mode": mode, "rows": rows, "removed": removed, "seconds": seconds}
+    logger.info("rebuild_leaderboard_cache: %s", result)
+    return result
 
 
 @shared_task
@@ -123,15 +178,146 @@ def deliver_quest_rewards(user_id: str, quest_id: str) -> dict:
 
 @shared_task
 def cleanup_stale_game_sessions() -> dict:
-    """Mark game sessions with no recent heartbeat as inactive."""
-    from datetime import timedelta
+    """
+    Reconcile GameSession rows with the Redis presence set, then close stale sessions.
+
+    Live heartbeats are written in bulk; sessions with no heartbeat for
+    GAME_SESSION_STALE_SECONDS are marked inactive with one UPDATE.
+    """
+    import time
+    import uuid
+    from datetime import datetime, timedelta, timezone as dt_timezone
+    from django.conf import settings
     from django.utils import timezone
+    from apps.game_logic import map_population, presence
     from apps.game_logic.models import GameSession
 
-    # Sessions with no heartbeat for more than 60 seconds are stale
-    cutoff = timezone.now() - timedelta(seconds=60)
-    updated = GameSession.objects.filter(is_active=True, last_heartbeat_at__lt=cutoff).update(
-        is_active=False, ended_at=timezone.now()
+    stale_seconds = getattr(settings, "GAME_SESSION_STALE_SECONDS", 60)
+    cutoff_epoch = time.time() - stale_seconds
+    now = timezone.now()
+
+    synced = 0
+    try:
+        live = presence.live_since(cutoff_epoch)
+    except Exception as exc:
+        logger.debug("cleanup_stale_game_sessions: Redis unavailable (%s)", exc)
+        live = None
+    if live:
+        sessions = []
+        for session_id, seen in live.items():
+            try:
+                pk = uuid.UUID(session_id)
+            except ValueError:
+                continue
+            sessions.append(GameSession(id=pk, last_heartbeat_at=datetime.fromtimestamp(seen, tz=dt_timezone.utc)))
+        synced = GameSession.objects.bulk_update(sessions, ["last_heartbeat_at"], batch_size=1000)
+
+    cutoff = now - timedelta(seconds=stale_seconds)
+    stale = list(
+        GameSession.objects.filter(is_active=True, last_heartbeat_at__lt=cutoff).values_list("id", flat=True)
     )
-    logger.info("cleanup_stale_game_sessions: closed %s stale sessions", updated)
-    return {"updated": updated}
+    updated = GameSession.objects.filter(id__in=stale).update(is_active=False, ended_at=now) if stale else 0
+    map_population.leave(*stale)
+    if live is not None:
+        presence.drop_before(cutoff_epoch)
+    logger.info("cleanup_stale_game_sessions: synced %s heartbeats, closed %s stale sessions", synced, updated)
+    return {"synced": synced, "updated": updated}
+
+
+@shared_task
+def drain_game_event_streams() -> dict:
+    """Drain one round of every game event stream partition (no-op when async ingestion is off)."""
+    from django.conf import settings
+    from apps.game_logic.event_queue import drain_all
+
+    if not getattr(settings, "GAME_EVENTS_ASYNC", False):
+        return {"skipped": True}
+    try:
+        totals = drain_all()
+    except Exception as exc:
+        logger.warning("drain_game_event_streams: Redis unavailable (%s)", exc)
+        return {"error": str(exc)}
+    if totals["processed"] or totals["failed"]:
+        logger.info("drain_game_event_streams: %s", totals)
+    return totals
+
+
+@shared_task
+def flush_xp_buffer() -> dict:
+    """Apply XP coalesced by the player_action buffer (no-op when the buffer is off)."""
+    from django.conf import settings
+    from apps.game_logic.xp_buffer import flush_experience
+
+    if not getattr(settings, "XP_BUFFER_ENABLED", False):
+        return {"skipped": True}
+    try:
+        result = flush_experience()
+    except Exception as exc:
+        logger.warning("flush_xp_buffer: flush failed (%s)", exc)
+        return {"error": str(exc)}
+    if result["characters"]:
+        logger.info("flush_xp_buffer: applied %s XP to %s characters", result["xp"], result["characters"])
+    return result
+
+
+@shared_task
+def flush_player_positions() -> dict:
+    """Persist buffered positions/HP in bulk (no-op when write-behind is off)."""
+    from django.conf import settings
+    from apps.game_logic.position_buffer import flush_positions
+
+    if not getattr(settings, "POSITION_WRITE_BEHIND", False):
+        return {"skipped": True}
+    try:
+        written = flush_positions()
+    except Exception as exc:
+        logger.warning("flush_player_positions: flush failed (%s)", exc)
+        return {"error": str(exc)}
+    if written:
+        logger.info("flush_player_positions: persisted %s positions", written)
+    return {"written": written}
+
+
+@shared_task
+def flush_chat_log() -> dict:
+    """Batch-insert the queued chat messages into the moderation log."""
+    from django.conf import settings
+    from apps.game_logic.chat_history import flush_pending
+
+    batch_size = int(getattr(settings, "CHAT_LOG_FLUSH_BATCH_SIZE", 1000))
+    try:
+        written = flush_pending(batch_size)
+    except Exception as exc:
+        logger.warning("flush_chat_log: flush failed (%s)", exc)
+        return {"error": str(exc)}
+    if written:
+        logger.info("flush_chat_log: persisted %s messages", written)
+    return {"written": written}
+
+
+@shared_task
+def ensure_chat_log_partitions() -> dict:
+    """Create the monthly chat log partitions ahead of time (PostgreSQL only)."""
+    from django.conf import settings
+    from apps.game_logic.chat_history import ensure_partitions
+
+    created = ensure_partitions(int(getattr(settings, "CHAT_LOG_PARTITIONS_AHEAD", 2)))
+    if created:
+        logger.info("ensure_chat_log_partitions: created %s", ", ".join(created))
+    return {"created": created}
+
+
+@shared_task
+def purge_processed_game_events() -> dict:
+    """Delete webhook dedupe ledger rows older than the retention window."""
+    from datetime import timedelta
+    from django.conf import settings
+    from django.utils import timezone
+    from apps.game_logic.models import ProcessedGameEvent
+
+    days = int(getattr(settings, "GAME_EVENTS_DEDUPE_DB_RETENTION_DAYS", 7))
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = ProcessedGameEvent.objects.filter(created_at__lt=cutoff).delete()
+    if deleted:
+        logger.info("purge_processed_game_events: removed %s ledger rows", deleted)
+    return {"deleted": deleted}
@@ -3,9 +3,12 @@ Tests for WebSocket consumers (ChatConsumer).
 Uses channels.testing.WebsocketCommunicator — no live server required.
 """
 import json
+from unittest import skipUnless
+
 import pytest
 from channels.testing import WebsocketCommunicator
 from channels.layers import get_channel_layer
+from django.db import connection
 from django.test import TransactionTestCase, override_settings
 
 from apps.accounts.models import User
@@ -137,3 +140,635 @@ class ChatConsumerTests(TransactionTestCase):
         self.assertEqual(response["type"], "chat.error")
         self.assertEqual(response["reason"], "rate_limited")
         await comm.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_TEST, WORLD_TICK_RATE=50)
+class WorldTickerTests(TransactionTestCase):
+    """Moves are merged into one world.update per map tick."""
+
+    def _move(self, layer, player_id, x, y):
+        from apps.game_logic import world_ticker
+        return world_ticker.record_move(
+            layer, "map_tick", "tick", {"player_id": player_id, "display_name": player_id, "x": x, "y": y}
+        )
+
+    async def test_moves_are_merged_per_tick_and_unchanged_dropped(self):
+        import asyncio
+        from apps.game_logic import world_ticker
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add("map_tick", channel)
+        try:
+            for x in range(5):
+                self._move(layer, "p1", x, 0)
+            self._move(layer, "p2", 1, 1)
+
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            self.assertEqual(message["type"], "world.update")
+            self.assertEqual(message["map_key"], "tick")
+            self.assertEqual([(p["player_id"], p["x"]) for p in message["players"]], [("p1", 4), ("p2", 1)])
+
+            self.assertFalse(self._move(layer, "p2", 1, 1))
+            self.assertTrue(self._move(layer, "p1", 5, 0))
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            self.assertEqual([p["player_id"] for p in message["players"]], ["p1"])
+        finally:
+            task = world_ticker._aggregators["map_tick"].task
+            if task:
+                task.cancel()
+
+    async def test_updates_only_reach_cells_in_range(self):
+        import asyncio
+        from apps.game_logic import interest, world_ticker
+        layer = get_channel_layer()
+        near = await layer.new_channel()
+        for group in interest.interest_groups("tick", interest.cell_of(10, 10, 128), 1):
+            await layer.group_add(group, near)
+        try:
+            for player_id, (x, y) in {"close": (200, 20), "far": (900, 900)}.items():
+                world_ticker.record_move(
+                    layer, "map_tick", "tick", {"player_id": player_id, "display_name": player_id, "x": x, "y": y},
+                    interest.cell_of(x, y, 128),
+                )
+            message = await asyncio.wait_for(layer.receive(near), 1)
+            self.assertEqual([p["player_id"] for p in message["players"]], ["close"])
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(near), 0.2)
+        finally:
+            task = world_ticker._aggregators["map_tick"].task
+            if task:
+                task.cancel()
+
+    async def test_forget_player_announces_departure(self):
+        import asyncio
+        from apps.game_logic import world_ticker
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add("map_tick", channel)
+        try:
+            self._move(layer, "p1", 1, 1)
+            await asyncio.wait_for(layer.receive(channel), 1)
+            world_ticker.forget_player("map_tick", "p1")
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            self.assertEqual(message["players"], [])
+            self.assertEqual(message["left"], ["p1"])
+            # Never broadcast: nothing to announce
+            world_ticker.forget_player("map_tick", "ghost")
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(layer.receive(channel), 0.2)
+        finally:
+            task = world_ticker._aggregators["map_tick"].task
+            if task:
+                task.cancel()
+
+    @override_settings(WORLD_KEYFRAME_SECONDS=0.1)
+    async def test_idle_players_are_republished(self):
+        import asyncio
+        from apps.game_logic import world_ticker
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add("map_tick", channel)
+        try:
+            self._move(layer, "idle", 3, 3)
+            for _ in range(3):
+                message = await asyncio.wait_for(layer.receive(channel), 1)
+                self.assertEqual([p["player_id"] for p in message["players"]], ["idle"])
+        finally:
+            task = world_ticker._aggregators["map_tick"].task
+            if task:
+                task.cancel()
+
+    async def test_cell_change_reaches_the_old_cell(self):
+        import asyncio
+        from apps.game_logic import interest, world_ticker
+        layer = get_channel_layer()
+        old = await layer.new_channel()
+        await layer.group_add(interest.cell_group("tick", (0, 0)), old)
+        player = {"player_id": "p1", "display_name": "p1", "x": 10, "y": 10}
+        try:
+            world_ticker.record_move(layer, "map_tick", "tick", player, (0, 0))
+            await asyncio.wait_for(layer.receive(old), 1)
+            world_ticker.record_move(layer, "map_tick", "tick", {**player, "x": 900}, (7, 0))
+            message = await asyncio.wait_for(layer.receive(old), 1)
+            self.assertEqual([(p["player_id"], p["x"]) for p in message["players"]], [("p1", 900)])
+        finally:
+            task = world_ticker._aggregators["map_tick"].task
+            if task:
+                task.cancel()
+
+
+class InterestGridTests(TransactionTestCase):
+    """Unit tests for the interest grid helpers — no network I/O."""
+
+    def test_cells_and_groups(self):
+        from apps.game_logic import interest
+        self.assertEqual(interest.cell_of(-1, 255.9, 128), (-1, 1))
+        groups = interest.interest_groups("ruins", (0, 0), 1)
+        self.assertEqual(len(groups), 9)
+        self.assertIn("map_ruins.-1.1", groups)
+
+    @override_settings(WORLD_INTEREST_RADIUS=300)
+    def test_radius_rounds_up_to_cells(self):
+        from apps.game_logic import interest
+        self.assertEqual(interest.radius_cells(128), 3)
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_TEST, CHAT_HISTORY_SIZE=3)
+class ChatHistoryTests(TransactionTestCase):
+    """Room history replay on connect (in-process fallback, no Redis in tests)."""
+
+    def setUp(self):
+        from apps.game_logic import chat_history
+        chat_history.reset_local()
+
+    async def _connect(self, user, room):
+        comm = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{room}/")
+        comm.scope.update({"url_route": {"kwargs": {"room": room}}, "user": user})
+        connected, _ = await comm.connect()
+        self.assertTrue(connected)
+        return comm
+
+    async def test_new_connection_receives_recent_messages(self):
+        from channels.db import database_sync_to_async
+        create = database_sync_to_async(User.objects.create_user)
+        alice = await create(email="alice@example.com", username="alice", password="TestPass123!")
+        bob = await create(email="bob@example.com", username="bob", password="TestPass123!")
+
+        sender = await self._connect(alice, "zone_ruins")
+        for text in ("one", "two", "three", "four"):
+            await sender.send_json_to({"type": "chat.send", "text": text})
+            await sender.receive_json_from()
+
+        listener = await self._connect(bob, "zone_ruins")
+        history = await listener.receive_json_from()
+        self.assertEqual(history["type"], "chat.history")
+        self.assertEqual(history["room"], "zone_ruins")
+        self.assertEqual([m["text"] for m in history["messages"]], ["two", "three", "four"])
+        self.assertEqual(history["messages"][0]["user_id"], str(alice.id))
+
+        other_room = await self._connect(bob, "global")
+        self.assertTrue(await other_room.receive_nothing())
+        for comm in (sender, listener, other_room):
+            await comm.disconnect()
+
+    @skipUnless(connection.vendor == "postgresql", "game_chat_log is only partitioned on PostgreSQL")
+    def test_late_partition_takes_rows_from_default(self):
+        import uuid
+        from datetime import datetime, timezone
+        from apps.game_logic import chat_history
+        from apps.game_logic.models import ChatLogMessage
+
+        now = datetime.now(timezone.utc)
+        late = datetime(now.year + 1, now.month, 15, tzinfo=timezone.utc)
+        ChatLogMessage.objects.create(room="global", user_id=uuid.uuid4(), display_name="A", text="early", sent_at=late)
+
+        created = chat_history.ensure_partitions(months_ahead=2, now=now)
+        self.assertIn(f"{chat_history.LOG_TABLE}_{late:%Y%m}", created)
+        self.assertEqual(ChatLogMessage.objects.get().text, "early")
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{chat_history.LOG_TABLE}_default"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT count(*) FROM "{chat_history.LOG_TABLE}_{late:%Y%m}"')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(chat_history.ensure_partitions(months_ahead=2, now=now), [])
+
+    def test_history_frame_encoding(self):
+        from apps.game_logic import wire
+        message = {"type": "chat.history", "room": "global",
+                   "messages": [{"user": "A", "user_id": "", "text": "hi", "ts": 1}]}
+        # ServerFrame.chat_history (field 9) > room + one ChatMessage
+        self.assertEqual(
+            wire.encode_proto(message),
+            b"\x4a\x13\x0a\x06global\x12\x09\x0a\x01A\x1a\x02hi\x20\x01",
+        )
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_TEST, CHAT_ROOM_SHARDS={"global": 4})
+class ChatShardedRoomTests(TransactionTestCase):
+    """Large rooms go through one relay channel per worker, joined to a single shard."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.common import rate_limit
+        from apps.game_logic import chat_history
+        cache.clear()
+        rate_limit.reset_local()
+        chat_history.reset_local()
+
+    async def test_local_members_share_one_shard_subscription(self):
+        from channels.db import database_sync_to_async
+        from apps.game_logic import chat_fanout
+        create = database_sync_to_async(User.objects.create_user)
+        users = [
+            await create(email=f"crowd{i}@example.com", username=f"crowd{i}", password="TestPass123!")
+            for i in range(3)
+        ]
+        comms = []
+        for user in users:
+            comm = WebsocketCommunicator(ChatConsumer.as_asgi(), "/ws/chat/global/")
+            comm.scope.update({"url_route": {"kwargs": {"room": "global"}}, "user": user})
+            await comm.connect()
+            comms.append(comm)
+
+        layer = get_channel_layer()
+        relay = chat_fanout.relay(layer)
+        members = {group: set(channels) for group, channels in layer.groups.items() if group.startswith("chat_")}
+        self.assertEqual(members, {relay.groups["global"]: {relay.channel}})
+
+        await comms[0].send_json_to({"type": "chat.send", "text": "hello everyone"})
+        for comm in comms:
+            message = await comm.receive_json_from()
+            self.assertEqual((message["type"], message["text"]), ("chat.message", "hello everyone"))
+            self.assertNotIn("room", message)
+
+        for comm in comms:
+            await comm.disconnect()
+        self.assertFalse(any(group.startswith("chat_") and channels for group, channels in layer.groups.items()))
+
+    async def test_publish_reaches_every_shard(self):
+        from unittest import mock
+        from apps.game_logic import chat_fanout
+        layer = mock.AsyncMock()
+        await chat_fanout.publish(layer, "global", {"type": "chat.message", "text": "hi"})
+        groups = [call.args[0] for call in layer.group_send.await_args_list]
+        self.assertEqual(groups, [f"chat_global.{k}" for k in range(4)])
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_TEST)
+class ChatRateLimitTests(TransactionTestCase):
+    """The chat budget belongs to the user, not to the connection."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.common import rate_limit
+        from apps.game_logic import chat_history
+        cache.clear()
+        rate_limit.reset_local()
+        chat_history.reset_local()
+
+    async def test_budget_is_shared_across_connections(self):
+        from channels.db import database_sync_to_async
+        from apps.game_logic.consumers import _RATE_MAX_MSGS
+        user = await database_sync_to_async(User.objects.create_user)(
+            email="spammer@example.com", username="spammer", password="TestPass123!"
+        )
+        tabs = []
+        for room in ("faction_ordem", "zone_ruins"):
+            comm = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{room}/")
+            comm.scope.update({"url_route": {"kwargs": {"room": room}}, "user": user})
+            await comm.connect()
+            tabs.append(comm)
+
+        for i in range(_RATE_MAX_MSGS):
+            tab = tabs[i % 2]
+            await tab.send_json_to({"type": "chat.send", "text": f"msg {i}"})
+            self.assertEqual((await tab.receive_json_from())["type"], "chat.message")
+
+        await tabs[1].send_json_to({"type": "chat.send", "text": "one too many"})
+        self.assertEqual(await tabs[1].receive_json_from(), {"type": "chat.error", "reason": "rate_limited"})
+        for comm in tabs:
+            await comm.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_TEST)
+class ChatFilterConsumerTests(TransactionTestCase):
+    """Messages go through the filter pipeline before the broadcast."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.common import rate_limit
+        from apps.game_logic import chat_filter, chat_history
+        from apps.game_logic.models import ChatFilterTerm
+        cache.clear()
+        rate_limit.reset_local()
+        chat_history.reset_local()
+        chat_filter._local_stats.clear()
+        ChatFilterTerm.objects.create(term="noob", action="mask")
+
+    async def test_masked_and_blocked_messages(self):
+        from channels.db import database_sync_to_async
+        from apps.game_logic import chat_filter
+        user = await database_sync_to_async(User.objects.create_user)(
+            email="filtered@example.com", username="filtered", password="TestPass123!"
+        )
+        comm = WebsocketCommunicator(ChatConsumer.as_asgi(), "/ws/chat/zone_ruins/")
+        comm.scope.update({"url_route": {"kwargs": {"room": "zone_ruins"}}, "user": user})
+        await comm.connect()
+
+        await comm.send_json_to({"type": "chat.send", "text": "gg noob"})
+        self.assertEqual((await comm.receive_json_from())["text"], "gg ****")
+
+        await comm.send_json_to({"type": "chat.send", "text": "free gold at www.example.com"})
+        self.assertEqual(await comm.receive_json_from(), {"type": "chat.error", "reason": "blocked"})
+        self.assertEqual(chat_filter.stats(), {"zone_ruins": {"blocked": 1, "masked": 1}})
+        await comm.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_TEST, WORLD_TICK_RATE=50)
+class GameConsumerMoveTests(TransactionTestCase):
+    """player.move goes through the map tick, the interest grid and the delta tracker."""
+
+    def _create_session(self, name="mover"):
+        from apps.game_logic.models import Character, GameSession
+        user = User.objects.create_user(email=f"{name}@example.com", username=name, password="TestPass123!")
+        char = Character.objects.create(owner=user, name=name.title(), character_class="mage", race="humano")
+        return user, GameSession.objects.create(character=char, last_map_key="ruins")
+
+    async def _connect(self, name):
+        from channels.db import database_sync_to_async
+        from apps.game_logic.consumers import GameConsumer
+        user, session = await database_sync_to_async(self._create_session)(name)
+        comm = WebsocketCommunicator(GameConsumer.as_asgi(), f"/ws/game/{session.id}/")
+        comm.scope.update({"url_route": {"kwargs": {"session_id": str(session.id)}}, "user": user})
+        connected, _ = await comm.connect()
+        self.assertTrue(connected)
+        return user, comm
+
+    async def test_move_is_broadcast_to_own_cell(self):
+        from channels.db import database_sync_to_async
+        from apps.game_logic.consumers import GameConsumer
+        user, session = await database_sync_to_async(self._create_session)()
+        comm = WebsocketCommunicator(GameConsumer.as_asgi(), f"/ws/game/{session.id}/")
+        comm.scope.update({"url_route": {"kwargs": {"session_id": str(session.id)}}, "user": user})
+        connected, _ = await comm.connect()
+        self.assertTrue(connected)
+
+        await comm.send_json_to({"type": "player.move", "map_key": "ruins", "x": 10, "y": 300})
+        update = await comm.receive_json_from(timeout=2)
+        self.assertEqual(update["type"], "world.delta")
+        self.assertTrue(update["keyframe"])
+        self.assertEqual(update["entered"][0]["x"] * update["quantum"], 10)
+
+        await comm.send_json_to({"type": "player.move", "map_key": "ruins", "x": 10, "y": 300})
+        self.assertTrue(await comm.receive_nothing(timeout=0.2))
+        await comm.disconnect()
+
+    async def test_disconnect_is_announced_as_left(self):
+        mover, mover_comm = await self._connect("mover")
+        _, observer = await self._connect("observer")
+        await observer.send_json_to({"type": "player.move", "map_key": "ruins", "x": 20, "y": 300})
+        await mover_comm.send_json_to({"type": "player.move", "map_key": "ruins", "x": 10, "y": 300})
+        seen = set()
+        while str(mover.id) not in seen:
+            update = await observer.receive_json_from(timeout=2)
+            seen.update(e["player_id"] for e in update["entered"])
+
+        await mover_comm.disconnect()
+        update = await observer.receive_json_from(timeout=2)
+        self.assertEqual(update["left"], [str(mover.id)])
+        await observer.disconnect()
+
+    async def test_binary_subprotocol(self):
+        from channels.db import database_sync_to_async
+        from apps.game_logic.consumers import GameConsumer
+        user, session = await database_sync_to_async(self._create_session)()
+        comm = WebsocketCommunicator(
+            GameConsumer.as_asgi(), f"/ws/game/{session.id}/", subprotocols=["ravenna.proto.v1"]
+        )
+        comm.scope.update({"url_route": {"kwargs": {"session_id": str(session.id)}}, "user": user})
+        connected, subprotocol = await comm.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, "ravenna.proto.v1")
+
+        await comm.send_json_to({"type": "ping"})
+        self.assertEqual(await comm.receive_from(), b"\x0a\x00")
+        await comm.disconnect()
+
+
+class WireCodecTests(TransactionTestCase):
+    """Unit tests for the binary frame codec — no network I/O."""
+
+    def test_subprotocol_negotiation(self):
+        from apps.game_logic import wire
+        self.assertEqual(wire.choose_subprotocol(["ravenna.json.v1", "ravenna.proto.v1"]), "ravenna.proto.v1")
+        self.assertEqual(wire.choose_subprotocol(["ravenna.json.v1"]), "ravenna.json.v1")
+        self.assertIsNone(wire.choose_subprotocol(["other"]))
+
+    def test_proto_frames(self):
+        from apps.game_logic import wire
+        self.assertEqual(wire.encode_proto({"type": "pong"}), b"\x0a\x00")
+        self.assertEqual(wire.encode_proto({"type": "map.full", "map_key": "ruins"}), b"\x2a\x07\x0a\x05ruins")
+
+    def test_world_update_is_encoded_once_and_much_smaller(self):
+        import uuid
+        from apps.game_logic import wire
+        players = [
+            {"player_id": str(uuid.uuid4()), "display_name": f"Hero{i}", "x": 100.5 + i, "y": 20}
+            for i in range(20)
+        ]
+        message = wire.prepare({"type": "world.update", "map_key": "ruins", "tick": 7, "players": players})
+        proto = wire.frame(message, wire.PROTO)
+        self.assertIs(proto, message["frames"][wire.PROTO])
+        self.assertEqual(json.loads(wire.frame(message, wire.JSON))["players"], players)
+        self.assertLess(len(proto) * 2, len(wire.frame(message, wire.JSON)))
+        # ServerFrame.world_update (field 2, length-delimited)
+        self.assertEqual(proto[0], 2 << 3 | 2)
+
+
+class DeltaTrackerTests(TransactionTestCase):
+    """Unit tests for per-connection world deltas — no network I/O."""
+
+    def setUp(self):
+        from apps.game_logic.snapshots import DeltaTracker
+        self.now = 0.0
+        self.tracker = DeltaTracker(quantum=0.5, min_move=1.0, keyframe_seconds=5, clock=lambda: self.now)
+
+    def _player(self, player_id, x, y):
+        return {"player_id": player_id, "display_name": player_id.upper(), "x": x, "y": y}
+
+    def test_keyframe_then_deltas(self):
+        first = self.tracker.observe([self._player("a", 10, 10)])
+        self.assertTrue(first["keyframe"])
+        self.assertEqual(first["entered"], [{"player_id": "a", "display_name": "A", "x": 20, "y": 20}])
+
+        self.now = 1
+        self.assertIsNone(self.tracker.observe([self._player("a", 10.4, 10)]))  # below min_move
+        delta = self.tracker.observe([self._player("a", 11.2, 10), self._player("b", 0, -3)])
+        self.assertFalse(delta["keyframe"])
+        self.assertEqual(delta["moved"], [{"player_id": "a", "x": 22, "y": 20}])
+        self.assertEqual([e["player_id"] for e in delta["entered"]], ["b"])
+        self.assertEqual(delta["seq"], first["seq"] + 1)
+
+    def test_left_when_out_of_range_and_periodic_keyframe(self):
+        self.tracker.observe([self._player("a", 0, 0), self._player("b", 5, 5)])
+        self.now = 1
+        delta = self.tracker.observe([self._player("b", 500, 5)], visible=lambda x, y: x < 100)
+        self.assertEqual(delta["left"], ["b"])
+
+        self.now = 6
+        keyframe = self.tracker.observe([self._player("a", 1, 0)])
+        self.assertTrue(keyframe["keyframe"])
+        self.assertEqual([e["player_id"] for e in keyframe["entered"]], ["a"])
+
+    def test_delta_encodes_to_proto(self):
+        import uuid
+        from apps.game_logic import wire
+        player_id = str(uuid.uuid4())
+        frame = wire.encode_proto(self.tracker.observe([self._player(player_id, -2, 3)]))
+        self.assertEqual(frame[0], 8 << 3 | 2)
+        self.assertIn(uuid.UUID(player_id).bytes, frame)
+        self.assertIn(b"\x18\x07", frame)  # EntityEnter.x = sint32 -4 (zigzag 7)
+
+    def test_folded_updates_become_one_delta(self):
+        self.tracker.observe([self._player("a", 0, 0), self._player("b", 5, 5)])
+        self.now = 1
+        self.tracker.fold([self._player("a", 3, 0)])
+        self.tracker.fold([self._player("c", 1, 1), self._player("b", 500, 5)], visible=lambda x, y: x < 100)
+        self.tracker.fold([self._player("a", 6, 0)])
+        delta = self.tracker.pending()
+        self.assertEqual(delta["moved"], [{"player_id": "a", "x": 12, "y": 0}])
+        self.assertEqual([e["player_id"] for e in delta["entered"]], ["c"])
+        self.assertEqual(delta["left"], ["b"])
+        self.assertIsNone(self.tracker.pending())
+
+    def test_idle_entity_stays_in_keyframes(self):
+        self.tracker.observe([self._player("idle", 2, 2), self._player("a", 0, 0)])
+        for step in range(1, 6):
+            self.now = step * 5
+            keyframe = self.tracker.observe([self._player("a", step * 2, 0)])
+            self.assertTrue(keyframe["keyframe"])
+            self.assertEqual(sorted(e["player_id"] for e in keyframe["entered"]), ["a", "idle"])
+
+    def test_left_from_update_removes_entity(self):
+        self.tracker.observe([self._player("a", 0, 0), self._player("b", 5, 5)])
+        self.now = 1
+        delta = self.tracker.observe([], left=["b", "unknown"])
+        self.assertEqual(delta["left"], ["b"])
+        self.now = 6
+        keyframe = self.tracker.observe([])
+        self.assertEqual([e["player_id"] for e in keyframe["entered"]], ["a"])
+
+
+class SendQueueTests(TransactionTestCase):
+    """Per-connection outbound queue: coalescing, cap and stall detection."""
+
+    def _queue(self, **kwargs):
+        import asyncio
+        from apps.game_logic.send_queue import SendQueue
+        self.sent = []
+        self.gate = asyncio.Event()
+
+        async def send(message):
+            await self.gate.wait()
+            self.sent.append(message)
+
+        return SendQueue(send, **kwargs)
+
+    async def test_latest_replaces_pending_and_chat_is_capped(self):
+        import asyncio
+        queue = self._queue(limit=2)
+        queue.put({"n": 1})
+        await asyncio.sleep(0)  # the writer takes {"n": 1} and blocks on send
+        for n in range(2, 6):
+            queue.put({"n": n})
+            queue.put_latest("world", {"world": n})
+        self.gate.set()
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.sent, [{"n": 1}, {"world": 5}, {"n": 4}, {"n": 5}])
+        self.assertEqual(queue.counters["dropped"], 2)
+        self.assertEqual(queue.counters["coalesced"], 3)
+        queue.stop()
+
+    async def test_callable_is_built_when_sent(self):
+        import asyncio
+        queue = self._queue()
+        self.gate.set()
+        queue.put_latest("world", lambda: None)
+        queue.put_latest("other", lambda: {"built": True})
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.sent, [{"built": True}])
+        queue.stop()
+
+    async def test_client_behind_past_threshold_is_closed(self):
+        import asyncio
+        closed = []
+
+        async def on_stall():
+            closed.append(True)
+
+        now = [0.0]
+        queue = self._queue(stall_seconds=10, on_stall=on_stall, clock=lambda: now[0])
+        queue.put({"n": 1})
+        await asyncio.sleep(0)
+        now[0] = 5
+        queue.put({"n": 2})
+        self.assertFalse(queue.stalled)
+        now[0] = 11
+        queue.put({"n": 3})
+        await asyncio.sleep(0)
+        self.assertEqual(closed, [True])
+        self.assertEqual(queue.counters["stalled"], 1)
+        queue.stop()
+
+    async def test_transport_backlog_holds_messages_and_closes_without_new_puts(self):
+        import asyncio
+        closed = []
+
+        async def on_stall():
+            closed.append(True)
+
+        unsent = [0]
+        queue = self._queue(limit=2, stall_seconds=0.05, on_stall=on_stall,
+                            backlog=lambda: unsent[0], backlog_limit=100, poll_seconds=0.01)
+        self.gate.set()
+        queue.put({"n": 1})
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.sent, [{"n": 1}])
+
+        unsent[0] = 500  # the server took the frame but the client stopped reading
+        for n in range(2, 6):
+            queue.put({"n": n})
+        await asyncio.sleep(0.02)
+        self.assertEqual(self.sent, [{"n": 1}])
+        self.assertEqual(queue.counters["dropped"], 2)
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(closed, [True])
+        queue.stop()
+
+    async def test_backlog_draining_resumes_sending(self):
+        import asyncio
+        unsent = [500]
+        queue = self._queue(stall_seconds=5, backlog=lambda: unsent[0], backlog_limit=100, poll_seconds=0.01)
+        self.gate.set()
+        queue.put({"n": 1})
+        await asyncio.sleep(0.02)
+        self.assertEqual(self.sent, [])
+        unsent[0] = 0
+        await asyncio.sleep(0.03)
+        self.assertEqual(self.sent, [{"n": 1}])
+        self.assertIsNone(queue.behind_since)
+        self.assertFalse(queue.stalled)
+        queue.stop()
+
+    async def test_stuck_send_is_closed_by_timer(self):
+        import asyncio
+        closed = []
+
+        async def on_stall():
+            closed.append(True)
+
+        queue = self._queue(stall_seconds=0.05, on_stall=on_stall)
+        queue.put({"n": 1})
+        await asyncio.sleep(0.1)
+        self.assertEqual(closed, [True])
+        queue.stop()
+
+    def test_transport_backlog_reads_daphne_transport(self):
+        from functools import partial
+        from types import SimpleNamespace
+        from apps.game_logic.send_queue import transport_backlog
+
+        transport = SimpleNamespace(dataBuffer=b"x" * 10, offset=4, _tempDataLen=7)
+        backlog = transport_backlog(partial(lambda protocol, message: None, SimpleNamespace(transport=transport)))
+        self.assertEqual(backlog(), 13)
+        self.assertIsNone(transport_backlog(lambda message: None))
+
+    def test_counters_are_summed_without_redis(self):
+        from collections import Counter
+        from apps.game_logic import send_queue
+        before = send_queue.stats()
+        send_queue.record(Counter(dropped=3, coalesced=1))
+        after = send_queue.stats()
+        self.assertEqual(after["dropped"] - before["dropped"], 3)
+        self.assertEqual(after["coalesced"] - before["coalesced"], 1)
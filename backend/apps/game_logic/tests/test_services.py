@@ -1,7 +1,7 @@
 """
 Tests for game_logic services.
 """
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from apps.accounts.models import User
 from apps.game_data.models import ItemTemplate, SkillTemplate
@@ -648,3 +648,734 @@ class RecordPvpKillTestCase(TestCase):
             GameLogicService.record_pvp_kill(killer=self.killer, victim=self.victim)
         stats = PlayerStats.objects.get(owner=self.killer)
         self.assertEqual(stats.pvp_kills, 3)
+
+
+# ── XP coalescing ────────────────────────────────────────────────────────────
+
+class ApplyExperienceBulkTestCase(TestCase):
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.user = User.objects.create_user(
+            email="grinder@example.com", username="grinder", password="TestPass123!"
+        )
+        self.char_a = Character.objects.create(
+            owner=self.user, name="GrinderA", character_class="mage", race="humano", faction="vanguarda"
+        )
+        self.char_b = Character.objects.create(
+            owner=self.user, name="GrinderB", character_class="archer", race="elfo", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char_a, experience=90)
+        PlayerStats.objects.create(character=self.char_b)
+
+    def test_applies_amounts_with_level_ups(self):
+        GameLogicService.apply_experience_bulk({str(self.char_a.id): 215, str(self.char_b.id): 40})
+        stats_a = PlayerStats.objects.get(character=self.char_a)
+        stats_b = PlayerStats.objects.get(character=self.char_b)
+        self.assertEqual((stats_a.level, stats_a.experience, stats_a.points_remaining), (4, 5, 15))
+        self.assertEqual((stats_b.level, stats_b.experience), (1, 40))
+
+    def test_empty_and_non_positive_amounts_are_ignored(self):
+        self.assertEqual(GameLogicService.apply_experience_bulk({str(self.char_a.id): 0}), [])
+        self.assertEqual(PlayerStats.objects.get(character=self.char_a).experience, 90)
+
+    @override_settings(XP_BUFFER_ENABLED=True)
+    def test_player_action_without_redis_is_applied_immediately(self):
+        GameLogicService.apply_game_event(self.char_b, "player_action", {"action_id": 3})
+        self.assertEqual(PlayerStats.objects.get(character=self.char_b).experience, 10)
+
+    def test_missing_stats_row_is_created(self):
+        from apps.game_logic.models import Character
+        char = Character.objects.create(
+            owner=self.user, name="GrinderC", character_class="mage", race="humano", faction="legiao"
+        )
+        GameLogicService.apply_experience_bulk({str(char.id): 130})
+        stats = PlayerStats.objects.get(character=char)
+        self.assertEqual((stats.level, stats.experience), (2, 30))
+
+
+class XPBufferRedisTestCase(TestCase):
+    """Flush paths of the XP buffer against a fake Redis."""
+
+    def setUp(self):
+        import fakeredis
+        from unittest import mock
+        from apps.game_logic import xp_buffer
+        from apps.game_logic.models import Character
+        self.xp_buffer = xp_buffer
+        self.conn = fakeredis.FakeRedis()
+        patcher = mock.patch.object(xp_buffer, "_get_conn", return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email="buffered@example.com", username="buffered", password="TestPass123!")
+        self.char = Character.objects.create(
+            owner=self.user, name="Buffered", character_class="mage", race="humano", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char, experience=50)
+
+    def _experience(self):
+        return PlayerStats.objects.get(character=self.char).experience
+
+    def _flushing_keys(self):
+        return list(self.conn.scan_iter(match=f"{self.xp_buffer.FLUSHING_KEY_PREFIX}*"))
+
+    def test_flush_applies_and_clears_pending(self):
+        self.xp_buffer.buffer_experience(self.char.id, 10)
+        self.xp_buffer.buffer_experience(self.char.id, 20)
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.xp_buffer.flush_experience()
+        self.assertEqual(result, {"characters": 1, "xp": 30})
+        self.assertEqual(self._experience(), 80)
+        self.assertFalse(self.conn.exists(self.xp_buffer.PENDING_KEY))
+        self.assertEqual(self._flushing_keys(), [])
+
+    def test_rolled_back_character_flush_is_recovered_once(self):
+        from unittest import mock
+        from django.db import transaction
+        self.xp_buffer.buffer_experience(self.char.id, 40)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertEqual(self.xp_buffer.flush_character(self.char.id), 40)
+                raise RuntimeError("event failed")
+        self.assertEqual(self._experience(), 50)
+        self.assertEqual(len(self._flushing_keys()), 1)
+
+        # Still inside the grace period: the hash may belong to a live transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            self.xp_buffer.flush_experience()
+        self.assertEqual(self._experience(), 50)
+
+        later = self.xp_buffer.time.time() + 3600
+        with mock.patch.object(self.xp_buffer.time, "time", return_value=later):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.xp_buffer.flush_experience()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.xp_buffer.flush_experience()
+        self.assertEqual(self._experience(), 90)
+        self.assertEqual(self._flushing_keys(), [])
+
+    def test_committed_character_flush_drops_only_what_it_applied(self):
+        self.xp_buffer.buffer_experience(self.char.id, 40)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.xp_buffer.flush_character(self.char.id)
+            self.xp_buffer.buffer_experience(self.char.id, 5)
+        self.assertEqual(self._experience(), 90)
+        self.assertEqual(int(self.conn.hget(self.xp_buffer.PENDING_KEY, str(self.char.id))), 5)
+        self.assertEqual(self._flushing_keys(), [])
+
+    def test_abandoned_flush_hash_is_merged_back(self):
+        self.conn.hset(f"{self.xp_buffer.FLUSHING_KEY_PREFIX}1000:dead", str(self.char.id), 25)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.xp_buffer.flush_experience()
+        self.assertEqual(self._experience(), 75)
+        self.assertEqual(self._flushing_keys(), [])
+
+    def test_debt_is_carried_to_the_next_window(self):
+        self.conn.hset(self.xp_buffer.PENDING_KEY, str(self.char.id), -10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.xp_buffer.flush_experience()
+        self.assertEqual(self._experience(), 50)
+        self.xp_buffer.buffer_experience(self.char.id, 15)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.xp_buffer.flush_experience()
+        self.assertEqual(self._experience(), 55)
+
+
+# ── Position write-behind ────────────────────────────────────────────────────
+
+class SavePlayerPositionsBulkTestCase(TestCase):
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.user = User.objects.create_user(
+            email="walker@example.com", username="walker", password="TestPass123!"
+        )
+        self.chars = []
+        for i in range(3):
+            char = Character.objects.create(
+                owner=self.user, name=f"Walker{i}", character_class="archer", race="elfo", faction="vanguarda"
+            )
+            PlayerStats.objects.create(character=char)
+            self.chars.append(char)
+
+    @override_settings(POSITION_FLUSH_BATCH_SIZE=2)
+    def test_writes_all_entries_in_batches(self):
+        positions = {str(c.id): (i * 10, i * 20, 50 + i) for i, c in enumerate(self.chars)}
+        positions[str(self.chars[0].id)] = (1, 2, 0)  # HP is clamped to at least 1
+        written = GameLogicService.save_player_positions_bulk(positions)
+        self.assertEqual(written, 3)
+        stats = PlayerStats.objects.get(character=self.chars[2])
+        self.assertEqual((stats.last_pos_x, stats.last_pos_y, stats.health), (20, 40, 52))
+        self.assertEqual(PlayerStats.objects.get(character=self.chars[0]).health, 1)
+
+    @override_settings(POSITION_WRITE_BEHIND=True)
+    def test_player_position_without_redis_is_saved_immediately(self):
+        GameLogicService.apply_game_event(self.chars[1], "player_position", {"pos_x": 5, "pos_y": 6, "hp": 40})
+        stats = PlayerStats.objects.get(character=self.chars[1])
+        self.assertEqual((stats.last_pos_x, stats.last_pos_y, stats.health), (5, 6, 40))
+
+
+class PositionBufferRedisTestCase(TestCase):
+    """Flush paths of the position write-behind against a fake Redis."""
+
+    def setUp(self):
+        import fakeredis
+        from unittest import mock
+        from apps.game_logic import position_buffer
+        from apps.game_logic.models import Character
+        self.buffer = position_buffer
+        self.conn = fakeredis.FakeRedis()
+        patcher = mock.patch.object(position_buffer, "_get_conn", return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email="drifter@example.com", username="drifter", password="TestPass123!")
+        self.char = Character.objects.create(
+            owner=self.user, name="Drifter", character_class="archer", race="elfo", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char)
+
+    def _position(self):
+        stats = PlayerStats.objects.get(character=self.char)
+        return stats.last_pos_x, stats.last_pos_y, stats.health
+
+    def _flushing_keys(self):
+        return list(self.conn.scan_iter(match=f"{self.buffer.FLUSHING_KEY_PREFIX}*"))
+
+    def test_flush_persists_latest_position(self):
+        self.buffer.buffer_position(self.char.id, 1, 2, 30)
+        self.buffer.buffer_position(self.char.id, 3, 4, 35)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.buffer.flush_positions(), 1)
+        self.assertEqual(self._position(), (3, 4, 35))
+        self.assertFalse(self.conn.exists(self.buffer.PENDING_KEY))
+        self.assertEqual(self._flushing_keys(), [])
+
+    def test_rolled_back_character_flush_keeps_entry(self):
+        from django.db import transaction
+        self.buffer.buffer_position(self.char.id, 7, 8, 60)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertTrue(self.buffer.flush_character(self.char.id))
+                raise RuntimeError("event failed")
+        self.assertEqual(self.conn.hget(self.buffer.PENDING_KEY, str(self.char.id)), b"7:8:60")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.flush_positions()
+        self.assertEqual(self._position(), (7, 8, 60))
+
+    def test_committed_character_flush_keeps_newer_position(self):
+        self.buffer.buffer_position(self.char.id, 7, 8, 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.flush_character(self.char.id)
+            self.buffer.buffer_position(self.char.id, 9, 9, 61)
+        self.assertEqual(self._position(), (7, 8, 60))
+        self.assertEqual(self.conn.hget(self.buffer.PENDING_KEY, str(self.char.id)), b"9:9:61")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.flush_character(self.char.id)
+        self.assertFalse(self.conn.hexists(self.buffer.PENDING_KEY, str(self.char.id)))
+
+    def test_abandoned_flush_hash_is_merged_back_without_overwriting(self):
+        self.conn.hset(f"{self.buffer.FLUSHING_KEY_PREFIX}1000:dead", str(self.char.id), "5:5:20")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.flush_positions()
+        self.assertEqual(self._position(), (5, 5, 20))
+
+        self.conn.hset(f"{self.buffer.FLUSHING_KEY_PREFIX}1000:dead", str(self.char.id), "1:1:10")
+        self.buffer.buffer_position(self.char.id, 6, 6, 21)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buffer.flush_positions()
+        self.assertEqual(self._position(), (6, 6, 21))
+        self.assertEqual(self._flushing_keys(), [])
+
+
+# ── Compiled quest objective index ───────────────────────────────────────────
+
+@override_settings(GAME_EVENTS_RETRY_IDLE_MS=0, GAME_EVENTS_MAX_DELIVERIES=2)
+class EventQueueRedisTestCase(TestCase):
+    """Stream consumer (`event_queue.drain_partition`) against a fake Redis."""
+
+    def setUp(self):
+        import fakeredis
+        from unittest import mock
+        from apps.game_logic import event_queue
+        from apps.game_logic.models import Character
+        self.queue = event_queue
+        self.conn = fakeredis.FakeRedis()
+        patcher = mock.patch.object(event_queue, "_get_conn", return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email="streamer@example.com", username="streamer", password="TestPass123!")
+        self.char = Character.objects.create(
+            owner=self.user, name="Streamer", character_class="mage", race="humano", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char)
+        self.partition = event_queue.partition_for(self.user.id)
+        self.key = event_queue.stream_key(self.partition)
+
+    def _xp(self, amount):
+        return {"event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": amount}}
+
+    def _experience(self):
+        return PlayerStats.objects.get(character=self.char).experience
+
+    def _drain(self):
+        return self.queue.drain_partition(self.partition, consumer="worker-1")
+
+    def test_applied_events_are_acked(self):
+        self.assertTrue(self.queue.enqueue_game_events([self._xp(10), self._xp(5)]))
+        round_ = self._drain()
+        self.assertEqual((round_["processed"], round_["failed"], round_["held"]), (2, 0, 0))
+        self.assertEqual(self._experience(), 15)
+        self.assertEqual(self.conn.xlen(self.key), 0)
+        self.assertFalse(self.conn.exists(f"{self.queue.LOCK_KEY_PREFIX}{self.partition}"))
+
+    def test_failure_holds_later_events_of_the_character(self):
+        self.queue.enqueue_game_events([self._xp("broken"), self._xp(10)])
+        round_ = self._drain()
+        self.assertEqual((round_["processed"], round_["failed"], round_["held"]), (0, 1, 1))
+        self.assertEqual(self._experience(), 0)
+
+        self.assertEqual(self._drain()["held"], 1)
+        self.assertEqual(self._experience(), 0)
+
+        # The failing entry reaches GAME_EVENTS_MAX_DELIVERIES first; the held one runs after it
+        round_ = self._drain()
+        self.assertEqual((round_["dead_lettered"], round_["processed"]), (1, 1))
+        self.assertEqual(self._experience(), 10)
+        self.assertEqual(self.conn.llen(self.queue.DEAD_LETTER_KEY), 1)
+
+    @override_settings(GAME_EVENTS_RETRY_IDLE_MS=60_000)
+    def test_new_event_waits_behind_pending_retry(self):
+        self.queue.enqueue_game_events([self._xp("broken")])
+        self.assertEqual(self._drain()["failed"], 1)
+        self.queue.enqueue_game_events([self._xp(10)])
+        round_ = self._drain()
+        self.assertEqual((round_["processed"], round_["held"]), (0, 1))
+        self.assertEqual(self._experience(), 0)
+
+    def test_lost_lock_skips_xack(self):
+        from unittest import mock
+        from apps.game_logic.services import GameLogicService
+        apply = GameLogicService.apply_game_events
+
+        def apply_then_lose_lock(events, **kwargs):
+            self.conn.set(f"{self.queue.LOCK_KEY_PREFIX}{self.partition}", "worker-2")
+            return apply(events, **kwargs)
+
+        self.queue.enqueue_game_events([self._xp(10)])
+        with mock.patch.object(GameLogicService, "apply_game_events", side_effect=apply_then_lose_lock):
+            self.assertEqual(self._drain()["processed"], 0)
+        self.assertEqual(self.conn.xpending(self.key, self.queue.CONSUMER_GROUP)["pending"], 1)
+        self.assertEqual(self.conn.get(f"{self.queue.LOCK_KEY_PREFIX}{self.partition}"), b"worker-2")
+
+    def test_other_consumer_holding_lock_skips(self):
+        self.conn.set(f"{self.queue.LOCK_KEY_PREFIX}{self.partition}", "worker-2")
+        self.assertTrue(self._drain()["skipped"])
+
+
+class UpdateKillProgressTestCase(TestCase):
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.user = User.objects.create_user(
+            email="hunter@example.com", username="hunter", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Hunter", character_class="archer", race="elfo", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char)
+        self.quest = QuestTemplate.objects.create(
+            name="Wolf Cull",
+            quest_type="side",
+            objectives=[{"key": "kill_wolf", "description": "Kill wolves", "target_count": 2}],
+            rewards={"xp": 30},
+            level_required=1,
+        )
+        GameLogicService.start_quest(self.char, str(self.quest.id))
+
+    def test_untracked_npc_type_costs_no_query(self):
+        GameLogicService.update_kill_progress(self.char, "wolf")  # warm the index
+        with self.assertNumQueries(0):
+            self.assertEqual(GameLogicService.update_kill_progress(self.char, "rabbit"), [])
+
+    def test_kill_progress_increments_and_autocompletes(self):
+        GameLogicService.update_kill_progress(self.char, "wolf")
+        progress = QuestProgress.objects.get(character=self.char, quest_id=str(self.quest.id))
+        self.assertEqual((progress.current_objectives["kill_wolf"], progress.status), (1, "in_progress"))
+
+        GameLogicService.update_kill_progress(self.char, "wolf")
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, "completed")
+
+    def test_template_change_recompiles_index(self):
+        from apps.game_logic import quest_index
+        self.assertEqual(quest_index.quests_for_kill("kill_bandit"), {})
+        self.quest.objectives = [{"key": "kill_bandit", "description": "Kill bandits", "target_count": 1}]
+        self.quest.save()
+        self.assertIn(str(self.quest.id), quest_index.quests_for_kill("kill_bandit"))
+        self.assertNotIn(str(self.quest.id), quest_index.quests_for_kill("kill_wolf"))
+
+    def test_flushed_cache_recompiles_index(self):
+        from django.core.cache import cache
+        from apps.game_logic import quest_index
+        quest_index.quests_for_kill("kill_wolf")
+        # Changed behind the signals (e.g. a bulk update), then the cache is flushed
+        QuestTemplate.objects.filter(id=self.quest.id).update(objectives=[])
+        cache.delete(quest_index.VERSION_KEY)
+        self.assertEqual(quest_index.quests_for_kill("kill_wolf"), {})
+
+
+# ── Inventory slot bitmap / bulk placement ───────────────────────────────────
+
+class InventoryBulkPlacementTestCase(TestCase):
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.user = User.objects.create_user(
+            email="looter@example.com", username="looter", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Looter", character_class="warrior", race="humano", faction="vanguarda"
+        )
+        self.potion = ItemTemplate.objects.create(name="Potion", item_type="consumable", rarity="common", stack_size=10)
+        self.sword = ItemTemplate.objects.create(name="Sword", item_type="weapon", rarity="common", stack_size=1)
+
+    def test_bulk_grant_uses_constant_queries(self):
+        GameLogicService.add_item_to_inventory(self.char, str(self.potion.id), 5)
+        # lock inventory, templates, stacks, stack bulk_update, bulk_create, inventory save (+ savepoint)
+        with self.assertNumQueries(8):
+            inventory = GameLogicService.add_items_to_inventory(
+                self.char, [(str(self.sword.id), 50), (str(self.potion.id), 17)]
+            )
+        self.assertEqual(inventory.slots_used, 53)
+        quantities = list(
+            PlayerItem.objects.filter(inventory=inventory, item_template=self.potion)
+            .order_by("slot_index").values_list("quantity", flat=True)
+        )
+        self.assertEqual(quantities, [10, 10, 2])
+
+    def test_freed_slot_is_reused_and_count_is_incremental(self):
+        GameLogicService.add_item_to_inventory(self.char, str(self.sword.id), 3)
+        GameLogicService.remove_item_from_inventory(self.char, 1)
+        inventory = GameLogicService.add_item_to_inventory(self.char, str(self.sword.id), 1)
+        self.assertEqual(inventory.slots_used, 3)
+        self.assertEqual(
+            sorted(PlayerItem.objects.filter(inventory=inventory).values_list("slot_index", flat=True)), [0, 1, 2]
+        )
+
+    def test_stale_bitmap_is_rebuilt_from_items(self):
+        inventory = PlayerInventory.objects.create(character=self.char)
+        PlayerItem.objects.create(inventory=inventory, item_template=self.sword, quantity=1, slot_index=0)
+        inventory = GameLogicService.add_item_to_inventory(self.char, str(self.sword.id), 1)
+        self.assertEqual(inventory.slots_used, 2)
+        self.assertEqual(PlayerItem.objects.get(inventory=inventory, slot_index=1).item_template, self.sword)
+
+    def test_overflow_writes_nothing(self):
+        PlayerInventory.objects.create(character=self.char, max_slots=2)
+        with self.assertRaises(ValueError):
+            GameLogicService.add_items_to_inventory(self.char, [(str(self.sword.id), 3)])
+        self.assertFalse(PlayerItem.objects.filter(inventory__character=self.char).exists())
+
+
+# ── Materialized stat sheet ──────────────────────────────────────────────────
+
+class StatSheetTestCase(TestCase):
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.user = User.objects.create_user(
+            email="sheet@example.com", username="sheet", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Sheet", character_class="archer", race="elfo", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char, vitality=10, intelligence=6, points_remaining=5)
+        inventory = PlayerInventory.objects.create(character=self.char)
+        bow = ItemTemplate.objects.create(
+            name="Long Bow", item_type="weapon", rarity="common", stack_size=1,
+            equip_slot="weapon", weapon_type="bow", base_phys_damage=12, base_health=30,
+        )
+        self.bow = PlayerItem.objects.create(inventory=inventory, item_template=bow, quantity=1, slot_index=0)
+        self.passive = SkillTemplate.objects.create(
+            name="Elven Grace", skill_type="buff", is_passive=True,
+            level_scaling=[{"vit": 2, "max_hp_pct": 10}, {"vit": 4, "max_hp_pct": 20}],
+        )
+
+    def test_equip_and_unequip_update_sheet(self):
+        GameLogicService.equip_item(self.char, str(self.bow.id), "weapon")
+        sheet = GameLogicService.get_stat_sheet(self.char)
+        self.assertEqual(sheet.equipment_bonuses["phys_damage"], 12)
+        self.assertEqual(sheet.max_hp, 100 + 10 * 15 + 30)
+
+        GameLogicService.unequip_item(self.char, "weapon")
+        sheet.refresh_from_db()
+        self.assertEqual((sheet.equipment_bonuses["phys_damage"], sheet.max_hp), (0, 250))
+
+    def test_passives_and_points_apply_flat_then_percent(self):
+        GameLogicService.learn_skill(self.char, str(self.passive.id))
+        GameLogicService.allocate_points(self.char, {"vitality": 2, "intelligence": 1})
+        sheet = GameLogicService.get_stat_sheet(self.char)
+        self.assertEqual(sheet.passive_bonuses["vit"], 2)
+        self.assertEqual(sheet.max_hp, (100 + (12 + 2) * 15) * 110 // 100)
+        self.assertEqual(sheet.max_mana, 50 + 7 * 10)
+
+    def test_state_document_serves_sheet_vitals(self):
+        GameLogicService.equip_item(self.char, str(self.bow.id), "weapon")
+        state = GameLogicService.build_character_state(self.char)
+        self.assertEqual((state["max_hp"], state["max_mana"]), (100 + 10 * 15 + 30, 50 + 6 * 10))
+
+        bulk, _ = GameLogicService.get_character_states_bulk([], [str(self.char.id)])
+        self.assertEqual(bulk[0]["max_hp"], state["max_hp"])
+
+    def test_read_is_a_single_query(self):
+        GameLogicService.recompute_stat_sheet(self.char)
+        with self.assertNumQueries(1):
+            GameLogicService.get_stat_sheet(self.char)
+
+
+# ── Leaderboards ─────────────────────────────────────────────────────────────
+
+class LeaderboardServiceTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.game_logic import leaderboard
+        from apps.game_logic.models import Character
+        cache.clear()
+        leaderboard._fallback_backend().reset()
+        self.user = User.objects.create_user(
+            email="ranked@example.com", username="ranked", password="TestPass123!"
+        )
+        self.chars = []
+        specs = [("Ana", "mage", "vanguarda", 3, 0), ("Bia", "shadow", "legiao", 5, 4),
+                 ("Caio", "mage", "vanguarda", 1, 9), ("Duda", "archer", "vanguarda", 4, 1)]
+        for name, cls, faction, level, kills in specs:
+            char = Character.objects.create(
+                owner=self.user, name=name, character_class=cls, race="humano", faction=faction
+            )
+            stats = PlayerStats.objects.create(character=char, level=level, pvp_kills=kills)
+            GameLogicService.update_leaderboard_cache(char, stats)
+            self.chars.append(char)
+
+    def test_pages_with_offset(self):
+        from apps.game_logic import leaderboard
+        first = leaderboard.get_page("global", offset=0, limit=2)
+        self.assertEqual([e["display_name"] for e in first["results"]], ["Bia", "Duda"])
+        self.assertEqual((first["total"], first["next_offset"]), (4, 2))
+        second = leaderboard.get_page("global", offset=2, limit=2)
+        self.assertEqual([e["rank"] for e in second["results"]], [3, 4])
+        self.assertIsNone(second["next_offset"])
+
+    def test_rank_with_neighbours(self):
+        from apps.game_logic import leaderboard
+        result = leaderboard.get_rank("global", self.chars[0].id, neighbours=1)
+        self.assertEqual(result["rank"], 3)
+        self.assertEqual([e["display_name"] for e in result["entries"]], ["Duda", "Ana", "Caio"])
+
+    def test_faction_class_and_pvp_boards(self):
+        from apps.game_logic import leaderboard
+        names = lambda board: [e["display_name"] for e in leaderboard.get_page(board, limit=10)["results"]]
+        self.assertEqual(names("faction:vanguarda"), ["Duda", "Ana", "Caio"])
+        self.assertEqual(names("class:mage"), ["Ana", "Caio"])
+        self.assertEqual(names("pvp"), ["Caio", "Bia", "Duda", "Ana"])
+        with self.assertRaises(ValueError):
+            leaderboard.get_page("faction:nowhere")
+
+    def test_rename_does_not_duplicate_entry(self):
+        from apps.game_logic import leaderboard
+        char = self.chars[0]
+        char.name = "Ana Renamed"
+        char.save()
+        GameLogicService.update_leaderboard_cache(char, PlayerStats.objects.get(character=char))
+        page = leaderboard.get_page("global", limit=10)
+        self.assertEqual(page["total"], 4)
+        self.assertIn("Ana Renamed", [e["display_name"] for e in page["results"]])
+
+    def test_full_rebuild_drops_stale_and_inactive_members(self):
+        from apps.game_logic import leaderboard
+        from apps.game_logic.tasks import rebuild_leaderboard_cache
+        leaderboard.write_entries([(leaderboard.global_key(), "ghost", 99_000_000)], {"ghost": "Ghost"})
+        self.chars[1].is_active = False
+        self.chars[1].save()
+
+        result = rebuild_leaderboard_cache(mode="full")
+
+        self.assertEqual((result["mode"], result["rows"]), ("full", 3))
+        page = leaderboard.get_page("global", limit=10)
+        self.assertEqual([e["display_name"] for e in page["results"]], ["Duda", "Ana", "Caio"])
+        self.assertIsNone(leaderboard.get_rank("faction:legiao", self.chars[1].id))
+
+    @override_settings(LEADERBOARD_WATERMARK_OVERLAP_SECONDS=0)
+    def test_incremental_rebuild_only_touches_changed_rows(self):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+        from apps.game_logic import leaderboard
+        from apps.game_logic.models import Character
+        from apps.game_logic.tasks import LEADERBOARD_WATERMARK_KEY, rebuild_leaderboard_cache
+        past = timezone.now() - timedelta(hours=1)
+        PlayerStats.objects.update(updated_at=past)
+        Character.objects.update(updated_at=past)
+        cache.set(LEADERBOARD_WATERMARK_KEY, past + timedelta(minutes=1), timeout=None)
+
+        PlayerStats.objects.filter(character=self.chars[2]).update(level=9, updated_at=timezone.now())
+        Character.objects.filter(pk=self.chars[3].pk).update(is_active=False, updated_at=timezone.now())
+
+        result = rebuild_leaderboard_cache()
+
+        self.assertEqual((result["mode"], result["rows"], result["removed"]), ("incremental", 2, 1))
+        page = leaderboard.get_page("global", limit=10)
+        self.assertEqual([e["display_name"] for e in page["results"]], ["Caio", "Bia", "Ana"])
+        self.assertGreater(cache.get(LEADERBOARD_WATERMARK_KEY), past + timedelta(minutes=1))
+
+    def test_incremental_rebuild_without_watermark_runs_full(self):
+        from apps.game_logic.tasks import rebuild_leaderboard_cache
+        self.assertEqual(rebuild_leaderboard_cache(mode="incremental")["mode"], "full")
+
+    def test_fallback_restores_from_checkpoint(self):
+        from apps.game_logic import leaderboard
+        backend = leaderboard._fallback_backend()
+        backend.checkpoint()
+        backend.reset()
+        page = leaderboard.get_page("global", limit=10)
+        self.assertEqual([e["display_name"] for e in page["results"]], ["Bia", "Duda", "Ana", "Caio"])
+
+    def test_fallback_checkpoints_do_not_overwrite_other_workers(self):
+        from apps.game_logic.leaderboard import MemoryBackend, global_key
+        with override_settings(LEADERBOARD_FALLBACK_WORKER_ID="w1"):
+            first = MemoryBackend()
+            first.write([(global_key(), "a", 10)], {"a": "A"})
+            first.checkpoint()
+        with override_settings(LEADERBOARD_FALLBACK_WORKER_ID="w2"):
+            second = MemoryBackend()
+            second.write([(global_key(), "b", 20)], {"b": "B"})
+            second.checkpoint()
+        with override_settings(LEADERBOARD_FALLBACK_WORKER_ID="w1"):
+            restarted = MemoryBackend()
+            self.assertEqual(restarted.range(global_key(), 0, 10), [("a", 10)])
+
+
+class RankedSetTestCase(TestCase):
+    def test_rank_and_range_follow_score_updates(self):
+        from apps.game_logic.ranked_set import RankedSet
+        ranked = RankedSet({"a": 10, "b": 30, "c": 20})
+        ranked.add("a", 40)
+        ranked.add("d", 20)
+        ranked.discard("b")
+        self.assertEqual(ranked.range(0, 10), [("a", 40), ("c", 20), ("d", 20)])
+        self.assertEqual((ranked.rank("d"), ranked.rank("b"), len(ranked)), (2, None, 3))
+
+    def test_splits_buckets_and_keeps_order(self):
+        from apps.game_logic.ranked_set import RankedSet
+        ranked = RankedSet()
+        for i in range(2000):
+            ranked.add(f"m{i}", (i * 7919) % 2003)
+        expected = sorted(ranked.to_dict().items(), key=lambda x: (-x[1], x[0]))
+        self.assertEqual(ranked.range(995, 1004), expected[995:1005])
+        self.assertEqual(ranked.rank(expected[1500][0]), 1500)
+
+    def test_rank_index_matches_sorted_order_under_churn(self):
+        import random
+        from apps.game_logic.ranked_set import RankedSet
+
+        class Small(RankedSet):
+            LOAD = 4
+
+        rng = random.Random(7)
+        ranked = Small({f"s{i}": rng.randrange(50) for i in range(40)})
+        for _ in range(600):
+            member = f"m{rng.randrange(120)}"
+            if rng.random() < 0.3:
+                ranked.discard(member)
+            else:
+                ranked.add(member, rng.randrange(50))
+        expected = sorted(ranked.to_dict().items(), key=lambda x: (-x[1], x[0]))
+        self.assertEqual([ranked.rank(m) for m, _ in expected], list(range(len(expected))))
+        self.assertEqual(ranked.range(0, len(expected) + 5), expected)
+        self.assertEqual(ranked.range(17, 29), expected[17:30])
+        self.assertEqual(ranked.range(len(expected), len(expected) + 3), [])
+
+
+# ── Session presence ─────────────────────────────────────────────────────────
+
+class GameSessionPresenceTestCase(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.game_logic.models import Character, GameSession
+        user = User.objects.create_user(
+            email="present@example.com", username="present", password="TestPass123!"
+        )
+        self.sessions = []
+        for name in ("Live", "Gone"):
+            char = Character.objects.create(owner=user, name=name, character_class="mage", race="humano")
+            self.sessions.append(GameSession.objects.create(character=char))
+        GameSession.objects.update(last_heartbeat_at=timezone.now() - timedelta(minutes=5))
+
+    def test_closes_sessions_without_heartbeat(self):
+        from apps.game_logic.models import GameSession
+        from apps.game_logic.tasks import cleanup_stale_game_sessions
+        result = cleanup_stale_game_sessions()
+        self.assertEqual(result, {"synced": 0, "updated": 2})
+        self.assertFalse(GameSession.objects.filter(is_active=True).exists())
+
+    def test_redis_heartbeats_are_synced_in_bulk(self):
+        import time
+        from unittest import mock
+        from apps.game_logic import presence
+        from apps.game_logic.models import GameSession
+        from apps.game_logic.tasks import cleanup_stale_game_sessions
+        live, gone = self.sessions
+        with mock.patch.object(presence, "live_since", return_value={str(live.id): time.time()}), \
+                mock.patch.object(presence, "drop_before") as drop_before:
+            result = cleanup_stale_game_sessions()
+        self.assertEqual(result, {"synced": 1, "updated": 1})
+        self.assertTrue(GameSession.objects.get(pk=live.pk).is_active)
+        self.assertFalse(GameSession.objects.get(pk=gone.pk).is_active)
+        drop_before.assert_called_once()
+
+
+class ChatFilterTestCase(TestCase):
+    def setUp(self):
+        from apps.game_logic.chat_filter import Automaton
+        self.automaton = Automaton([
+            ("ass", "mask", True, False),
+            ("he", "mask", False, False),
+            ("she", "mask", False, False),
+            ("hers", "mask", False, False),
+            ("Scam", "reject", True, False),
+            ("http://", "mask", False, True),
+        ])
+
+    def test_masks_whole_words_case_insensitively(self):
+        self.assertEqual(self.automaton.apply("what an ASS!"), ("what an ***!", "mask"))
+        self.assertEqual(self.automaton.apply("first class"), ("first class", None))
+
+    def test_overlapping_terms_in_one_pass(self):
+        self.assertEqual(self.automaton.apply("ushers")[0], "u*****")
+
+    def test_reject_term_drops_message(self):
+        self.assertEqual(self.automaton.apply("free gold, not a scam"), (None, "reject"))
+        self.assertEqual(self.automaton.apply("scampi")[1], None)
+
+    def test_link_mask_runs_to_next_space(self):
+        self.assertEqual(self.automaton.apply("go http://x.io/a now")[0], "go ************* now")
+
+    def test_word_list_changes_are_recompiled(self):
+        from django.core.cache import cache
+        from apps.game_logic import chat_filter
+        from apps.game_logic.models import ChatFilterTerm
+
+        cache.clear()
+        chat_filter.refresh()
+        self.assertEqual(chat_filter.run_filters("global", "you troll"), ("you troll", None))
+        ChatFilterTerm.objects.create(term="troll", action="mask")
+        self.assertTrue(chat_filter.refresh())
+        self.assertEqual(chat_filter.run_filters("global", "you troll"), ("you *****", "mask"))
+        self.assertFalse(chat_filter.refresh())
+
+    def test_counters_per_room(self):
+        from apps.game_logic import chat_filter
+
+        chat_filter._local_stats.clear()
+        chat_filter.count("zone_ruins", "reject")
+        chat_filter.count("zone_ruins", "reject")
+        chat_filter.count("global", "mask")
+        self.assertEqual(chat_filter.stats(), {
+            "zone_ruins": {"blocked": 2, "masked": 0},
+            "global": {"blocked": 0, "masked": 1},
+        })
@@ -3,7 +3,9 @@ Tests for game_logic views.
 """
 import hashlib
 import hmac
+import importlib.util
 import json
+from unittest import mock, skipUnless
 
 from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
@@ -548,7 +550,7 @@ class GameStateViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         payload = response.json()
         self.assertEqual(payload["hp"], 75)
-        self.assertEqual(payload["max_hp"], 100)
+        self.assertEqual(payload["max_hp"], 100 + 10 * 15)  # stat sheet, vitality 10
         self.assertEqual(payload["pos_x"], 500)
         self.assertEqual(payload["pos_y"], 800)
 
@@ -572,6 +574,130 @@ class GameStateViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class GameStateCacheTestCase(TestCase):
+    """GameStateView serves the cached player state and only hits the DB on a miss."""
+
+    _BASE = "/api/v1/game-logic/game-state/{}/"
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.game_logic.models import Character
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="cached@example.com", username="cacheduser", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Cached", character_class="mage", race="humano", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char, health=80, last_pos_x=10, last_pos_y=20)
+
+    def _get(self, query: str = ""):
+        user_id = str(self.user.id)
+        sig = hmac.new(_WEBHOOK_SECRET.encode(), user_id.encode(), hashlib.sha256).hexdigest()
+        return self.client.get(self._BASE.format(user_id) + query, HTTP_X_WEBHOOK_SECRET=sig)
+
+    def test_second_load_is_served_without_queries(self):
+        first = self._get().json()
+        self.assertEqual(first["character_id"], str(self.char.id))
+        self.assertIsNone(first["party_id"])
+        with self.assertNumQueries(0):
+            second = self._get()
+        self.assertEqual(second.json(), first)
+
+    def test_position_update_is_visible_on_cache_hit(self):
+        from apps.game_logic.services import GameLogicService
+        self._get()
+        GameLogicService.save_player_position(self.char, 300, 400, 55)
+        with self.assertNumQueries(0):
+            payload = self._get(f"?character_id={self.char.id}").json()
+        self.assertEqual((payload["pos_x"], payload["pos_y"], payload["hp"]), (300, 400, 55))
+
+    def test_flushed_experience_is_visible_on_cache_hit(self):
+        from apps.game_logic.services import GameLogicService
+        self.assertEqual(self._get().json()["experience"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            GameLogicService.apply_experience_bulk({str(self.char.id): 40})
+        with self.assertNumQueries(0):
+            payload = self._get(f"?character_id={self.char.id}").json()
+        self.assertEqual((payload["experience"], payload["level"]), (40, 1))
+
+    def test_outdated_state_version_falls_back_to_db(self):
+        from django.core.cache import cache
+        from apps.game_logic.services import GameLogicService
+        cache.set(GameLogicService.player_state_key(self.char.id), {"state_version": 1, "hp": 1})
+        payload = self._get(f"?character_id={self.char.id}").json()
+        self.assertEqual(payload["hp"], 80)
+        self.assertEqual(payload["state_version"], GameLogicService.PLAYER_STATE_VERSION)
+
+
+class GameStateBulkViewTestCase(TestCase):
+    """POST /game-state/bulk/ — many states with a fixed number of queries."""
+
+    _URL = "/api/v1/game-logic/game-state/bulk/"
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.game_logic.models import Character
+        cache.clear()
+        self.client = APIClient()
+        self.users, self.chars = [], []
+        for i in range(4):
+            user = User.objects.create_user(
+                email=f"bulk{i}@example.com", username=f"bulk{i}", password="TestPass123!"
+            )
+            char = Character.objects.create(
+                owner=user, name=f"Bulk{i}", character_class="archer", race="elfo", faction="vanguarda"
+            )
+            PlayerStats.objects.create(character=char, health=50 + i)
+            self.users.append(user)
+            self.chars.append(char)
+
+    def _post(self, payload: dict, secret: str = _WEBHOOK_SECRET):
+        body = json.dumps(payload).encode()
+        sig = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(self._URL, data=body, content_type="application/json", HTTP_X_WEBHOOK_SECRET=sig)
+
+    def _count_queries(self, payload: dict) -> int:
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.core.cache import cache
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._post(payload)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_returns_states_for_users_and_characters(self):
+        response = self._post({
+            "user_ids": [str(self.users[0].id), "00000000-0000-0000-0000-000000000000"],
+            "character_ids": [str(self.chars[1].id)],
+        })
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        by_char = {s["character_id"]: s for s in payload["states"]}
+        self.assertEqual(set(by_char), {str(self.chars[0].id), str(self.chars[1].id)})
+        self.assertEqual(by_char[str(self.chars[1].id)]["hp"], 51)
+        self.assertEqual(payload["missing"], ["00000000-0000-0000-0000-000000000000"])
+
+    def test_query_count_does_not_grow_with_batch(self):
+        small = self._count_queries({"user_ids": [str(u.id) for u in self.users[:1]]})
+        large = self._count_queries({"user_ids": [str(u.id) for u in self.users]})
+        self.assertEqual(small, large)
+
+    def test_warm_cache_needs_no_queries(self):
+        payload = {"character_ids": [str(c.id) for c in self.chars]}
+        self._post(payload)
+        with self.assertNumQueries(0):
+            response = self._post(payload)
+        self.assertEqual(len(response.json()["states"]), 4)
+
+    def test_invalid_signature_and_bad_ids(self):
+        self.assertEqual(self._post({"user_ids": [str(self.users[0].id)]}, secret="wrong").status_code, 403)
+        self.assertEqual(self._post({"user_ids": ["not-a-uuid"]}).status_code, 400)
+        self.assertEqual(self._post({}).status_code, 400)
+
+
 class LeaderboardViewTestCase(TestCase):
     """Tests for LeaderboardView."""
 
@@ -598,6 +724,25 @@ class LeaderboardViewTestCase(TestCase):
         response = self.client.get("/api/v1/game-logic/leaderboard/?limit=3")
         self.assertEqual(response.status_code, 200)
 
+    def test_unknown_board_returns_400(self):
+        response = self.client.get("/api/v1/game-logic/leaderboard/?board=class:bard")
+        self.assertEqual(response.status_code, 400)
+
+    def test_my_rank(self):
+        from django.core.cache import cache
+        from apps.game_logic import leaderboard
+        from apps.game_logic.models import Character
+        from apps.game_logic.services import GameLogicService
+        cache.clear()
+        leaderboard._fallback_backend().reset()
+        char = Character.objects.create(
+            owner=self.user, name="Climber", character_class="archer", race="elfo", faction="vanguarda"
+        )
+        GameLogicService.update_leaderboard_cache(char, PlayerStats.objects.create(character=char, level=7))
+        response = self.client.get(f"/api/v1/game-logic/leaderboard/me/?character_id={char.id}&board=class:archer")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rank"], 1)
+
 
 class QuestProgressViewTestCase(TestCase):
     """Tests for QuestProgressView (GET and POST)."""
@@ -711,6 +856,129 @@ class GameSessionViewTestCase(TestCase):
         self.assertEqual(response.status_code, 401)
 
 
+class MapPopulationTestCase(TestCase):
+    """Capacity admission on session start and the population endpoint."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.game_data.models import MapData
+        from apps.game_logic.models import Character
+        cache.clear()
+        MapData.objects.create(name="Arena", map_key="arena", max_players=1)
+        MapData.objects.create(name="Town", map_key="town", max_players=50)
+        self.client = APIClient()
+        self.chars = []
+        for name in ("first", "second"):
+            user = User.objects.create_user(email=f"{name}@maps.example.com", username=f"maps{name}", password="TestPass123!")
+            self.chars.append(Character.objects.create(owner=user, name=name, character_class="mage", race="humano"))
+
+    def _start(self, char, map_key):
+        self.client.force_authenticate(user=char.owner)
+        return self.client.post(
+            "/api/v1/game-logic/session/", {"character_id": str(char.id), "map_key": map_key}, format="json"
+        )
+
+    def test_full_map_rejects_new_session(self):
+        self.assertEqual(self._start(self.chars[0], "arena").status_code, 201)
+        self.assertEqual(self._start(self.chars[1], "arena").status_code, 409)
+        self.assertEqual(self._start(self.chars[1], "town").status_code, 201)
+        # Restarting frees the previous slot
+        self.assertEqual(self._start(self.chars[0], "town").status_code, 201)
+        self.assertEqual(self._start(self.chars[1], "arena").status_code, 201)
+
+    def test_map_without_capacity_skips_admission(self):
+        self.assertEqual(self._start(self.chars[0], "nowhere").status_code, 201)
+        self.assertEqual(self._start(self.chars[1], "nowhere").status_code, 201)
+
+    def test_admission_runs_only_after_commit(self):
+        from django.db import transaction
+        from apps.game_logic import map_population
+        from apps.game_logic.services import GameLogicService
+        with mock.patch.object(map_population, "admit", return_value=True) as admit:
+            with self.assertRaises(RuntimeError):
+                with self.captureOnCommitCallbacks(execute=True):
+                    with transaction.atomic():
+                        GameLogicService.start_game_session(self.chars[0], map_key="arena")
+                        raise RuntimeError("caller failed")
+            admit.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                session = GameLogicService.start_game_session(self.chars[0], map_key="arena")
+            admit.assert_called_once_with(session.id, "arena")
+
+    def test_session_that_lost_the_slot_is_ended(self):
+        from apps.game_logic import map_population
+        from apps.game_logic.services import GameLogicService
+        with mock.patch.object(map_population, "admit", return_value=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                session = GameLogicService.start_game_session(self.chars[0], map_key="arena")
+        session.refresh_from_db()
+        self.assertFalse(session.is_active)
+
+    def test_population_endpoint(self):
+        self._start(self.chars[0], "arena")
+        self._start(self.chars[1], "town")
+        self.client.force_authenticate(user=None)
+        response = self.client.get("/api/v1/game-logic/maps/population/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["maps"]["arena"], {"online": 1, "max_players": 1})
+        self.assertEqual(response.json()["total_online"], 2)
+
+
+@skipUnless(importlib.util.find_spec("lupa"), "fakeredis needs lupa to run Lua scripts")
+class MapPopulationRedisTestCase(TestCase):
+    """admit/leave scripts against a fake Redis."""
+
+    def setUp(self):
+        import fakeredis
+        from django.core.cache import cache
+        from apps.game_data.models import MapData
+        from apps.game_logic import map_population
+        cache.clear()
+        MapData.objects.create(name="Arena", map_key="arena", max_players=1)
+        MapData.objects.create(name="Town", map_key="town", max_players=50)
+        self.maps = map_population
+        self.conn = fakeredis.FakeRedis()
+        patcher = mock.patch.object(map_population, "_get_conn", return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_admit_moves_between_maps_and_respects_capacity(self):
+        self.assertTrue(self.maps.admit("s1", "arena"))
+        self.assertFalse(self.maps.admit("s2", "arena"))
+        self.assertTrue(self.maps.admit("s1", "town"))
+        self.assertTrue(self.maps.admit("s2", "arena"))
+        self.assertEqual(self.maps.populations(), {"arena": 1, "town": 1})
+
+        self.maps.leave("s1", "s2", "never-admitted")
+        self.assertEqual(self.maps.populations(), {})
+        self.assertFalse(self.conn.exists(self.maps.SESSION_MAP_KEY))
+
+    def test_untracked_map_creates_no_keys(self):
+        self.assertTrue(self.maps.admit("s1", "nowhere"))
+        self.assertEqual(self.conn.keys("*"), [])
+
+        self.maps.admit("s1", "arena")
+        self.assertTrue(self.maps.admit("s1", "nowhere"))
+        self.assertEqual(self.maps.populations(), {})
+        self.assertEqual(self.conn.scard(f"{self.maps.MEMBERS_PREFIX}arena"), 0)
+
+    def test_map_changed_since_read_is_retried(self):
+        self.maps.admit("s1", "town")
+        real_hget = self.conn.hget
+        calls = []
+
+        def stale_hget(*args):
+            calls.append(args)
+            # The first read sees no map, as if the session moved right after it
+            return None if len(calls) == 1 else real_hget(*args)
+
+        with mock.patch.object(self.conn, "hget", side_effect=stale_hget):
+            self.assertTrue(self.maps.admit("s1", "arena"))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.maps.populations(), {"arena": 1})
+
+
 class UpgradeSkillViewTestCase(TestCase):
     """Tests for POST skills/<id>/upgrade/."""
 
@@ -1032,6 +1300,54 @@ class CreateCharacterViewTestCase(TestCase):
         self.assertEqual(data["max_health"], 310)  # 100 + 14*15
 
 
+# ── player_connected Webhook ─────────────────────────────────────────────────
+
+class PlayerConnectedWebhookTestCase(TestCase):
+    """Session start from the game server, with and without configured maps."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from apps.game_logic.models import Character
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="arrive@example.com", username="arrive", password="TestPass123!")
+        self.char = Character.objects.create(
+            owner=self.user, name="Arrival", character_class="mage", race="humano", faction="vanguarda"
+        )
+
+    def _post(self, url, payload):
+        body = json.dumps(payload).encode()
+        return self.client.post(url, data=body, content_type="application/json", HTTP_X_WEBHOOK_SECRET=_sign(body))
+
+    def test_connect_without_map_data_starts_session(self):
+        from apps.game_logic.models import GameSession
+        response = self._post(_WEBHOOK_URL, {"event_type": "player_connected", "player_id": str(self.user.id), "data": {}})
+        self.assertEqual(response.status_code, 200)
+        session = GameSession.objects.get(character=self.char, is_active=True)
+        self.assertEqual(session.last_map_key, "world_main")
+
+        response = self._post("/api/v1/game-logic/events/batch/", {"events": [
+            {"event_type": "player_connected", "player_id": str(self.user.id), "data": {}},
+        ]})
+        self.assertEqual(response.json()["failed"], 0)
+
+    def test_full_map_is_409(self):
+        from apps.game_data.models import MapData
+        from apps.game_logic.models import Character, GameSession
+        MapData.objects.create(name="Arena", map_key="arena", max_players=1)
+        rival = Character.objects.create(
+            owner=User.objects.create_user(email="rival@example.com", username="rival", password="TestPass123!"),
+            name="Rival", character_class="mage", race="humano", faction="vanguarda",
+        )
+        GameSession.objects.create(character=rival, is_active=True, last_map_key="arena")
+        response = self._post(_WEBHOOK_URL, {
+            "event_type": "player_connected", "player_id": str(self.user.id), "data": {"map_key": "arena"},
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("full", response.json()["error"])
+        self.assertFalse(GameSession.objects.filter(character=self.char, is_active=True).exists())
+
+
 # ── player_died Webhook ──────────────────────────────────────────────────────
 
 class PlayerDiedWebhookTestCase(TestCase):
@@ -1075,3 +1391,224 @@ class PlayerDiedWebhookTestCase(TestCase):
         from apps.game_logic.models import PlayerInventory as _PI
         inv = _PI.objects.get(owner=self.user)
         self.assertEqual(inv.gold, 180)  # 200 - 20 (10%)
+
+
+# ── Batch webhook ────────────────────────────────────────────────────────────
+
+class GameEventBatchWebhookTestCase(TestCase):
+    _URL = "/api/v1/game-logic/events/batch/"
+
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="batch@example.com", username="batch", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Batcher", character_class="mage", race="humano", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char)
+        self.item = ItemTemplate.objects.create(
+            name="Health Potion", item_type="consumable", rarity="common", stack_size=10,
+        )
+
+    def _post(self, payload, secret=_WEBHOOK_SECRET):
+        body = json.dumps(payload).encode()
+        return self.client.post(
+            self._URL,
+            data=body,
+            content_type="application/json",
+            HTTP_X_WEBHOOK_SECRET=_sign(body, secret),
+        )
+
+    def test_applies_all_events_for_character(self):
+        response = self._post({"events": [
+            {"event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": 30}},
+            {"event_type": "player_action", "player_id": str(self.user.id), "data": {"action_id": 3}},
+            {"event_type": "item_collected", "player_id": str(self.user.id),
+             "data": {"item_template_id": str(self.item.id), "quantity": 3}},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["failed"], 0)
+        self.assertTrue(all(r["ok"] for r in payload["results"]))
+        self.assertEqual(PlayerStats.objects.get(character=self.char).experience, 40)
+        self.assertEqual(PlayerInventory.objects.get(character=self.char).slots_used, 1)
+
+    def test_reports_per_event_failures(self):
+        response = self._post({"events": [
+            {"event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": 10}},
+            {"event_type": "xp_gained", "player_id": "00000000-0000-0000-0000-000000000000", "data": {"amount": 10}},
+            {"event_type": "item_collected", "player_id": str(self.user.id),
+             "data": {"item_template_id": str(self.item.id), "quantity": 0}},
+            {"player_id": str(self.user.id)},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([r["ok"] for r in results], [True, False, False, False])
+        self.assertEqual(results[1]["error"], "player not found")
+        # The failed event is rolled back on its own; the rest of the batch is kept
+        self.assertEqual(PlayerStats.objects.get(character=self.char).experience, 10)
+
+    def test_invalid_signature_rejected(self):
+        response = self._post({"events": [{"event_type": "xp_gained", "player_id": str(self.user.id)}]}, secret="bad")
+        self.assertEqual(response.status_code, 403)
+
+    def test_empty_batch_returns_400(self):
+        self.assertEqual(self._post({"events": []}).status_code, 400)
+
+    @override_settings(GAME_EVENTS_BATCH_MAX=2)
+    def test_oversized_batch_returns_400(self):
+        event = {"event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": 1}}
+        self.assertEqual(self._post({"events": [event] * 3}).status_code, 400)
+
+
+class IdempotentWebhookTestCase(TestCase):
+    """Retried events carrying an event_id are applied once (DB ledger without Redis)."""
+
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="retry@example.com", username="retry", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Retrier", character_class="mage", race="humano", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char)
+        self.item = ItemTemplate.objects.create(name="Gem", item_type="material", rarity="rare", stack_size=50)
+
+    def _post(self, url: str, payload: dict, **headers):
+        body = json.dumps(payload).encode()
+        return self.client.post(
+            url, data=body, content_type="application/json", HTTP_X_WEBHOOK_SECRET=_sign(body), **headers
+        )
+
+    def _collect(self, event_id: str) -> dict:
+        return {
+            "event_type": "item_collected", "player_id": str(self.user.id), "event_id": event_id,
+            "data": {"item_template_id": str(self.item.id), "quantity": 2},
+        }
+
+    def test_retried_single_event_is_applied_once(self):
+        first = self._post("/api/v1/game-logic/events/", self._collect("evt-1"))
+        retry = self._post("/api/v1/game-logic/events/", self._collect("evt-1"))
+        self.assertEqual(first.json(), {"ok": True})
+        self.assertEqual(retry.json(), {"ok": True, "duplicate": True})
+        from apps.game_logic.models import PlayerItem
+        self.assertEqual(PlayerItem.objects.get(inventory__character=self.char).quantity, 2)
+
+    def test_idempotency_key_header_is_accepted(self):
+        payload = {"event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": 40}}
+        self._post("/api/v1/game-logic/events/", payload, HTTP_IDEMPOTENCY_KEY="xp-7")
+        self._post("/api/v1/game-logic/events/", payload, HTTP_IDEMPOTENCY_KEY="xp-7")
+        self.assertEqual(PlayerStats.objects.get(character=self.char).experience, 40)
+
+    def test_duplicate_inside_batch_is_flagged(self):
+        response = self._post("/api/v1/game-logic/events/batch/", {"events": [
+            self._collect("evt-2"), self._collect("evt-2"), self._collect("evt-3"),
+        ]})
+        results = response.json()["results"]
+        self.assertEqual([r.get("duplicate", False) for r in results], [False, True, False])
+        from apps.game_logic.models import PlayerItem
+        self.assertEqual(PlayerItem.objects.get(inventory__character=self.char).quantity, 4)
+
+    def test_retry_while_first_delivery_runs_is_409(self):
+        import fakeredis
+        from unittest import mock
+        from apps.game_logic import idempotency
+        conn = fakeredis.FakeRedis()
+        conn.set(idempotency._key("evt-4"), idempotency.PENDING)
+        with mock.patch.object(idempotency, "_get_conn", return_value=conn):
+            single = self._post("/api/v1/game-logic/events/", self._collect("evt-4"))
+            batch = self._post("/api/v1/game-logic/events/batch/", {"events": [self._collect("evt-4")]})
+        self.assertEqual(single.status_code, 409)
+        self.assertFalse(single.json()["ok"])
+        self.assertEqual(batch.json()["failed"], 1)
+        from apps.game_logic.models import PlayerItem
+        self.assertFalse(PlayerItem.objects.filter(inventory__character=self.char).exists())
+
+    def test_rolled_back_batch_releases_claims(self):
+        import contextlib
+        import fakeredis
+        from unittest import mock
+        from django.db import DatabaseError, transaction
+        from apps.game_logic import idempotency
+        real_atomic = transaction.atomic
+        calls = []
+
+        @contextlib.contextmanager
+        def failing_outer():
+            with real_atomic():
+                yield
+                raise DatabaseError("commit failed")
+
+        def atomic(*args, **kwargs):
+            calls.append(1)
+            return failing_outer() if len(calls) == 1 else real_atomic(*args, **kwargs)
+
+        conn = fakeredis.FakeRedis()
+        with mock.patch.object(idempotency, "_get_conn", return_value=conn):
+            with mock.patch.object(transaction, "atomic", side_effect=atomic):
+                first = self._post("/api/v1/game-logic/events/batch/", {"events": [self._collect("evt-5")]})
+            self.assertEqual(first.json()["results"][0]["error"], "transaction failed")
+            self.assertIsNone(conn.get(idempotency._key("evt-5")))
+            retry = self._post("/api/v1/game-logic/events/batch/", {"events": [self._collect("evt-5")]})
+        self.assertEqual(retry.json()["results"][0], {"index": 0, "ok": True})
+        from apps.game_logic.models import PlayerItem
+        self.assertEqual(PlayerItem.objects.get(inventory__character=self.char).quantity, 2)
+
+
+@override_settings(GAME_EVENTS_ASYNC=True)
+class AsyncEventIngestionTestCase(TestCase):
+    """Without Redis the async mode must fall back to synchronous processing."""
+
+    def setUp(self):
+        from apps.game_logic.models import Character
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="async@example.com", username="async", password="TestPass123!"
+        )
+        self.char = Character.objects.create(
+            owner=self.user, name="Queued", character_class="mage", race="humano", faction="vanguarda"
+        )
+        PlayerStats.objects.create(character=self.char)
+
+    def _post(self, url, payload):
+        body = json.dumps(payload).encode()
+        return self.client.post(url, data=body, content_type="application/json", HTTP_X_WEBHOOK_SECRET=_sign(body))
+
+    def test_single_event_falls_back_to_sync(self):
+        response = self._post(_WEBHOOK_URL, {
+            "event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": 20},
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PlayerStats.objects.get(character=self.char).experience, 20)
+
+    def test_batch_falls_back_to_sync(self):
+        response = self._post("/api/v1/game-logic/events/batch/", {"events": [
+            {"event_type": "xp_gained", "player_id": str(self.user.id), "data": {"amount": 15}},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["failed"], 0)
+
+    def test_metrics_unavailable_without_redis(self):
+        admin = User.objects.create_superuser(email="qadmin@example.com", username="qadmin", password="AdminPass123!")
+        self.client.force_authenticate(user=admin)
+        response = self.client.get("/api/v1/game-logic/events/metrics/")
+        self.assertEqual(response.status_code, 503)
+
+
+class ChatFilterStatsViewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="fuser@example.com", username="fuser", password="TestPass123!")
+
+    def test_chat_filter_stats_is_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get("/api/v1/game-logic/chat/filter-stats/").status_code, 403)
+        admin = User.objects.create_superuser(email="fadmin@example.com", username="fadmin", password="AdminPass123!")
+        self.client.force_authenticate(user=admin)
+        response = self.client.get("/api/v1/game-logic/chat/filter-stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("rooms", response.json())
@@ -28,11 +28,13 @@ class GameEventWebhookView(APIView):
 - O scope `"gameserver"` é separado dos throttles de usuário para não interferir.
 - Em dev, defina `"gameserver": "1000/min"` para não bloquear testes.
 - Cache key é baseado no IP do cliente (mesmo comportamento que `GameServerIPPermission`).
+- O limite é um token bucket Redis compartilhado entre os workers
+  (`apps.common.rate_limit`), com rajadas de até a taxa inteira.
 """
-from rest_framework.throttling import SimpleRateThrottle
+from apps.common.throttling import TokenBucketThrottle
 
 
-class GameServerThrottle(SimpleRateThrottle):
+class GameServerThrottle(TokenBucketThrottle):
     """
     Rate limit aplicado aos endpoints server-to-server (webhook e game-state).
     Configurável via REST_THROTTLE_GAMESERVER (padrão: 120/min).
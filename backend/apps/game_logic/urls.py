@@ -5,13 +5,19 @@ from django.urls import path
 from apps.game_logic.views import (
     AllocatePointsView,
     CharacterViewSet,
+    ChatFilterStatsView,
     EquipItemView,
+    GameEventBatchWebhookView,
+    GameEventStreamMetricsView,
     GameEventWebhookView,
+    GameStateBulkView,
     GameStateView,
     GainExperienceView,
     InventoryItemView,
     InventoryView,
+    LeaderboardRankView,
     LeaderboardView,
+    MapPopulationView,
     PartyInviteView,
     PartyView,
     PlayerInstancesView,
@@ -39,10 +45,16 @@ urlpatterns = [
     path("skills/", PlayerSkillsView.as_view(), name="skills"),
     path("skills/<uuid:skill_id>/upgrade/", UpgradeSkillView.as_view(), name="skill-upgrade"),
     path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
+    path("leaderboard/me/", LeaderboardRankView.as_view(), name="leaderboard-rank"),
     path("session/", GameSessionView.as_view(), name="game-session"),
+    path("maps/population/", MapPopulationView.as_view(), name="map-population"),
     path("quest-templates/", QuestTemplatesView.as_view(), name="quest-templates"),
     path("events/", GameEventWebhookView.as_view(), name="game-events-webhook"),
+    path("events/batch/", GameEventBatchWebhookView.as_view(), name="game-events-batch-webhook"),
+    path("events/metrics/", GameEventStreamMetricsView.as_view(), name="game-events-metrics"),
+    path("game-state/bulk/", GameStateBulkView.as_view(), name="game-state-bulk"),
     path("game-state/<str:user_id>/", GameStateView.as_view(), name="game-state"),
+    path("chat/filter-stats/", ChatFilterStatsView.as_view(), name="chat-filter-stats"),
     path("party/", PartyView.as_view(), name="party"),
     path("party/invite/", PartyInviteView.as_view(), name="party-invite"),
     path("characters/", CharacterViewSet.as_view(), name="characters-list"),
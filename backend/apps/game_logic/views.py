@@ -5,7 +5,9 @@ import hashlib
 import hmac
 import logging
 import os
+import uuid
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
@@ -30,6 +32,8 @@ from apps.game_logic.serializers import (
     QuestTemplateSerializer,
     UpdateStatsSerializer,
 )
+from apps.game_logic import chat_filter, leaderboard, map_population
+from apps.game_logic.event_queue import enqueue_game_events, stream_metrics
 from apps.game_logic.permissions import GameServerIPPermission
 from apps.game_logic.services import GameLogicService
 from apps.game_logic.throttles import GameServerThrottle
@@ -75,6 +79,12 @@ class CharacterViewSet(APIView):
             char = Character.objects.get(pk=pk, owner=request.user)
             char.is_active = False
             char.save()
+            leaderboard.remove_character(char.id)
+            from django.core.cache import cache
+            cache.delete_many([
+                GameLogicService.default_character_key(request.user.id),
+                GameLogicService.player_state_key(char.id),
+            ])
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Character.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -331,12 +341,40 @@ class UpgradeSkillView(APIView):
 # ── Ranking ───────────────────────────────────────────────────────────────────
 
 class LeaderboardView(APIView):
+    """
+    Página de um ranking.
+
+    Query params: `board` (`global`, `pvp`, `faction:<f>`, `class:<c>`), `offset`, `limit`
+    (máx. `LEADERBOARD_SIZE`). A resposta traz `total` e `next_offset` (None na última página).
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        limit = int(request.query_params.get("limit", 10))
-        lb = GameLogicService.get_leaderboard(limit=limit)
-        return Response({"results": lb})
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), getattr(settings, "LEADERBOARD_SIZE", 100))
+            offset = int(request.query_params.get("offset", 0))
+            page = leaderboard.get_page(request.query_params.get("board", "global"), offset=offset, limit=limit)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(page)
+
+
+class LeaderboardRankView(APIView):
+    """Posição do personagem (`character_id`) em um ranking, com `neighbours` vizinhos acima/abaixo."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        char = _get_character(request)
+        if not char:
+            return Response({"error": "character_id required or not found"}, status=400)
+        try:
+            neighbours = min(int(request.query_params.get("neighbours", 5)), 25)
+            result = leaderboard.get_rank(request.query_params.get("board", "global"), char.id, neighbours)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if result is None:
+            return Response({"error": "character not ranked"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
 
 
 # ── Sessão de Jogo ────────────────────────────────────────────────────────────
@@ -350,7 +388,10 @@ class GameSessionView(APIView):
             return Response({"error": "character_id required or not found"}, status=400)
         ip = request.META.get("REMOTE_ADDR")
         map_key = request.data.get("map_key", "")
-        GameLogicService.start_game_session(char, ip=ip, map_key=map_key)
+        try:
+            GameLogicService.start_game_session(char, ip=ip, map_key=map_key)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
         return Response({"status": "session_started"}, status=201)
 
     def delete(self, request):
@@ -361,6 +402,20 @@ class GameSessionView(APIView):
         return Response({"status": "session_ended"})
 
 
+class MapPopulationView(APIView):
+    """Jogadores online por mapa (`map_population`) e a lotação de cada um — sem consultar o Postgres."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        online = map_population.populations()
+        capacities = map_population.capacities()
+        maps = {
+            map_key: {"online": online.get(map_key, 0), "max_players": capacities.get(map_key)}
+            for map_key in sorted(set(capacities) | set(online))
+        }
+        return Response({"maps": maps, "total_online": sum(online.values())})
+
+
 # ── Integração Unity ──────────────────────────────────────────────────────────
 
 class GameEventWebhookView(APIView):
@@ -381,10 +436,18 @@ class GameEventWebhookView(APIView):
         player_id  = request.data.get("player_id")
         char_id    = request.data.get("character_id")
         data       = request.data.get("data", {})
+        event_id   = request.data.get("event_id") or request.headers.get("Idempotency-Key")
 
         if not event_type or not player_id:
             return Response({"error": "event_type and player_id required"}, status=400)
 
+        if getattr(settings, "GAME_EVENTS_ASYNC", False):
+            event = {"event_type": event_type, "player_id": str(player_id), "character_id": char_id, "data": data}
+            if event_id:
+                event["event_id"] = str(event_id)
+            if enqueue_game_events([event]):
+                return Response({"queued": True}, status=status.HTTP_202_ACCEPTED)
+
         try:
             target_user = User.objects.get(id=player_id)
         except User.DoesNotExist:
@@ -397,79 +460,85 @@ class GameEventWebhookView(APIView):
         if not char:
             char = Character.objects.filter(owner=target_user, is_active=True).order_by("-created_at").first()
 
-        if event_type == "xp_gained":
-            if char:
-                amount = min(int(data.get("amount", 0)), 10_000)
-                if amount > 0:
-                    GameLogicService.gain_experience(char, amount, bypass_anticheat=True)
+        try:
+            result = GameLogicService.apply_game_event(char, event_type, data, event_id=event_id)
+        except ValueError as exc:
+            # Rejected by the service (e.g. full map); not retryable as-is
+            return Response({"ok": False, "error": str(exc)}, status=status.HTTP_409_CONFLICT)
+        if result.get("in_progress"):
+            # First delivery still running: not applied yet, the game server retries
+            return Response(result, status=status.HTTP_409_CONFLICT)
 
-        elif event_type == "item_collected":
-            if char:
-                item_id  = data.get("item_template_id")
-                quantity = int(data.get("quantity", 1))
-                if item_id:
-                    GameLogicService.add_item_to_inventory(char, item_id, quantity)
+        logger.info("Webhook event '%s' processed for player %s / char %s", event_type, player_id, char_id)
+        return Response(result)
 
-        elif event_type == "player_connected":
-            if char:
-                GameLogicService.start_game_session(
-                    char,
-                    ip=data.get("ip_address", ""),
-                    map_key=data.get("map_key", "world_main"),
-                )
 
-        elif event_type == "player_action":
-            if char:
-                XP_PER_ACTION = {1: 5, 2: 5, 3: 10, 4: 2}
-                xp = XP_PER_ACTION.get(int(data.get("action_id", 0)), 0)
-                if xp:
-                    GameLogicService.gain_experience(char, xp, bypass_anticheat=True)
+class GameEventBatchWebhookView(APIView):
+    """
+    Recebe vários eventos do servidor de jogo em um único corpo assinado (HMAC).
 
-        elif event_type == "player_disconnected":
-            if char:
-                pos_x = int(data.get("pos_x", 0))
-                pos_y = int(data.get("pos_y", 0))
-                hp    = int(data.get("hp", 0))
-                GameLogicService.end_game_session(char)
-                if hp > 0:
-                    GameLogicService.save_player_position(char, pos_x, pos_y, hp)
-
-        elif event_type == "player_killed":
-            if char:
-                victim_char_id = data.get("victim_character_id")
-                if victim_char_id:
-                    victim_char = Character.objects.filter(id=victim_char_id, is_active=True).first()
-                    if victim_char:
-                        GameLogicService.record_pvp_kill(killer=char, victim=victim_char)
+    Body: {"events": [{"event_type": str, "player_id": str, "character_id": str?, "event_id": str?, "data": {}}, ...]}
 
-        elif event_type == "player_died":
-            if char:
-                try:
-                    GameLogicService.apply_death_penalty(char)
-                except Exception as exc:
-                    logger.warning("apply_death_penalty failed for char %s: %s", char_id, exc)
+    Usuários e personagens são resolvidos de uma vez; os eventos de cada personagem
+    são aplicados em ordem dentro de uma única transação, com savepoint por evento.
+    A resposta traz o resultado de cada evento (pelo índice) para que o servidor
+    reenvie apenas as falhas.
+    """
+    permission_classes = [GameServerIPPermission]
+    authentication_classes = []
+    throttle_classes = [GameServerThrottle]
 
-        elif event_type == "npc_killed":
-            if char:
-                npc_type = data.get("npc_type", "")
-                if npc_type:
-                    GameLogicService.update_kill_progress(char, npc_type)
+    _SECRET = os.environ.get("DJANGO_WEBHOOK_SECRET", "changeme")
 
-        elif event_type == "quest_complete":
-            if char:
-                quest_id = data.get("quest_id")
-                if quest_id:
-                    try:
-                        GameLogicService.complete_quest(char, quest_id)
-                    except Exception:
-                        pass
+    def post(self, request):
+        signature = request.headers.get("X-Webhook-Secret", "")
+        expected = hmac.new(self._SECRET.encode(), request.body, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return Response({"error": "forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
-        logger.info("Webhook event '%s' processed for player %s / char %s", event_type, player_id, char_id)
-        return Response({"ok": True})
+        events = request.data.get("events")
+        if not isinstance(events, list) or not events:
+            return Response({"error": "events must be a non-empty list"}, status=400)
+
+        max_size = getattr(settings, "GAME_EVENTS_BATCH_MAX", 500)
+        if len(events) > max_size:
+            return Response({"error": f"batch too large (max {max_size} events)"}, status=400)
+
+        if getattr(settings, "GAME_EVENTS_ASYNC", False) and enqueue_game_events(events):
+            return Response({"queued": len(events)}, status=status.HTTP_202_ACCEPTED)
+
+        results = GameLogicService.apply_game_events(events)
+
+        failed = sum(1 for r in results if not r["ok"])
+        logger.info("Webhook batch processed: %s events, %s failed", len(events), failed)
+        return Response({"processed": len(events) - failed, "failed": failed, "results": results})
+
+
+class GameEventStreamMetricsView(APIView):
+    """Tamanho, pendentes e lag das partições da fila de eventos + dead-letter (admin)."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        try:
+            return Response(stream_metrics())
+        except Exception as exc:
+            return Response({"error": f"event stream unavailable: {exc}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class ChatFilterStatsView(APIView):
+    """Mensagens bloqueadas/mascaradas pelo filtro do chat, por sala (admin)."""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response({"rooms": chat_filter.stats()})
 
 
 class GameStateView(APIView):
-    """Retorna estado completo do personagem para o servidor Unity."""
+    """Retorna estado completo do personagem para o servidor Unity.
+
+    Servido do estado em cache (`game:player_state:{character_id}`); só consulta o
+    banco em miss ou versão desatualizada, repopulando o cache.
+    """
     permission_classes = [GameServerIPPermission]
     authentication_classes = []
     throttle_classes = [GameServerThrottle]
@@ -482,51 +551,74 @@ class GameStateView(APIView):
         if not hmac.compare_digest(signature, expected):
             return Response({"error": "forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
+        from django.core.cache import cache
+
         char_id = request.query_params.get("character_id")
+        default_key = GameLogicService.default_character_key(user_id)
+        cached_id = char_id or cache.get(default_key)
+        if cached_id:
+            state = GameLogicService.get_cached_character_state(cached_id)
+            if state and state.get("owner_id") == str(user_id):
+                return Response(state)
+
         char = None
         if char_id:
-            char = Character.objects.filter(id=char_id, owner__id=user_id, is_active=True).select_related("owner").first()
+            char = Character.objects.filter(id=char_id, owner__id=user_id, is_active=True).first()
         if not char:
-            char = Character.objects.filter(owner__id=user_id, is_active=True).order_by("-created_at").select_related("owner").first()
+            char = Character.objects.filter(owner__id=user_id, is_active=True).order_by("-created_at").first()
+            if char:
+                cache.set(default_key, str(char.id), timeout=GameLogicService.PLAYER_STATE_TTL)
 
         if not char:
             return Response({"error": "No active character found"}, status=404)
 
-        stats = PlayerStats.objects.filter(character=char).first()
-        if not stats:
+        state = GameLogicService.preload_character_state_to_redis(char)
+        if state is None:
             return Response({"error": "Stats not found"}, status=404)
+        return Response(state)
 
-        bonuses = GameLogicService.get_equipment_bonuses(char)
-        skill_qs = PlayerSkill.objects.filter(character=char, is_equipped=True).select_related("skill_template")
-        skills = [
-            {"server_id": s.skill_template.server_id, "current_level": s.current_level, "slot_index": s.slot_index}
-            for s in skill_qs if s.skill_template.server_id is not None
-        ]
-        passive_bonuses = GameLogicService.compute_passive_bonuses(char)
-        active_party = GameLogicService.get_active_party(char.owner)
 
-        return Response({
-            "character_id":   str(char.id),
-            "name":           char.name,
-            "hp":             stats.health,
-            "max_hp":         stats.max_health,
-            "mana":           stats.mana,
-            "max_mana":       stats.max_mana,
-            "pos_x":          stats.last_pos_x,
-            "pos_y":          stats.last_pos_y,
-            "level":          stats.level,
-            "strength":       stats.strength,
-            "agility":        stats.agility,
-            "intelligence":   stats.intelligence,
-            "vitality":       stats.vitality,
-            "faction":        char.faction,
-            "character_class": char.character_class,
-            "race":           char.race,
-            "equipment_bonuses": bonuses,
-            "passive_bonuses":   passive_bonuses,
-            "skills":         skills,
-            "party_id":       str(active_party.id) if active_party else None,
-        })
+class GameStateBulkView(APIView):
+    """
+    Estado de vários personagens em uma única chamada assinada (HMAC do corpo),
+    usada no boot de instâncias de mapa e no warm-up do servidor.
+
+    Body: {"user_ids": [str, ...], "character_ids": [str, ...]}
+
+    Para `user_ids` é retornado o personagem ativo mais recente. A resposta traz
+    `states` (mesmo documento de `GameStateView`) e `missing` (ids sem estado).
+    """
+    permission_classes = [GameServerIPPermission]
+    authentication_classes = []
+    throttle_classes = [GameServerThrottle]
+
+    _SECRET = os.environ.get("DJANGO_WEBHOOK_SECRET", "changeme")
+
+    def post(self, request):
+        signature = request.headers.get("X-Webhook-Secret", "")
+        expected = hmac.new(self._SECRET.encode(), request.body, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return Response({"error": "forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        user_ids = request.data.get("user_ids") or []
+        character_ids = request.data.get("character_ids") or []
+        if not isinstance(user_ids, list) or not isinstance(character_ids, list):
+            return Response({"error": "user_ids and character_ids must be lists"}, status=400)
+        if not user_ids and not character_ids:
+            return Response({"error": "user_ids or character_ids required"}, status=400)
+
+        max_size = getattr(settings, "GAME_STATE_BULK_MAX", 500)
+        if len(user_ids) + len(character_ids) > max_size:
+            return Response({"error": f"batch too large (max {max_size} ids)"}, status=400)
+
+        try:
+            user_ids = [str(uuid.UUID(str(u))) for u in user_ids]
+            character_ids = [str(uuid.UUID(str(c))) for c in character_ids]
+        except ValueError:
+            return Response({"error": "ids must be UUIDs"}, status=400)
+
+        states, missing = GameLogicService.get_character_states_bulk(user_ids, character_ids)
+        return Response({"states": states, "missing": missing})
 
 
 # ── Grupo (Party) ─────────────────────────────────────────────────────────────
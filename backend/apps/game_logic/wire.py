@@ -0,0 +1,174 @@
+"""
+Codificação das mensagens enviadas pelos consumers WebSocket.
+
+Os clientes negociam o formato pelo subprotocolo do WebSocket
+(`Sec-WebSocket-Protocol`):
+
+| Subprotocolo        | Frame  | Formato                                                 |
+|---------------------|--------|---------------------------------------------------------|
+| `ravenna.proto.v1`  | binary | `ServerFrame` de `proto/ws_messages.proto` (proto3)     |
+| `ravenna.json.v1` / nenhum | text | JSON, como documentado em `consumers.py`          |
+
+O encoder proto3 é escrito à mão (varint / length-delimited / fixed32) para as
+poucas mensagens do schema, sem depender de `protobuf` em runtime; qualquer
+cliente gerado a partir do `.proto` decodifica os frames.
+
+Em fan-out (`chat.message`) o remetente chama `prepare`, que codifica os dois
+formatos uma única vez e os leva no evento do channel layer: cada conexão só
+envia os bytes prontos (`frame`), sem serializar de novo. `world.delta` é
+codificado por conexão, já que cada cliente recebe o próprio delta.
+"""
+import json
+import struct
+import uuid
+
+JSON = "json"
+PROTO = "proto"
+
+SUBPROTOCOLS = {"ravenna.proto.v1": PROTO, "ravenna.json.v1": JSON}
+
+_FRAMES_KEY = "frames"
+
+
+def choose_subprotocol(offered) -> str | None:
+    """First subprotocol offered by the client that we speak (binary wins), or None."""
+    offered = list(offered or [])
+    for name in ("ravenna.proto.v1", "ravenna.json.v1"):
+        if name in offered:
+            return name
+    return None
+
+
+# ── proto3 wire primitives ────────────────────────────────────────────────────
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _len_field(field: int, payload: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _str_field(field: int, value) -> bytes:
+    return _len_field(field, str(value).encode()) if value else b""
+
+
+def _uint_field(field: int, value) -> bytes:
+    value = int(value or 0)
+    return _varint(field << 3) + _varint(value) if value > 0 else b""
+
+
+def _sint_field(field: int, value) -> bytes:
+    value = int(value or 0)
+    return _varint(field << 3) + _varint((value << 1) ^ (value >> 63)) if value else b""
+
+
+def _bool_field(field: int, value) -> bytes:
+    return _varint(field << 3) + b"\x01" if value else b""
+
+
+def _float_field(field: int, value) -> bytes:
+    return _varint(field << 3 | 5) + struct.pack("<f", float(value or 0))
+
+
+def _uuid_field(field: int, value) -> bytes:
+    try:
+        raw = uuid.UUID(str(value)).bytes
+    except ValueError:
+        raw = str(value).encode()
+    return _len_field(field, raw) if raw else b""
+
+
+# ── ServerFrame messages ──────────────────────────────────────────────────────
+
+def _world_update(message: dict) -> bytes:
+    players = b"".join(
+        _len_field(3, _uuid_field(1, p.get("player_id", "")) + _str_field(2, p.get("display_name", ""))
+                   + _float_field(3, p.get("x")) + _float_field(4, p.get("y")))
+        for p in message.get("players", ())
+    )
+    return _str_field(1, message.get("map_key")) + _uint_field(2, message.get("tick")) + players
+
+
+def _world_delta(message: dict) -> bytes:
+    entered = b"".join(
+        _len_field(5, _uuid_field(1, e["player_id"]) + _str_field(2, e.get("display_name"))
+                   + _sint_field(3, e["x"]) + _sint_field(4, e["y"]))
+        for e in message.get("entered", ())
+    )
+    moved = b"".join(
+        _len_field(6, _uuid_field(1, e["player_id"]) + _sint_field(2, e["x"]) + _sint_field(3, e["y"]))
+        for e in message.get("moved", ())
+    )
+    left = b"".join(_uuid_field(7, player_id) for player_id in message.get("left", ()))
+    return (
+        _uint_field(1, message.get("seq")) + _bool_field(2, message.get("keyframe"))
+        + _float_field(3, message.get("quantum")) + _str_field(4, message.get("map_key"))
+        + entered + moved + left
+    )
+
+
+def _chat_message(message: dict) -> bytes:
+    return (
+        _str_field(1, message.get("user")) + _uuid_field(2, message.get("user_id", ""))
+        + _str_field(3, message.get("text")) + _uint_field(4, message.get("ts"))
+    )
+
+
+def _chat_history(message: dict) -> bytes:
+    messages = b"".join(_len_field(2, _chat_message(m)) for m in message.get("messages", ()))
+    return _str_field(1, message.get("room")) + messages
+
+
+def _notification(message: dict) -> bytes:
+    payload = {k: v for k, v in message.items() if k != "type"}
+    return _len_field(1, json.dumps(payload, separators=(",", ":"), default=str).encode())
+
+
+_ENCODERS = {
+    "pong": (1, lambda m: b""),
+    "world.update": (2, _world_update),
+    "chat.message": (3, _chat_message),
+    "notification.new": (4, _notification),
+    "map.full": (5, lambda m: _str_field(1, m.get("map_key"))),
+    "session.kicked": (6, lambda m: _str_field(1, m.get("reason"))),
+    "chat.error": (7, lambda m: _str_field(1, m.get("reason"))),
+    "world.delta": (8, _world_delta),
+    "chat.history": (9, _chat_history),
+}
+
+
+def encode_proto(message: dict) -> bytes:
+    field, encoder = _ENCODERS[message["type"]]
+    return _len_field(field, encoder(message))
+
+
+def encode_json(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+def _public(message: dict) -> dict:
+    return {k: v for k, v in message.items() if k != _FRAMES_KEY}
+
+
+def prepare(message: dict) -> dict:
+    """`message` with both frames encoded once, to be carried through a group_send."""
+    public = _public(message)
+    return {**public, _FRAMES_KEY: {JSON: encode_json(public), PROTO: encode_proto(public)}}
+
+
+def frame(message: dict, codec: str) -> str | bytes:
+    """The frame of `message` in `codec`, reusing the one built by `prepare` when present."""
+    frames = message.get(_FRAMES_KEY)
+    if frames and codec in frames:
+        return frames[codec]
+    public = _public(message)
+    return encode_proto(public) if codec == PROTO else encode_json(public)
@@ -0,0 +1,150 @@
+"""
+Agregação de `world.update` por tick.
+
+Em vez de um `group_send` por mensagem `player.move`, cada processo mantém um
+`MapAggregator` por grupo `map_<key>` com a última posição de cada jogador que
+se moveu. A cada tick (`WORLD_TICK_RATE` Hz) o agregador publica um
+`world.update` com `players: [...]` por célula da grade com jogadores sujos
+(grupo `map_<key>.<cx>.<cy>`, ver `interest`), ou no próprio grupo do mapa
+quando o movimento não tem célula:
+
+- N jogadores a 10 Hz geram, por processo, no máximo `WORLD_TICK_RATE` publicações
+  por segundo em cada célula ocupada, e não N × 10;
+- movimentos para a posição já anunciada são descartados, e um tick sem jogador
+  sujo não publica nada;
+- quem troca de célula também é publicado na célula anterior, para que quem só
+  enxergava aquela célula o tire da visão;
+- `forget_player` (troca de mapa, desconexão) anuncia a saída no próximo tick
+  (`left: [player_id]` na célula onde o jogador foi visto por último);
+- a cada `WORLD_KEYFRAME_SECONDS` os jogadores parados são republicados, então
+  quem acabou de entrar numa célula também os vê (o `DeltaTracker` descarta
+  posições que o cliente já tem);
+- o laço de um mapa termina sozinho após `IDLE_TICKS` ticks ociosos sem jogadores
+  e é recriado no próximo movimento.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDLE_TICKS = 50
+
+
+def tick_seconds() -> float:
+    from django.conf import settings
+    rate = getattr(settings, "WORLD_TICK_RATE", 10)
+    return 1.0 / max(1, rate)
+
+
+def refresh_ticks() -> int:
+    from django.conf import settings
+    return max(1, round(getattr(settings, "WORLD_KEYFRAME_SECONDS", 5) / tick_seconds()))
+
+
+class MapAggregator:
+    """Latest position per player of one map group, flushed once per tick."""
+
+    def __init__(self, channel_layer, group: str, map_key: str):
+        self.channel_layer = channel_layer
+        self.group = group
+        self.map_key = map_key
+        self.pending: dict[str, tuple[dict, tuple[int, int] | None]] = {}
+        # Last broadcast (player, cell) of everyone currently in the group
+        self.last_sent: dict[str, tuple[dict, tuple[int, int] | None]] = {}
+        # Players that left, with the cell they were last broadcast in
+        self.departed: dict[str, tuple[int, int] | None] = {}
+        self.tick = 0
+        self.task: asyncio.Task | None = None
+
+    def record(self, player: dict, cell: tuple[int, int] | None = None) -> bool:
+        """Queue `player` for the next tick; False when its position did not change."""
+        player_id = player["player_id"]
+        last = self.last_sent.get(player_id)
+        self.departed.pop(player_id, None)
+        if last is not None and (last[0]["x"], last[0]["y"]) == (player["x"], player["y"]) and player_id not in self.pending:
+            return False
+        self.pending[player_id] = (player, cell)
+        return True
+
+    def forget(self, player_id: str) -> bool:
+        """Stop broadcasting `player_id`; its departure goes out on the next tick. False if it was never sent."""
+        self.pending.pop(player_id, None)
+        last = self.last_sent.pop(player_id, None)
+        if last is None:
+            return False
+        self.departed[player_id] = last[1]
+        return True
+
+    def refresh(self) -> None:
+        """Re-queue idle players, so observers that joined their cell since then see them."""
+        for player_id, (player, cell) in self.last_sent.items():
+            self.pending.setdefault(player_id, (player, cell))
+
+    def _group_of(self, cell) -> str:
+        from apps.game_logic.interest import cell_group
+        return cell_group(self.map_key, cell) if cell is not None else self.group
+
+    async def flush(self) -> int:
+        """Broadcast the dirty players and departures, one world.update per cell; returns how many were sent."""
+        if not self.pending and not self.departed:
+            return 0
+        pending, departed = self.pending, self.departed
+        self.pending, self.departed = {}, {}
+        self.tick += 1
+        by_group: dict[str, tuple[list[dict], list[str]]] = {}
+        for player, cell in pending.values():
+            player_id = player["player_id"]
+            previous = self.last_sent.get(player_id)
+            self.last_sent[player_id] = (player, cell)
+            group = self._group_of(cell)
+            by_group.setdefault(group, ([], []))[0].append(player)
+            if previous is not None and self._group_of(previous[1]) != group:
+                # Observers of the old cell only: the new position is out of their range, so they drop it
+                by_group.setdefault(self._group_of(previous[1]), ([], []))[0].append(player)
+        for player_id, cell in departed.items():
+            by_group.setdefault(self._group_of(cell), ([], []))[1].append(player_id)
+        for group, (players, left) in by_group.items():
+            await self.channel_layer.group_send(
+                group,
+                {"type": "world.update", "map_key": self.map_key, "tick": self.tick, "players": players, "left": left},
+            )
+        return len(pending) + len(departed)
+
+    async def run(self) -> None:
+        idle = ticks = 0
+        every = refresh_ticks()
+        try:
+            while idle < IDLE_TICKS or self.last_sent:
+                await asyncio.sleep(tick_seconds())
+                ticks += 1
+                try:
+                    if ticks % every == 0:
+                        self.refresh()
+                    idle = 0 if await self.flush() else idle + 1
+                except Exception as exc:
+                    logger.warning("world tick %s failed: %s", self.group, exc)
+        finally:
+            self.task = None
+            if not self.pending and not self.departed and _aggregators.get(self.group) is self:
+                del _aggregators[self.group]
+
+
+_aggregators: dict[str, MapAggregator] = {}
+
+
+def record_move(channel_layer, group: str, map_key: str, player: dict, cell: tuple[int, int] | None = None) -> bool:
+    """Queue a move for the tick of `group`, starting its loop when needed."""
+    aggregator = _aggregators.get(group)
+    if aggregator is None:
+        aggregator = _aggregators[group] = MapAggregator(channel_layer, group, map_key)
+    queued = aggregator.record(player, cell)
+    if queued and aggregator.task is None:
+        aggregator.task = asyncio.get_running_loop().create_task(aggregator.run())
+    return queued
+
+
+def forget_player(group: str, player_id: str) -> None:
+    """Drop a player that left `group` and announce the departure to its cell on the next tick."""
+    aggregator = _aggregators.get(group)
+    if aggregator is not None and aggregator.forget(player_id) and aggregator.task is None:
+        aggregator.task = asyncio.get_running_loop().create_task(aggregator.run())
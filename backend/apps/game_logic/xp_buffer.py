@@ -0,0 +1,171 @@
+"""
+Buffer de coalescência de XP para eventos `player_action` de alta frequência.
+
+Cada `player_action` concede 2–10 XP; aplicá-los um a um custa um lock em
+`PlayerStats`, um save, um ZADD e um recarregamento do estado em cache. Com
+`XP_BUFFER_ENABLED=True` o XP é somado por personagem em um hash Redis
+(`HINCRBY game:xp:pending <character_id> <xp>`) e aplicado em lote:
+
+- a cada `XP_BUFFER_FLUSH_SECONDS` pela tarefa `tasks.flush_xp_buffer`;
+- de forma síncrona para o personagem em `player_disconnected`.
+
+O flush usa `GameLogicService.apply_experience_bulk` (um SELECT ... FOR UPDATE e
+um `bulk_update` para todos os personagens, com level ups). O teto anti-cheat
+(`XP_BUFFER_WINDOW_CEILING`) é aplicado sobre o total acumulado na janela.
+
+O XP em aplicação fica num hash `game:xp:flushing:<unix_ts>:<uuid>` até a
+transação commitar (`transaction.on_commit` o apaga). Se ela for desfeita, ou o
+worker morrer antes de apagá-lo, o próximo `flush_experience` devolve ao hash
+pendente os que tiverem mais de `XP_BUFFER_ORPHAN_SECONDS`. `flush_character`
+move para o seu hash só o valor que leu (`HINCRBY -xp` + `HSET` num MULTI), então
+incrementos que chegam no meio continuam pendentes; um saldo negativo (o flush
+em lote levou o valor antes) também continua, e desconta do próximo XP.
+
+Sem Redis, `buffer_experience` retorna False e o chamador aplica o XP direto.
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import WatchError
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY         = "game:xp:pending"
+FLUSHING_KEY_PREFIX = "game:xp:flushing:"
+
+
+def _get_conn():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def buffer_experience(character_id, amount: int) -> bool:
+    """Accumulate XP for a character. Returns False when Redis is unavailable."""
+    try:
+        _get_conn().hincrby(PENDING_KEY, str(character_id), int(amount))
+        return True
+    except Exception as exc:
+        logger.debug("buffer_experience: Redis unavailable (%s)", exc)
+        return False
+
+
+def _apply_window(pending: dict[str, int]) -> dict[str, int]:
+    """Clamp each character's accumulated window to the anti-cheat ceiling."""
+    ceiling = int(getattr(settings, "XP_BUFFER_WINDOW_CEILING", 10_000))
+    amounts = {}
+    for character_id, amount in pending.items():
+        if amount > ceiling:
+            logger.warning(
+                "xp_buffer anti-cheat: char %s accumulated %s XP in one window (ceiling %s)",
+                character_id, amount, ceiling,
+            )
+            amount = ceiling
+        if amount > 0:
+            amounts[character_id] = amount
+    return amounts
+
+
+def _flushing_key() -> str:
+    # The timestamp lets a later flush tell an abandoned hash from one still in use
+    return f"{FLUSHING_KEY_PREFIX}{int(time.time())}:{uuid.uuid4().hex}"
+
+
+def _merge_back(conn, flushing_key: str) -> int:
+    """Add a flushing hash back into the pending hash and drop it; returns the XP moved."""
+    with conn.pipeline() as pipeline:
+        try:
+            pipeline.watch(flushing_key)
+            leftover = {k: int(v) for k, v in pipeline.hgetall(flushing_key).items()}
+            pipeline.multi()
+            for character_id, amount in leftover.items():
+                pipeline.hincrby(PENDING_KEY, character_id, amount)
+            pipeline.delete(flushing_key)
+            pipeline.execute()
+        except WatchError:
+            # Deleted (committed) or merged by someone else meanwhile
+            return 0
+    return sum(leftover.values())
+
+
+def recover_orphans(conn) -> int:
+    """Merge back flushing hashes older than XP_BUFFER_ORPHAN_SECONDS; returns the XP recovered."""
+    cutoff = time.time() - int(getattr(settings, "XP_BUFFER_ORPHAN_SECONDS", 300))
+    recovered = 0
+    for key in conn.scan_iter(match=f"{FLUSHING_KEY_PREFIX}*", count=100):
+        key = key.decode() if isinstance(key, bytes) else key
+        created, _, _ = key[len(FLUSHING_KEY_PREFIX):].partition(":")
+        if created.isdigit() and int(created) > cutoff:
+            continue
+        recovered += _merge_back(conn, key)
+    if recovered:
+        logger.warning("xp_buffer: recovered %s XP from abandoned flushes", recovered)
+    return recovered
+
+
+def flush_experience() -> dict:
+    """Apply every pending XP amount in one bulk update.
+
+    The pending hash is swapped out with RENAME so increments arriving during
+    the flush land in a fresh hash. On DB failure the amounts are merged back.
+    """
+    from apps.game_logic.services import GameLogicService
+
+    conn = _get_conn()
+    recover_orphans(conn)
+    flushing_key = _flushing_key()
+    try:
+        conn.rename(PENDING_KEY, flushing_key)
+    except Exception as exc:
+        if "no such key" in str(exc).lower():
+            return {"characters": 0, "xp": 0}
+        raise
+
+    pending = {k.decode(): int(v) for k, v in conn.hgetall(flushing_key).items()}
+    try:
+        stats = GameLogicService.apply_experience_bulk(_apply_window(pending))
+    except Exception:
+        _merge_back(conn, flushing_key)
+        raise
+    debts = {character_id: amount for character_id, amount in pending.items() if amount < 0}
+    if debts:
+        # flush_character took these amounts already; keep the debt against the next XP
+        pipeline = conn.pipeline(transaction=False)
+        for character_id, amount in debts.items():
+            pipeline.hincrby(PENDING_KEY, character_id, amount)
+        pipeline.execute()
+    transaction.on_commit(lambda: conn.delete(flushing_key))
+    return {"characters": len(stats), "xp": sum(amount for amount in pending.values() if amount > 0)}
+
+
+def flush_character(character_id) -> int:
+    """Synchronously apply the pending XP of one character (e.g. on disconnect).
+
+    The buffered amount is only dropped when the caller's transaction commits.
+    """
+    from apps.game_logic.services import GameLogicService
+
+    field = str(character_id)
+    try:
+        conn = _get_conn()
+        amount = int(conn.hget(PENDING_KEY, field) or 0)
+        if amount <= 0:
+            return 0
+        flushing_key = _flushing_key()
+        pipeline = conn.pipeline(transaction=True)
+        pipeline.hincrby(PENDING_KEY, field, -amount)
+        pipeline.hset(flushing_key, field, amount)
+        pipeline.execute()
+    except Exception as exc:
+        logger.debug("flush_character: Redis unavailable (%s)", exc)
+        return 0
+
+    try:
+        GameLogicService.apply_experience_bulk(_apply_window({field: amount}))
+    except Exception:
+        _merge_back(conn, flushing_key)
+        raise
+    transaction.on_commit(lambda: conn.delete(flushing_key))
+    return amount
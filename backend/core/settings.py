@@ -173,9 +173,9 @@ REST_THROTTLING_ENABLED = os.environ.get(
 ).lower() == "true"
 if REST_THROTTLING_ENABLED:
     REST_FRAMEWORK["DEFAULT_THROTTLE_CLASSES"] = [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.ScopedRateThrottle",
+        "apps.common.throttling.AnonRateThrottle",
+        "apps.common.throttling.UserRateThrottle",
+        "apps.common.throttling.ScopedRateThrottle",
     ]
 
 SIMPLE_JWT = {
@@ -326,6 +326,68 @@ REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["gameserver"] = os.environ.get(
 _raw_ips = os.environ.get("GAMESERVER_ALLOWED_IPS", "")
 GAMESERVER_ALLOWED_IPS: list[str] = [ip.strip() for ip in _raw_ips.split(",") if ip.strip()]
 
+# Maximum number of events accepted by POST /api/v1/game-logic/events/batch/
+GAME_EVENTS_BATCH_MAX = int(os.environ.get("GAME_EVENTS_BATCH_MAX", "500"))
+
+# Maximum number of ids accepted by POST /api/v1/game-logic/game-state/bulk/
+GAME_STATE_BULK_MAX = int(os.environ.get("GAME_STATE_BULK_MAX", "500"))
+
+# Asynchronous webhook ingestion (Redis Streams) — see apps/game_logic/event_queue.py.
+# When enabled, webhooks only verify the HMAC, enqueue and return 202.
+GAME_EVENTS_ASYNC = os.environ.get("GAME_EVENTS_ASYNC", "False").lower() == "true"
+GAME_EVENTS_STREAM_PARTITIONS = int(os.environ.get("GAME_EVENTS_STREAM_PARTITIONS", "8"))
+GAME_EVENTS_STREAM_MAXLEN = int(os.environ.get("GAME_EVENTS_STREAM_MAXLEN", "100000"))
+GAME_EVENTS_MAX_DELIVERIES = int(os.environ.get("GAME_EVENTS_MAX_DELIVERIES", "5"))
+GAME_EVENTS_RETRY_IDLE_MS = int(os.environ.get("GAME_EVENTS_RETRY_IDLE_MS", "30000"))
+
+# Webhook idempotency ledger — see apps/game_logic/idempotency.py
+GAME_EVENTS_DEDUPE_TTL = int(os.environ.get("GAME_EVENTS_DEDUPE_TTL", "86400"))
+GAME_EVENTS_DEDUPE_PENDING_TTL = int(os.environ.get("GAME_EVENTS_DEDUPE_PENDING_TTL", "60"))
+GAME_EVENTS_DEDUPE_DB_RETENTION_DAYS = int(os.environ.get("GAME_EVENTS_DEDUPE_DB_RETENTION_DAYS", "7"))
+
+# XP coalescing for player_action events — see apps/game_logic/xp_buffer.py
+XP_BUFFER_ENABLED = os.environ.get("XP_BUFFER_ENABLED", "False").lower() == "true"
+XP_BUFFER_FLUSH_SECONDS = int(os.environ.get("XP_BUFFER_FLUSH_SECONDS", "5"))
+XP_BUFFER_WINDOW_CEILING = int(os.environ.get("XP_BUFFER_WINDOW_CEILING", "10000"))
+# Flushing hashes older than this are from a rolled back or dead flush and are merged back
+XP_BUFFER_ORPHAN_SECONDS = int(os.environ.get("XP_BUFFER_ORPHAN_SECONDS", "300"))
+
+# Write-behind for player position/HP — see apps/game_logic/position_buffer.py
+POSITION_WRITE_BEHIND = os.environ.get("POSITION_WRITE_BEHIND", "False").lower() == "true"
+POSITION_FLUSH_SECONDS = int(os.environ.get("POSITION_FLUSH_SECONDS", "10"))
+POSITION_FLUSH_BATCH_SIZE = int(os.environ.get("POSITION_FLUSH_BATCH_SIZE", "2000"))
+# Flushing hashes older than this are from a rolled back or dead flush and are merged back
+POSITION_FLUSH_ORPHAN_SECONDS = int(os.environ.get("POSITION_FLUSH_ORPHAN_SECONDS", "300"))
+
+# Game session presence: pings go to a Redis sorted set, cleanup_stale_game_sessions
+# syncs them to GameSession in bulk. Without Redis a connection writes at most once
+# per GAME_SESSION_HEARTBEAT_DB_INTERVAL seconds.
+GAME_SESSION_STALE_SECONDS = int(os.environ.get("GAME_SESSION_STALE_SECONDS", "60"))
+GAME_SESSION_HEARTBEAT_DB_INTERVAL = int(os.environ.get("GAME_SESSION_HEARTBEAT_DB_INTERVAL", "30"))
+# world.update broadcasts per second per map (moves are merged between ticks)
+WORLD_TICK_RATE = int(os.environ.get("WORLD_TICK_RATE", "10"))
+# Players get world.update only from grid cells within this many world units
+WORLD_INTEREST_RADIUS = int(os.environ.get("WORLD_INTEREST_RADIUS", "128"))
+# world.delta: coordinates quantized to WORLD_DELTA_QUANTUM units, moves shorter than
+# WORLD_DELTA_MIN_MOVE are not sent, full keyframe every WORLD_KEYFRAME_SECONDS
+WORLD_DELTA_QUANTUM = float(os.environ.get("WORLD_DELTA_QUANTUM", "0.5"))
+WORLD_DELTA_MIN_MOVE = float(os.environ.get("WORLD_DELTA_MIN_MOVE", "1.0"))
+WORLD_KEYFRAME_SECONDS = float(os.environ.get("WORLD_KEYFRAME_SECONDS", "5"))
+
+# Chat rooms keep their last CHAT_HISTORY_SIZE messages in a Redis list (replayed on
+# connect); flush_chat_log batch-inserts them into the partitioned moderation log.
+CHAT_HISTORY_SIZE = int(os.environ.get("CHAT_HISTORY_SIZE", "50"))
+CHAT_LOG_FLUSH_SECONDS = int(os.environ.get("CHAT_LOG_FLUSH_SECONDS", "5"))
+CHAT_LOG_FLUSH_BATCH_SIZE = int(os.environ.get("CHAT_LOG_FLUSH_BATCH_SIZE", "1000"))
+CHAT_LOG_PARTITIONS_AHEAD = int(os.environ.get("CHAT_LOG_PARTITIONS_AHEAD", "2"))  # months
+# Rooms fanned out through per-worker shard groups instead of one channel group (see chat_fanout)
+CHAT_ROOM_SHARDS = {"global": int(os.environ.get("CHAT_GLOBAL_SHARDS", "16"))}
+# Chat message filters, applied in order (see chat_filter); words come from ChatFilterTerm
+CHAT_MESSAGE_FILTERS = ["apps.game_logic.chat_filter.word_filter"]
+CHAT_FILTER_LINK_PREFIXES = ["http://", "https://", "www.", "discord.gg/"]
+CHAT_FILTER_LINK_ACTION = os.environ.get("CHAT_FILTER_LINK_ACTION", "reject")  # or "mask"
+CHAT_FILTER_REFRESH_SECONDS = int(os.environ.get("CHAT_FILTER_REFRESH_SECONDS", "10"))
+
 # ---------------------------------------------------------------------------
 # Celery
 # ---------------------------------------------------------------------------
@@ -350,6 +412,14 @@ CHANNEL_LAYERS = {
         "CONFIG": {"hosts": [os.environ.get("CHANNEL_LAYER_URL", _CHANNEL_LAYER_URL)]},
     }
 }
+# Seconds a WebSocket auth user snapshot (ban/active/staff) stays cached (see accounts.ws_auth)
+WS_USER_SNAPSHOT_TTL = int(os.environ.get("WS_USER_SNAPSHOT_TTL", "30"))
+# Per-connection outbound queue (see game_logic.send_queue): max queued chat/notification
+# messages, unsent socket bytes above which the queue holds messages, and seconds a
+# connection may stay behind before it is closed with 4008
+WS_SEND_QUEUE_LIMIT = int(os.environ.get("WS_SEND_QUEUE_LIMIT", "256"))
+WS_SEND_BACKLOG_BYTES = int(os.environ.get("WS_SEND_BACKLOG_BYTES", "262144"))
+WS_SEND_STALL_SECONDS = float(os.environ.get("WS_SEND_STALL_SECONDS", "10"))
 
 # ---------------------------------------------------------------------------
 # Sentry
@@ -374,6 +444,12 @@ if SENTRY_DSN:
 # ---------------------------------------------------------------------------
 LEADERBOARD_CACHE_KEY = "game:leaderboard"
 LEADERBOARD_SIZE = int(os.environ.get("LEADERBOARD_SIZE", "100"))
+# Incremental rebuilds re-read this much before the previous run to catch late commits
+LEADERBOARD_WATERMARK_OVERLAP_SECONDS = int(os.environ.get("LEADERBOARD_WATERMARK_OVERLAP_SECONDS", "30"))
+# Without Redis the boards live in process; snapshot them to the cache this often
+LEADERBOARD_FALLBACK_CHECKPOINT_SECONDS = int(os.environ.get("LEADERBOARD_FALLBACK_CHECKPOINT_SECONDS", "30"))
+# Names this process's checkpoint; empty = "<hostname>:<pid>" (set it to restore across restarts)
+LEADERBOARD_FALLBACK_WORKER_ID = os.environ.get("LEADERBOARD_FALLBACK_WORKER_ID", "")
 
 # ---------------------------------------------------------------------------
 # Celery Beat — periodic tasks (static schedule; database entries win on conflict)
@@ -383,7 +459,36 @@ from celery.schedules import crontab  # noqa: E402
 CELERY_BEAT_SCHEDULE = {
     "rebuild-leaderboard-cache": {
         "task": "apps.game_logic.tasks.rebuild_leaderboard_cache",
-        "schedule": 600,  # every 10 minutes
+        "schedule": 60,  # incremental, changed characters only
+    },
+    "rebuild-leaderboard-full": {
+        "task": "apps.game_logic.tasks.rebuild_leaderboard_cache",
+        "schedule": crontab(minute=15),  # hourly atomic swap
+        "kwargs": {"mode": "full"},
+    },
+    "drain-game-event-streams": {
+        "task": "apps.game_logic.tasks.drain_game_event_streams",
+        "schedule": 5,  # safety net for the consume_game_events workers
+    },
+    "flush-xp-buffer": {
+        "task": "apps.game_logic.tasks.flush_xp_buffer",
+        "schedule": XP_BUFFER_FLUSH_SECONDS,
+    },
+    "flush-player-positions": {
+        "task": "apps.game_logic.tasks.flush_player_positions",
+        "schedule": POSITION_FLUSH_SECONDS,
+    },
+    "flush-chat-log": {
+        "task": "apps.game_logic.tasks.flush_chat_log",
+        "schedule": CHAT_LOG_FLUSH_SECONDS,
+    },
+    "ensure-chat-log-partitions": {
+        "task": "apps.game_logic.tasks.ensure_chat_log_partitions",
+        "schedule": crontab(minute=0, hour=3),  # daily
+    },
+    "purge-processed-game-events": {
+        "task": "apps.game_logic.tasks.purge_processed_game_events",
+        "schedule": crontab(minute=30, hour=4),  # daily
     },
     "cleanup-stale-game-sessions": {
         "task": "apps.game_logic.tasks.cleanup_stale_game_sessions",